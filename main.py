@@ -5,7 +5,7 @@ import time as tm
 import random
 import calendar
 import math
-import json
+import threading
 
 from datetime import time, datetime
 from modules import loader, calculator
@@ -15,6 +15,11 @@ from modules import config as cfg
 from modules import student_log as s_log
 from modules import assignment as asgn
 from modules import ui_helpers as ui_h
+from modules import result_cache as r_cache
+from modules import exporter
+from modules import aggregator
+from modules import compact_result
+from modules import param_resolver as p_res
 from st_aggrid import AgGrid, GridOptionsBuilder
 
 st.set_page_config(page_title="CER Simulation Data Generator", layout="wide")
@@ -29,6 +34,24 @@ st.markdown(
     """, unsafe_allow_html=True
 )
 
+
+@st.cache_resource(show_spinner=False)
+def _start_kernel_warmup():
+    """Warm-up kernel numba sekali per proses, di background agar UI tidak tertahan."""
+    t = threading.Thread(target=calculator.warmup_kernels, name="numba-warmup", daemon=True)
+    t.start()
+    return t
+
+_start_kernel_warmup()
+
+
+@st.cache_resource(show_spinner=False)
+def _start_log_writer():
+    """Thread pengirim log mahasiswa, sekali per proses (sekaligus mengirim sisa spool lama)."""
+    return s_log.start_log_writer()
+
+_start_log_writer()
+
 cfg.init_default_states()
 
 # Inisialisasi active_assignment sebelum app_initialized agar selalu ada
@@ -47,6 +70,8 @@ if 'app_initialized' not in st.session_state:
 if 'hasil_simulasi' not in st.session_state:
     st.session_state['hasil_simulasi'] = None
     st.session_state['gen_csv_data']   = None
+    st.session_state['gen_extra_exports'] = None
+    st.session_state['gen_cube']       = None
     st.session_state['used_params'] = {}
     st.session_state['info_simulasi'] = ""
 
@@ -107,7 +132,9 @@ if st.session_state['role'] == 'admin':
         if selected_asgn_key != st.session_state.get('active_assignment'):
             st.session_state['active_assignment'] = selected_asgn_key
             st.session_state['hasil_simulasi'] = None  # reset hasil lama
-            st.session_state['gen_csv_data']   = None  # reset CSV bytes lama
+            st.session_state['gen_csv_data']   = None  # reset CSV lama
+            st.session_state['gen_extra_exports'] = None
+            st.session_state['gen_cube']       = None
             latest_row = cfg.get_latest_config_for_assignment(selected_asgn_key)
             if latest_row is not None:
                 cfg.apply_row_to_session(latest_row)
@@ -468,16 +495,61 @@ if st.session_state['role'] == 'admin':
             )
             selected_tracker_asgn = asgn.get_key_from_label(selected_tracker_label)
 
-            df_logs = s_log.get_student_logs(assignment_type=selected_tracker_asgn)
+            # Filter, sort, dan paginasi dijalankan di query storage: tiap rerun
+            # hanya mengambil & merender 1 halaman, berapa pun jumlah log.
+            f_nim, f_cfg, f_date, f_sort = st.columns([1, 1, 1.2, 1])
+            flt_nim   = f_nim.text_input("Student ID", key="tracker_f_nim", placeholder="Contains...").strip()
+            flt_cfg   = f_cfg.text_input("Parameter Used", key="tracker_f_cfg", placeholder="Contains...").strip()
+            flt_dates = f_date.date_input("Date (UTC)", value=(), key="tracker_f_date")
+            flt_sort  = f_sort.selectbox("Sort by", list(s_log.TRACKER_SORTS), key="tracker_sort")
+
+            f_loc, f_tariff = st.columns(2)
+            flt_loc    = f_loc.text_input("Location", key="tracker_f_loc", placeholder="Contains...").strip()
+            flt_tariff = f_tariff.selectbox("Tariff Scheme", ["All", *p_res.TARIFF_SCHEMES], key="tracker_f_tariff")
+
+            # Filter berubah -> kembali ke halaman pertama
+            flt_key = (selected_tracker_asgn, flt_nim, flt_cfg, tuple(flt_dates), flt_loc, flt_tariff, flt_sort)
+            if st.session_state.get('tracker_filter_key') != flt_key:
+                st.session_state['tracker_filter_key'] = flt_key
+                st.session_state['tracker_page'] = 0
+
+            page_size = s_log.TRACKER_PAGE_SIZE
+            page = st.session_state.get('tracker_page', 0)
+            df_logs, total_logs = s_log.query_student_logs(
+                assignment_type=selected_tracker_asgn,
+                nim=flt_nim or None,
+                config_name=flt_cfg or None,
+                date_from=flt_dates[0] if flt_dates else None,
+                date_to=flt_dates[-1] if flt_dates else None,
+                location=flt_loc or None,
+                tariff_scheme=None if flt_tariff == "All" else flt_tariff,
+                sort=flt_sort,
+                page=page,
+                page_size=page_size,
+            )
             
+            if df_logs.empty and page > 0:
+                # Halaman sudah tidak ada (log berkurang) -> kembali ke halaman pertama
+                st.session_state['tracker_page'] = 0
+                st.rerun(scope="fragment")
+
             if df_logs.empty:
                 st.info("There is no Data Available.")
                 return 
                 
             st.markdown("### 📋 Student Generate Tracker")
+            n_pending_logs = s_log.pending_log_count()
+            if n_pending_logs:
+                st.caption(f"⏳ {n_pending_logs} new log(s) waiting to be saved")
+            n_rejected_logs = s_log.rejected_log_count()
+            if n_rejected_logs:
+                st.warning(f"⚠️ {n_rejected_logs} log(s) were rejected by storage and moved to `{s_log.LOG_REJECTED_FILE}`")
+            missing_log_cols = s_log.missing_log_columns()
+            if missing_log_cols:
+                st.warning(f"⚠️ Table student_logs has no column(s) {', '.join(missing_log_cols)} yet — new logs are saved without them. Run the storage migration SQL.")
             
-            df_logs = df_logs.sort_values(by="Timestamp", ascending=False).reset_index(drop=True)
-            df_logs.index = df_logs.index + 1
+            df_logs = df_logs.reset_index(drop=True)
+            df_logs.index = df_logs.index + 1 + page * page_size
             df_logs.reset_index(inplace=True)
             df_logs['NIM'] = df_logs['NIM'].astype(str).str.replace(r'\.0$', '', regex=True)
             
@@ -488,34 +560,26 @@ if st.session_state['role'] == 'admin':
                 'Config_Name': 'Parameter Used'
             }, inplace=True)
             
-            def extract_summary(json_str):
-                try:
-                    p = json.loads(json_str)
-                    base = f"Loc: {p.get('location','')} | PV: {p.get('solar','')}kWp | Load: {p.get('load_source','')}"
-                    if p.get('bat') is not None:
-                        base += f" | Bat: {p.get('bat','')}kWh"
-                    return base
-                except:
-                    return "Invalid Data"
-                    
-            df_logs['Result Parameter'] = df_logs['Parameter_Snapshot'].apply(extract_summary)
+            # Ringkasan dari kolom log; snapshot lengkap tidak dikirim ke grid,
+            # cukup disimpan per id untuk Re-generate
+            df_logs['Result Parameter'] = df_logs.apply(s_log.summary_text, axis=1)
+            st.session_state['tracker_snapshots'] = dict(zip(df_logs['id'].astype(str), df_logs['Parameter_Snapshot']))
+            df_logs = df_logs[['No', 'id', 'Timestamp (UTC)', 'Student ID', 'Parameter Used', 'Result Parameter']]
 
             gb = GridOptionsBuilder.from_dataframe(df_logs)
             
-            gb.configure_column("Parameter_Snapshot", hide=True)
             gb.configure_column("id", hide=True)
-            gb.configure_column("created_at", hide=True)
             
-            gb.configure_default_column(resizable=True, filterable=True, sortable=True)
+            # Sort & filter grid dimatikan: keduanya sudah dikerjakan di query
+            gb.configure_default_column(resizable=True, filterable=False, sortable=False)
             
-            gb.configure_column("No", minWidth=60, maxWidth=80, filter='agNumberColumnFilter')
+            gb.configure_column("No", minWidth=60, maxWidth=80)
             
-            gb.configure_column("Timestamp (UTC)", minWidth=160, flex=1, filter='agTextColumnFilter')
-            gb.configure_column("Student ID", minWidth=130, flex=1, filter='agTextColumnFilter')
-            gb.configure_column("Parameter Used", minWidth=150, flex=1, filter='agTextColumnFilter')
-            gb.configure_column("Result Parameter", minWidth=300, flex=2, wrapText=True, autoHeight=True, filter='agTextColumnFilter')
+            gb.configure_column("Timestamp (UTC)", minWidth=160, flex=1)
+            gb.configure_column("Student ID", minWidth=130, flex=1)
+            gb.configure_column("Parameter Used", minWidth=150, flex=1)
+            gb.configure_column("Result Parameter", minWidth=300, flex=2, wrapText=True, autoHeight=True)
             
-            gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=10)
             gb.configure_selection('single', use_checkbox=True)
             
             gridOptions = gb.build()
@@ -526,8 +590,22 @@ if st.session_state['role'] == 'admin':
                 update_on=['selectionChanged'], 
                 fit_columns_on_grid_load=False, 
                 theme='streamlit', 
-                height=375
+                height=375,
+                key=f"tracker_grid_{page}",
             )
+
+            # Navigasi halaman (server-side)
+            n_pages = max(1, math.ceil(total_logs / page_size))
+
+            def _set_tracker_page(p):
+                st.session_state['tracker_page'] = p
+
+            nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+            nav_prev.button("◀ Prev", width="stretch", key="tracker_prev", disabled=page <= 0,
+                            on_click=_set_tracker_page, args=(page - 1,))
+            nav_info.caption(f"Page {page + 1} of {n_pages} · {total_logs} logs")
+            nav_next.button("Next ▶", width="stretch", key="tracker_next", disabled=page >= n_pages - 1,
+                            on_click=_set_tracker_page, args=(page + 1,))
             
             st.divider()
             
@@ -545,7 +623,7 @@ if st.session_state['role'] == 'admin':
                 
                 if st.button("Re-generate Data", width="stretch", type="primary", key="btn_regen_tracker"):
                     try:
-                        saved_params = json.loads(sel_dict['Parameter_Snapshot'])
+                        saved_params = s_log.snapshot_dict(st.session_state['tracker_snapshots'][str(sel_dict['id'])])
                         with st.spinner(f"Re-generating data for Student ID {nim_target}..."):
                             
                             # --- Ambil assignment_type dari snapshot ---
@@ -567,90 +645,91 @@ if st.session_state['role'] == 'admin':
                             sy = int(yr_split[0])
                             ey = int(yr_split[1]) if len(yr_split) > 1 else sy
                             
-                            df_input_regen = loader.load_and_merge_data(
-                                reg, pt, sy, ey, fixed_load_file=saved_params['load_source']
-                            )
+                            regen_key = r_cache.make_key(saved_params)
+                            df_result_regen = r_cache.get_result(regen_key)
+
+                            if df_result_regen is None:
+                                df_input_regen = loader.load_and_merge_data(
+                                    reg, pt, sy, ey, fixed_load_file=saved_params['load_source']
+                                )
                             
-                            if df_input_regen is None:
-                                st.error(f"❌ Dataset Failed to Load! Check Folder 'dataset/{reg}/{pt}'")
-                            else:
-                                col_load_regen = 'load_profile' if 'load_profile' in df_input_regen.columns else 'beban_rumah_kw'
-                                df_input_regen[col_load_regen] = df_input_regen[col_load_regen] * saved_params['load_multiplier']
-
-                                sim_params = {
-                                    'solar_capacity_kw': saved_params['solar'], 
-                                    'temp_coeff': saved_params['solar_temp'],
-                                    'pr': saved_params['solar_pr'],
-                                    'df_wholesale_fees': loader.get_wholesale_fees(reg),
-                                }
-
-                                if regen_asgn_type == 'assignment_1':
-                                    sim_params.update({
-                                        'battery_capacity_kwh': saved_params.get('bat', 10.0), 
-                                        'battery_efficiency': saved_params.get('bat_eff', 0.95),
-                                        'battery_initial_soc': saved_params.get('bat_soc_init', 0.5),
-                                        'max_charge_kw': saved_params.get('bat_charge_kw', 10.0),
-                                        'max_discharge_kw': saved_params.get('bat_discharge_kw', 10.0),
-                                        'soc_min_pct': saved_params.get('soc_min', 0.1),
-                                        'soc_max_pct': saved_params.get('soc_max', 0.9),
-                                        'dispatch_price_threshold': saved_params.get('vpp_thresh', 800),
-                                    })
+                                if df_input_regen is None:
+                                    st.error(f"❌ Dataset Failed to Load! Check Folder 'dataset/{reg}/{pt}'")
+                                else:
+                                    col_load_regen = 'load_profile' if 'load_profile' in df_input_regen.columns else 'beban_rumah_kw'
+                                    df_input_regen[col_load_regen] = df_input_regen[col_load_regen] * saved_params['load_multiplier']
+
+                                    sim_params = {
+                                        'solar_capacity_kw': saved_params['solar'], 
+                                        'temp_coeff': saved_params['solar_temp'],
+                                        'pr': saved_params['solar_pr'],
+                                        'df_wholesale_fees': loader.get_wholesale_fees(reg),
+                                    }
+
+                                    if regen_asgn_type == 'assignment_1':
+                                        sim_params.update({
+                                            'battery_capacity_kwh': saved_params.get('bat', 10.0), 
+                                            'battery_efficiency': saved_params.get('bat_eff', 0.95),
+                                            'battery_initial_soc': saved_params.get('bat_soc_init', 0.5),
+                                            'max_charge_kw': saved_params.get('bat_charge_kw', 10.0),
+                                            'max_discharge_kw': saved_params.get('bat_discharge_kw', 10.0),
+                                            'soc_min_pct': saved_params.get('soc_min', 0.1),
+                                            'soc_max_pct': saved_params.get('soc_max', 0.9),
+                                            'dispatch_price_threshold': saved_params.get('vpp_thresh', 800),
+                                        })
                                 
-                                t_data = saved_params['tariff_data']
-                                sim_params['tariff_scheme'] = t_data.get('tariff_scheme', 'Flat')
-
-                                sim_params.update({
-                                    't_peak_start': time(17, 0),
-                                    't_peak_end': time(20, 0),
-                                    't_offpeak_start': time(22, 0),
-                                    't_offpeak_end': time(6, 0),
-                                    't_shoulder_start': time(14, 0),
-                                    't_shoulder_end': time(17, 0)
-                                })
-
-                                if sim_params['tariff_scheme'] == "Time of Use":
+                                    t_data = saved_params['tariff_data']
+                                    sim_params['tariff_scheme'] = t_data.get('tariff_scheme', 'Flat')
+
                                     sim_params.update({
-                                        'peak_price': t_data['peak_price'],
-                                        'exp_peak': t_data['exp_peak'],
-                                        't_peak_start': datetime.strptime(t_data['peak_start'], "%H:%M").time(),
-                                        't_peak_end': datetime.strptime(t_data['peak_end'], "%H:%M").time(),
-                                        'offpeak_price': t_data['offpeak_price'],
-                                        'exp_offpeak': t_data['exp_offpeak'],
-                                        't_offpeak_start': datetime.strptime(t_data['offpeak_start'], "%H:%M").time(),
-                                        't_offpeak_end': datetime.strptime(t_data['offpeak_end'], "%H:%M").time(),
-                                        'shoulder_price': t_data['shoulder_price'],
-                                        'exp_shoulder': t_data['exp_shoulder'],
-                                        't_shoulder_start': datetime.strptime(t_data['shoulder_start'], "%H:%M").time(),
-                                        't_shoulder_end': datetime.strptime(t_data['shoulder_end'], "%H:%M").time(),
+                                        't_peak_start': time(17, 0),
+                                        't_peak_end': time(20, 0),
+                                        't_offpeak_start': time(22, 0),
+                                        't_offpeak_end': time(6, 0),
+                                        't_shoulder_start': time(14, 0),
+                                        't_shoulder_end': time(17, 0)
                                     })
-                                elif sim_params['tariff_scheme'] == "Flat":
-                                    sim_params['import_flat'] = t_data.get('import_flat', 0.20)
-                                    sim_params['export_price'] = t_data.get('export_price', 0.08)
+
+                                    if sim_params['tariff_scheme'] == "Time of Use":
+                                        sim_params.update({
+                                            'peak_price': t_data['peak_price'],
+                                            'exp_peak': t_data['exp_peak'],
+                                            't_peak_start': datetime.strptime(t_data['peak_start'], "%H:%M").time(),
+                                            't_peak_end': datetime.strptime(t_data['peak_end'], "%H:%M").time(),
+                                            'offpeak_price': t_data['offpeak_price'],
+                                            'exp_offpeak': t_data['exp_offpeak'],
+                                            't_offpeak_start': datetime.strptime(t_data['offpeak_start'], "%H:%M").time(),
+                                            't_offpeak_end': datetime.strptime(t_data['offpeak_end'], "%H:%M").time(),
+                                            'shoulder_price': t_data['shoulder_price'],
+                                            'exp_shoulder': t_data['exp_shoulder'],
+                                            't_shoulder_start': datetime.strptime(t_data['shoulder_start'], "%H:%M").time(),
+                                            't_shoulder_end': datetime.strptime(t_data['shoulder_end'], "%H:%M").time(),
+                                        })
+                                    elif sim_params['tariff_scheme'] == "Flat":
+                                        sim_params['import_flat'] = t_data.get('import_flat', 0.20)
+                                        sim_params['export_price'] = t_data.get('export_price', 0.08)
                                     
-                                df_result_regen = calculator.run_simulation(df_input_regen, sim_params, regen_asgn_type)
-                                
-                                df_export = df_result_regen.round(2).rename(columns={
-                                    'irradiance':          'irradiance_W/m^2',
-                                    'temperature':         'temperature_C',
-                                    'load_profile':        'load_kW',
-                                    'price_profile':       'price_AUD/MWh',
-                                    'battery_soc_pct':     'battery_soc_%',
-                                    'battery_soc_kwh':     'battery_soc_kwh',
-                                    'battery_power_ac_kw': 'battery_power_ac_kW',
-                                    'tariff_import_AUD':   'tariff_import_AUD/kWh',
-                                    'tariff_export_AUD':   'tariff_export_AUD/kWh',
-                                    'grid_net_kw':         'grid_net_kW',
-                                })
-                                _out_cols = asgn.get_output_columns(regen_asgn_type)
-                                _out_cols_exist = [c for c in _out_cols if c in df_export.columns]
-                                df_export = df_export[_out_cols_exist]
+                                    df_result_regen = calculator.run_simulation(df_input_regen, sim_params, regen_asgn_type)
+                                    r_cache.put_result(regen_key, df_result_regen)
+
+                            if df_result_regen is not None:
                                 
-                                st.session_state['regen_csv_data'] = df_export.to_csv(index=False).encode('utf-8')
+                                regen_packed = compact_result.pack(df_result_regen)
+
+                                # Flow regenerate: semua kolom numerik di-round 2 desimal
+                                st.session_state['regen_csv_data'] = exporter.lazy_csv(
+                                    regen_packed, regen_asgn_type, decimals=2
+                                )
+                                st.session_state['regen_extra_exports'] = exporter.lazy_exports(
+                                    regen_packed, regen_asgn_type, decimals=2
+                                )
                                 st.session_state['regen_nim'] = nim_target
                                 st.session_state['regen_reg'] = reg
                                 st.session_state['regen_pt'] = pt
                                 st.session_state['regen_params'] = saved_params
-                                st.session_state['regen_df_result'] = df_result_regen
+                                st.session_state['regen_df_result'] = regen_packed
+                                st.session_state['regen_cube'] = aggregator.build_cube(df_result_regen)
+                                st.session_state['regen_result_key'] = regen_key
                                 st.session_state['regen_assignment_type'] = regen_asgn_type
 
                     except Exception as e:
@@ -671,7 +750,10 @@ if st.session_state['role'] == 'admin':
                     df_result         = st.session_state.get('regen_df_result'),
                     used_p            = st.session_state['regen_params'],
                     vc                = _regen_vc,
-                    csv_bytes         = st.session_state['regen_csv_data'],
+                    csv_data          = st.session_state['regen_csv_data'],
+                    extra_exports     = st.session_state.get('regen_extra_exports'),
+                    cube              = st.session_state.get('regen_cube'),
+                    result_key        = st.session_state.get('regen_result_key'),
                     download_label    = "Download Dataset (CSV)",
                     download_filename = f"Data_{_regen_nim}_{_regen_reg}_{_regen_pt}.csv",
                     download_key      = f"dl_regen_{_regen_nim}",
@@ -731,297 +813,63 @@ if btn_run:
         active_cfg_name = st.session_state.get('active_config', 'Default')
         seed_val = s_log.generate_seed(st.session_state['current_nim'], active_cfg_name)
         
-        random.seed(seed_val)
-        np.random.seed(seed_val)
+        p_res.seed_all(seed_val)
     else:
-        random.seed()
-        np.random.seed()
-
-
-    # AMBIL PARAMETER DARI SESSION STATE
-    use_rand_location = st.session_state.get('chk_loc', False)
-    use_rand_load = st.session_state.get('chk_load', False)
-    use_rand_solar = st.session_state.get('chk_solar', False)
-    use_rand_bat = st.session_state.get('chk_bat', False)
-
-    p_solar_min = st.session_state.get('sol_min', 4.0)
-    p_solar_max = st.session_state.get('sol_max', 6.0)
-    p_solar_fix = st.session_state.get('sol_fix', 5.0)
-    p_temp = st.session_state.get('sol_temp', -0.004)
-    p_pr = st.session_state.get('sol_pr', 0.8)
-
-    p_bat_min = st.session_state.get('bat_min', 8.0)
-    p_bat_max = st.session_state.get('bat_max', 12.0)
-    p_bat_fix = st.session_state.get('bat_fix', 10.0)
-    p_eff = st.session_state.get('bat_eff', 95) / 100
-    p_soc = st.session_state.get('bat_soc_init', 50) / 100
-    range_soc = st.session_state.get('bat_soc_range', (10, 90))
-    p_min_soc = range_soc[0] / 100
-    p_max_soc = range_soc[1] / 100
-
-    vpp_price = st.session_state.get('vpp_threshold', 800)
-    tariff_scheme = st.session_state.get('tariff_scheme', 'Flat')
-    if tariff_scheme == "Random":
-        tariff_scheme = random.choice(["Flat", "Time of Use", "Wholesale Price"])
-    exp_price = st.session_state.get('exp_tariff', 0.08)
-    p_flat = st.session_state.get('imp_tariff', 0.20)
-    p_peak = st.session_state.get('pp', 0.45)
-    p_offpeak = st.session_state.get('po', 0.15)
-    p_shoulder = st.session_state.get('ps', 0.25)
-    e_peak = st.session_state.get('e_peak', 0.15)
-    e_offpeak = st.session_state.get('e_offpeak', 0.05)
-    e_shoulder = st.session_state.get('e_shoulder', 0.10)
-
-    selected_load_file = st.session_state.get('sel_load_file', None)
-    # start_y = st.session_state.get('date_start', 2020)
-    # end_y = st.session_state.get('date_end', 2020)
-
-    # --- KALKULASI LOKASI ---
-    if use_rand_location: 
-        selected_loc = st.session_state.get('loc_region')
-        raw_point = st.session_state.get('loc_point')
-        
-        if raw_point == "Randomize":
-            list_titik = loader.get_list_titik(selected_loc)
-            selected_point = random.choice(list_titik) if list_titik else None
-        else:
-            selected_point = raw_point
-            
-    else: 
-        list_lokasi = loader.get_list_lokasi()
-        selected_loc = random.choice(list_lokasi)
-        list_titik_random = loader.get_list_titik(selected_loc)
-        selected_point = random.choice(list_titik_random) if list_titik_random else None
-    
-
-    # --- KALKULASI DURASI ---
-    use_rand_dur = st.session_state.get('chk_dur', False)
-    
-    if use_rand_dur: 
-        final_start_y = st.session_state.get('date_start', 2020)
-        final_end_y = st.session_state.get('date_end', 2020)
-    else: 
-        actual_years = loader.get_available_years(selected_loc, selected_point)
-        
-        if actual_years:
-            dur_req = st.session_state.get('rand_dur_years', 1)
-            dur_req = min(dur_req, len(actual_years)) 
-            
-            max_start_idx = len(actual_years) - dur_req
-            
-            rand_idx = random.randint(0, max_start_idx)
-            
-            final_start_y = actual_years[rand_idx]
-            final_end_y = actual_years[rand_idx + dur_req - 1]
-        else:
-            final_start_y, final_end_y = 2020, 2020
+        p_res.seed_all(None)
 
 
-    # --- KALKULASI BEBAN ---
-    all_files = loader.get_list_load_profiles()
-    
-    if use_rand_load: 
-        final_load_file = selected_load_file
-        final_load_mult = st.session_state.get('load_mult', 15.0)
-    else: 
-        if all_files:
-            final_load_file = random.choice(all_files)
-            final_load_mult = round(random.uniform(8.0, 32.0), 1)
-        else:
-            st.error("❌ No load profile files found!")
-            st.stop()
+    # RESOLUSI PARAMETER (lokasi, durasi, load, solar, baterai, tarif) DARI SESSION STATE
+    try:
+        resolved = p_res.resolve_generate(st.session_state, active_asgn_type)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        st.stop()
 
-    # --- KALKULASI SOLAR ---
-    is_solar_fixed = False 
-    if not use_rand_solar:
-        segment_solar = 5
-        solar_total_range = p_solar_max - p_solar_min
-        solar_segment_width = solar_total_range / segment_solar
+    used_params     = resolved['used_params']
+    selected_loc    = resolved['region']
+    selected_point  = resolved['point']
+    final_start_y   = resolved['start_year']
+    final_end_y     = resolved['end_year']
+    final_load_file = resolved['load_file']
+
+    # Snapshot parameter sudah lengkap -> cek cache hasil lintas session dulu
+    cache_key = r_cache.make_key(used_params)
+    df_result = r_cache.get_result(cache_key)
+
+    if df_result is None:
+        st.toast(f"📄 Load Profile: {final_load_file}")
+        with st.spinner(f"Combining data for {selected_loc} ({selected_point}) from {final_start_y}-{final_end_y}..."):
+            df_input = p_res.load_input(resolved)
+            tm.sleep(0.5) 
         
-        if final_load_mult < 16.0:
-            start_seg_solar = 0
-            end_seg_solar = 2
-        elif final_load_mult < 24.0:
-            start_seg_solar = 1
-            end_seg_solar = 3
-        else:
-            start_seg_solar = 2
-            end_seg_solar = 4
-
-        final_solar_min = p_solar_min + (start_seg_solar * solar_segment_width)
-        final_solar_max = p_solar_min + ((end_seg_solar + 1) * solar_segment_width)
+        if df_input is not None:
+            params = p_res.build_sim_params(st.session_state, resolved)
+            
+            with st.spinner("Calculating Energy Flow..."):
+                df_result = calculator.run_simulation(df_input, params, active_asgn_type)
 
-        raw_solar = random.uniform(final_solar_min, final_solar_max)
+            r_cache.put_result(cache_key, df_result)
+    
+    if df_result is not None:
         
-        final_p_solar = round(raw_solar * 2) / 2
-    else:
-        final_p_solar = round(p_solar_fix * 2) / 2
-        is_solar_fixed = True
-
-    # --- KALKULASI BATERAI (hanya untuk Assignment 1) ---
-    final_p_bat = None
-    auto_charge_power = None
-
-    if active_asgn_type == asgn.ASSIGNMENT_1:
-        if not use_rand_bat:
-            segment = 5
-            bat_total_range = p_bat_max - p_bat_min
-            bat_segment_width = bat_total_range / segment
-
-            if is_solar_fixed:
-                mid = (segment - 1) // 2
-                start_seg = max(0, mid - 1)
-                end_seg   = min(segment - 1, mid + 1)
-            else:
-                solar_range = p_solar_max - p_solar_min
-                if solar_range <= 0:
-                    current_segment = (segment - 1) // 2
-                else:
-                    relative_pos = (final_p_solar - p_solar_min) / solar_range
-                    raw_segment = int(relative_pos * segment)
-                    current_segment = max(0, min(segment - 1, raw_segment))
-
-                start_seg = max(0, current_segment - 1)
-                end_seg   = min(segment - 1, current_segment + 1)
-
-            final_bat_min = p_bat_min + (start_seg * bat_segment_width)
-            final_bat_max = p_bat_min + ((end_seg + 1) * bat_segment_width)
+        # Session hanya menyimpan versi terkompresi (identik saat di-decode);
+        # DataFrame penuh dilepas setelah cube dibuat.
+        result_packed = compact_result.pack(df_result)
+        st.session_state['hasil_simulasi'] = result_packed
+        st.session_state['info_simulasi'] = f"{selected_loc}_{selected_point}_{final_start_y}-{final_end_y}"
 
-            raw_bat = random.uniform(final_bat_min, final_bat_max)
-            final_p_bat = round(raw_bat * 2) / 2
-        else:
-            final_p_bat = p_bat_fix
+        # CSV dibuat lazy: bytes hanya ditulis saat tombol download diklik,
+        # tidak disimpan di session_state
+        st.session_state['gen_csv_data'] = exporter.lazy_csv(result_packed, active_asgn_type)
+        st.session_state['gen_extra_exports'] = exporter.lazy_exports(result_packed, active_asgn_type)
 
-        bat_total_range = p_bat_max - p_bat_min
-        if bat_total_range <= 0:
-            bat_segment_idx = 2
-        else:
-            bat_segment_width = bat_total_range / 5
-            bat_segment_idx = int((final_p_bat - p_bat_min) / bat_segment_width)
-            bat_segment_idx = max(0, min(4, bat_segment_idx))
-
-        if bat_segment_idx == 0:
-            auto_charge_power = 5.0
-        elif bat_segment_idx in [1, 2]:
-            auto_charge_power = 10.0
-        else:
-            auto_charge_power = 15.0
-
-    st.toast(f"📄 Load Profile: {final_load_file}")
-    with st.spinner(f"Combining data for {selected_loc} ({selected_point}) from {final_start_y}-{final_end_y}..."):
-        df_input = loader.load_and_merge_data(
-            selected_loc, 
-            selected_point, 
-            final_start_y, 
-            final_end_y, 
-            fixed_load_file=final_load_file 
+        # Pre-agregasi Annual Overview (hanya admin yang melihat Detailed Analysis)
+        st.session_state['gen_cube'] = (
+            aggregator.build_cube(df_result) if st.session_state['role'] == 'admin' else None
         )
-        tm.sleep(0.5) 
-    
-    if df_input is not None:
-        col_load_name = 'load_profile' if 'load_profile' in df_input.columns else 'beban_rumah_kw'
-        df_input[col_load_name] = df_input[col_load_name] * final_load_mult
-        params = {
-            'solar_capacity_kw': final_p_solar, 
-            'temp_coeff': p_temp,
-            'pr': p_pr,
-            't_offpeak_start': st.session_state.get('t_o_start', time(22,0)),
-            't_offpeak_end': st.session_state.get('t_o_end', time(6,0)),
-            't_peak_start': st.session_state.get('t_p_start', time(17,0)),
-            't_peak_end': st.session_state.get('t_p_end', time(20,0)),
-            't_shoulder_start': st.session_state.get('t_s_start', time(14,0)),
-            't_shoulder_end': st.session_state.get('t_s_end', time(17,0)),
-            'tariff_scheme': tariff_scheme,
-            'df_wholesale_fees': loader.get_wholesale_fees(selected_loc),
-            'export_price': exp_price,
-            'import_flat': p_flat,
-            'peak_price': p_peak,
-            'offpeak_price': p_offpeak,
-            'shoulder_price': p_shoulder,
-            'exp_peak': e_peak,
-            'exp_offpeak': e_offpeak,
-            'exp_shoulder': e_shoulder
-        }
-
-        if active_asgn_type == asgn.ASSIGNMENT_1 and final_p_bat is not None:
-            params.update({
-                'battery_capacity_kwh': final_p_bat, 
-                'battery_efficiency': p_eff,
-                'battery_initial_soc': p_soc,
-                'max_charge_kw': auto_charge_power,
-                'max_discharge_kw': auto_charge_power,
-                'soc_min_pct': p_min_soc,
-                'soc_max_pct': p_max_soc,
-                'dispatch_price_threshold': vpp_price,
-            })
-        
-        with st.spinner("Calculating Energy Flow..."):
-            df_result = calculator.run_simulation(df_input, params, active_asgn_type)
-
-        
-        st.session_state['hasil_simulasi'] = df_result
-        st.session_state['info_simulasi'] = f"{selected_loc}_{selected_point}_{final_start_y}-{final_end_y}"
+        st.session_state['gen_result_key'] = cache_key
 
-        # Buat CSV bytes sekali di sini, simpan ke session_state
-        # agar tidak di-rebuild tiap rerender (tiap interaksi widget)
-        _asgn_for_csv = active_asgn_type
-        _df_csv = df_result.copy().rename(columns={
-            'irradiance':          'irradiance_W/m^2',
-            'temperature':         'temperature_C',
-            'load_profile':        'load_kW',
-            'price_profile':       'price_AUD/MWh',
-            'battery_soc_pct':     'battery_soc_%',
-            'battery_power_ac_kw': 'battery_power_ac_kW',
-            'tariff_import_AUD':   'tariff_import_AUD/kWh',
-            'tariff_export_AUD':   'tariff_export_AUD/kWh',
-            'grid_net_kw':         'grid_net_kW',
-        })
-        for _c in ['tariff_import_AUD/kWh', 'tariff_export_AUD/kWh']:
-            if _c in _df_csv.columns:
-                _df_csv[_c] = _df_csv[_c].round(5)
-        _desired = asgn.get_output_columns(_asgn_for_csv)
-        _df_csv  = _df_csv[[c for c in _desired if c in _df_csv.columns]]
-        st.session_state['gen_csv_data'] = _df_csv.to_csv(index=False).encode('utf-8')
-        del _df_csv
-        
-        # Susun Snapshot Tarif
-        tariff_snapshot = {'tariff_scheme': tariff_scheme}
-        
-        if tariff_scheme == "Time of Use":
-            tariff_snapshot.update({
-                'peak_price': p_peak, 'exp_peak': e_peak,
-                'peak_start': st.session_state.get('t_p_start', time(17,0)).strftime("%H:%M"),
-                'peak_end': st.session_state.get('t_p_end', time(20,0)).strftime("%H:%M"),
-                'offpeak_price': p_offpeak, 'exp_offpeak': e_offpeak,
-                'offpeak_start': st.session_state.get('t_o_start', time(22,0)).strftime("%H:%M"),
-                'offpeak_end': st.session_state.get('t_o_end', time(6,0)).strftime("%H:%M"),
-                'shoulder_price': p_shoulder, 'exp_shoulder': e_shoulder,
-                'shoulder_start': st.session_state.get('t_s_start', time(14,0)).strftime("%H:%M"),
-                'shoulder_end': st.session_state.get('t_s_end', time(17,0)).strftime("%H:%M"),
-            })
-        elif tariff_scheme == "Flat":
-            tariff_snapshot['import_flat'] = p_flat
-            tariff_snapshot['export_price'] = exp_price
-
-        st.session_state['used_params'] = {
-            'assignment_type': active_asgn_type,
-            'solar': final_p_solar,
-            'solar_pr': p_pr,
-            'solar_temp': p_temp,
-            'bat': final_p_bat,
-            'bat_eff': p_eff,
-            'bat_soc_init': p_soc,
-            'bat_charge_kw': auto_charge_power,
-            'bat_discharge_kw': auto_charge_power,
-            'soc_min': p_min_soc,
-            'soc_max': p_max_soc,
-            'vpp_thresh': vpp_price,
-            'tariff_data': tariff_snapshot,
-            'location': f"{selected_loc} - {selected_point}",
-            'period': f"{final_start_y}" if final_start_y == final_end_y else f"{final_start_y} to {final_end_y}",
-            'load_source': final_load_file,
-            'load_multiplier': final_load_mult 
-        }
+        st.session_state['used_params'] = used_params
         
         if st.session_state['role'] == 'student':
             active_cfg_name = st.session_state.get('active_config', 'Default')
@@ -1046,7 +894,7 @@ if st.session_state['hasil_simulasi'] is not None:
         df_result      = st.session_state['hasil_simulasi']
         file_name_info = st.session_state['info_simulasi']
         used_p         = st.session_state['used_params']
-        csv_bytes      = st.session_state.get('gen_csv_data', b'')
+        csv_data       = st.session_state.get('gen_csv_data', b'')
 
         _gen_asgn = used_p.get('assignment_type', asgn.ASSIGNMENT_1)
         _gen_vc   = asgn.get_vis_config(_gen_asgn)
@@ -1055,7 +903,10 @@ if st.session_state['hasil_simulasi'] is not None:
             df_result         = df_result,
             used_p            = used_p,
             vc                = _gen_vc,
-            csv_bytes         = csv_bytes,
+            csv_data          = csv_data,
+            extra_exports     = st.session_state.get('gen_extra_exports'),
+            cube              = st.session_state.get('gen_cube'),
+            result_key        = st.session_state.get('gen_result_key'),
             download_label    = "Download Dataset (CSV)",
             download_filename = f"Data_{file_name_info}.csv",
             download_key      = "download-csv",
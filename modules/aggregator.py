@@ -0,0 +1,316 @@
+"""
+modules/aggregator.py
+Pre-agregasi hasil simulasi untuk Annual Overview (visualizer.plot_annual_overview).
+
+build_cube() dijalankan sekali setelah run_simulation dan menghasilkan cube
+kecil per tahun: hourly, daily, monthly, heatmap bulan×jam, cumulative VPP,
+dan event dispatch. Agregasi memakai bincount / reduceat pada key waktu
+integer (jam/hari/bulan sejak epoch), bukan resample/pivot_table.
+Bincount-sum memakai Kahan summation (kernel numba) seperti groupby-sum
+pandas, sehingga hasil setelah round(2) identik dengan versi resample.
+
+Urutan pembulatan sama dengan versi resample sebelumnya:
+5-menit → hourly (round 2) → daily (round 2) → monthly (round 2).
+"""
+
+import numpy as np
+import pandas as pd
+from numba import jit
+
+DT_HOURS    = 5.0 / 60.0
+NS_PER_HOUR = 3_600 * 10**9
+VPP_PAYMENT = 20.0   # AUD per bulan
+
+MONETARY_COLS = [
+    'bill_actual', 'bill_solar_only', 'bill_grid_only',
+    'vpp_export_value_AUD', 'vpp_extra_import_cost_AUD', 'vpp_operational_net_value_AUD',
+]
+
+
+def get_bat_column(df):
+    return 'battery_power_ac_kw' if 'battery_power_ac_kw' in df.columns else 'battery_power_kw'
+
+
+def get_load_column(df):
+    return 'load_profile' if 'load_profile' in df.columns else 'beban_rumah_kw'
+
+
+# ─────────────────────────────────────────────────────────────────
+# BINNING HELPERS
+# ─────────────────────────────────────────────────────────────────
+@jit(nopython=True, cache=True)
+def _kahan_bincount(labels, values, n_bins):
+    """Sum per label dengan Kahan summation (algoritma group_sum pandas); NaN dilewati."""
+    sumx = np.zeros(n_bins)
+    comp = np.zeros(n_bins)
+    for i in range(len(values)):
+        val = values[i]
+        if val != val: continue
+        lab = labels[i]
+        y = val - comp[lab]
+        t = sumx[lab] + y
+        comp[lab] = t - sumx[lab] - y
+        if comp[lab] != comp[lab]: comp[lab] = 0.0
+        sumx[lab] = t
+    return sumx
+
+
+def _sum_bins(labels, values, n_bins):
+    return _kahan_bincount(
+        np.ascontiguousarray(labels, dtype=np.int64),
+        np.ascontiguousarray(values, dtype=np.float64),
+        n_bins,
+    )
+
+
+def _group_starts(keys):
+    """Index awal tiap grup pada array key yang sudah terurut."""
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def _reduce_bins(values, keys, starts, n_bins, how='sum'):
+    """
+    Reduce `values` per bin key (0..n_bins-1, terurut). Bin kosong = 0,
+    sama seperti resample().sum() / max() pada data kontinu.
+    """
+    if how == 'max':
+        out = np.zeros(n_bins, dtype=values.dtype)
+        out[keys[starts]] = np.maximum.reduceat(values, starts)
+        return out
+    return _sum_bins(keys, values, n_bins)
+
+
+def _aggregate(columns, keys, n_bins, max_cols=()):
+    """Dict kolom -> array per bin (sum, kecuali kolom di max_cols)."""
+    starts = _group_starts(keys)
+    return {
+        name: _reduce_bins(values, keys, starts, n_bins, 'max' if name in max_cols else 'sum')
+        for name, values in columns.items()
+    }
+
+
+def _round_frame(cols, index):
+    """DataFrame dari dict kolom, kolom float di-round 2 (sama dengan DataFrame.round(2))."""
+    return pd.DataFrame(
+        {c: np.round(v, 2) if v.dtype.kind == 'f' else v for c, v in cols.items()},
+        index=index,
+    )
+
+
+# ─────────────────────────────────────────────────────────────────
+# CUBE PER TAHUN
+# ─────────────────────────────────────────────────────────────────
+def build_year_cube(df_year, col_bat=None):
+    """Semua agregat yang dibutuhkan plot_annual_overview untuk 1 tahun data 5-menit."""
+    col_bat  = col_bat or get_bat_column(df_year)
+    col_load = get_load_column(df_year)
+
+    if isinstance(df_year.index, pd.DatetimeIndex):
+        ts = df_year.index.to_numpy()
+    else:
+        ts = df_year['timestamp'].to_numpy()
+
+    def col(name):
+        return df_year[name].to_numpy()
+
+    has_vpp_status = 'vpp_status' in df_year.columns
+
+    # --- Kolom 5-menit yang di-sum per jam ---
+    bat_discharge = np.clip(col(col_bat), 0, None) if col_bat in df_year.columns else np.zeros(len(ts))
+    raw = {}
+    energy_cols_kw = {
+        'solar_output_kw':                    'solar_output_kwh',
+        'battery_discharge_kw':               'battery_discharge_kwh',
+        'grid_import_kw':                     'grid_import_kwh',
+        'grid_export_kw':                     'grid_export_kwh',
+        col_load:                             'load_kwh',
+        'vpp_grid_import_after_discharge_kw': 'extra_import_kwh',
+    }
+    if 'vpp_battery_discharge_kw' in df_year.columns:
+        energy_cols_kw['vpp_battery_discharge_kw'] = 'vpp_bat_dis_kwh_tmp'
+    if 'vpp_grid_export_kw' in df_year.columns:
+        energy_cols_kw['vpp_grid_export_kw'] = 'vpp_grid_export_kwh'
+
+    for src in energy_cols_kw:
+        if src == 'battery_discharge_kw':
+            raw[src] = bat_discharge
+        elif src in df_year.columns:
+            raw[src] = col(src)
+
+    heatmap_raw_cols = {}
+    if has_vpp_status:
+        raw['vpp_discharge_hours_raw'] = col('vpp_status').astype(int) * DT_HOURS
+        heatmap_raw_cols['vpp_discharge_hours_raw'] = 'vpp_discharge_hours'
+    if 'vpp_grid_import_after_discharge_kw' in df_year.columns:
+        raw['extra_import_kwh_raw'] = col('vpp_grid_import_after_discharge_kw') * DT_HOURS
+        heatmap_raw_cols['extra_import_kwh_raw'] = 'extra_import_kwh_hm'
+
+    monetary_cols = [c for c in MONETARY_COLS if c in df_year.columns]
+    for c in monetary_cols:
+        raw[c] = col(c)
+    if has_vpp_status:
+        raw['vpp_status'] = col('vpp_status')
+
+    # ── STEP 1: 5-min → Hourly ──
+    hour_abs = ts.astype('datetime64[ns]').astype(np.int64) // NS_PER_HOUR
+    hour_key = hour_abs - hour_abs[0]
+    n_hours  = int(hour_key[-1]) + 1
+    hourly_cols = _aggregate(raw, hour_key, n_hours, max_cols=('vpp_status',))
+
+    for src, dst in energy_cols_kw.items():
+        if src in hourly_cols:
+            hourly_cols[dst] = hourly_cols[src] * DT_HOURS
+    for src, dst in heatmap_raw_cols.items():
+        hourly_cols[dst] = hourly_cols[src]
+    if 'battery_discharge_kwh' in hourly_cols:
+        hourly_cols['battery_discharge_kwh'] = np.clip(hourly_cols['battery_discharge_kwh'], 0, None)
+
+    hour_index = pd.DatetimeIndex(
+        (hour_abs[0] + np.arange(n_hours)) * NS_PER_HOUR, name='timestamp'
+    ).as_unit('ns')
+    hourly = _round_frame(hourly_cols, hour_index)
+
+    # ── STEP 2: Hourly → Daily ──
+    daily_src = [c for c in list(energy_cols_kw.values()) + monetary_cols + list(heatmap_raw_cols.values())
+                 if c in hourly.columns]
+    if has_vpp_status:
+        daily_src.append('vpp_status')
+
+    day_abs = (hour_abs[0] + np.arange(n_hours)) // 24
+    day_key = day_abs - day_abs[0]
+    n_days  = int(day_key[-1]) + 1
+    daily_cols = _aggregate({c: hourly[c].to_numpy() for c in daily_src}, day_key, n_days,
+                            max_cols=('vpp_status',))
+    day_index = pd.DatetimeIndex(
+        (day_abs[0] + np.arange(n_days)) * 24 * NS_PER_HOUR, name='timestamp'
+    ).as_unit('ns')
+    daily = _round_frame(daily_cols, day_index)
+
+    # ── STEP 3: Daily → Monthly ──
+    month_abs = day_index.year.to_numpy() * 12 + day_index.month.to_numpy() - 1
+    month_key = month_abs - month_abs[0]
+    n_months  = int(month_key[-1]) + 1
+    monthly_cols = _aggregate(
+        {c: daily[c].to_numpy().astype(np.int64) if c == 'vpp_status' else daily[c].to_numpy()
+         for c in daily_src},
+        month_key, n_months,
+    )
+    month_index = pd.date_range(day_index[0], periods=n_months, freq='ME', name='timestamp')
+    monthly = _round_frame(monthly_cols, month_index)
+
+    # ── Heatmap bulan × jam (dari data 5-menit) ──
+    hm_key = (pd.DatetimeIndex(ts).month.to_numpy() - 1) * 24 + (hour_abs % 24)
+    hm_index = range(1, 13)
+
+    def _heatmap(name):
+        if name not in raw:
+            return pd.DataFrame(0, index=hm_index, columns=range(24))
+        grid = _sum_bins(hm_key, raw[name], 12 * 24).reshape(12, 24)
+        return pd.DataFrame(grid, index=hm_index, columns=range(24))
+
+    heatmap_vpp = _heatmap('vpp_discharge_hours_raw')
+    heatmap_imp = _heatmap('extra_import_kwh_raw')
+
+    # --- ROW 1 Prep ---
+    if 'battery_discharge_kwh' not in monthly.columns:
+        monthly['battery_discharge_kwh'] = 0.0
+    if 'grid_import_kwh' not in monthly.columns:
+        monthly['grid_import_kwh'] = 0.0
+
+    elec_cols = ["solar_output_kwh", "battery_discharge_kwh", "grid_import_kwh"]
+    monthly_pct = (monthly[elec_cols].div(monthly[elec_cols].sum(axis=1), axis=0) * 100)
+
+    # --- ROW 3 Prep (threshold harga dispatch — dari data 5-menit) ---
+    col_price = 'price_profile' if 'price_profile' in df_year.columns else 'price_import'
+    dispatch_price_threshold = np.inf
+    if has_vpp_status and col_price in df_year.columns:
+        vpp_mask = col('vpp_status') > 0
+        if vpp_mask.any():
+            dispatch_price_threshold = df_year[col_price][vpp_mask].min()
+
+    # --- ROW 4 Prep (Cumulative VPP) ---
+    if 'vpp_grid_export_kwh' in daily.columns:
+        cumulative_vpp = daily['vpp_grid_export_kwh'].cumsum()
+    else:
+        cumulative_vpp = pd.Series(0, index=daily.index)
+
+    # --- ROW 5 Prep ---
+    monthly["self_consumption_pct"] = ((monthly["solar_output_kwh"] - monthly["grid_export_kwh"]) / monthly["solar_output_kwh"].replace(0, np.nan)) * 100
+    monthly["self_sufficiency_pct"] = (1 - (monthly["grid_import_kwh"] / monthly["load_kwh"].replace(0, np.nan))) * 100
+    monthly.fillna(0, inplace=True)
+
+    # --- ROW 6 Prep (Dispatch events — dari data 5-menit) ---
+    event_df = pd.DataFrame()
+    if has_vpp_status:
+        vpp_mask_event = col('vpp_status') > 0
+        if vpp_mask_event.any():
+            edges    = np.r_[True, vpp_mask_event[1:] != vpp_mask_event[:-1]]
+            event_id = np.cumsum(edges)[vpp_mask_event]
+            ev_starts = _group_starts(event_id)
+            duration_h = np.diff(np.r_[ev_starts, len(event_id)]) * DT_HOURS
+            bat_power_kw = (np.abs(col(col_bat)).max() if col_bat in df_year.columns else 0) or 15.0
+            requested_vpp_kwh = duration_h * bat_power_kw
+            vpp_dis_col = 'vpp_battery_discharge_kw' if 'vpp_battery_discharge_kw' in df_year.columns else col_bat
+            ev_key = np.repeat(np.arange(len(ev_starts)), np.diff(np.r_[ev_starts, len(event_id)]))
+            actual_vpp_discharge_kwh = _sum_bins(ev_key, col(vpp_dis_col)[vpp_mask_event], len(ev_starts)) * DT_HOURS
+            event_df = pd.DataFrame({
+                'requested_vpp_kwh': requested_vpp_kwh,
+                'actual_vpp_discharge_kwh': actual_vpp_discharge_kwh,
+                'dispatch_limited': actual_vpp_discharge_kwh < (requested_vpp_kwh - 0.1),
+            }, index=pd.Index(event_id[ev_starts], name='event_id'))
+
+    vpp_bat_col = 'vpp_bat_dis_kwh_tmp' if 'vpp_bat_dis_kwh_tmp' in monthly.columns else None
+    monthly["normal_battery_discharge_kwh"] = (
+        (monthly["battery_discharge_kwh"] - monthly[vpp_bat_col]).clip(lower=0)
+        if vpp_bat_col else monthly["battery_discharge_kwh"]
+    )
+
+    # --- ROW 7 Prep (VPP Financials) ---
+    monthly["vpp_payment"] = VPP_PAYMENT
+    if "vpp_operational_net_value_AUD" in monthly.columns:
+        monthly["net_cost"] = monthly["vpp_extra_import_cost_AUD"] - monthly["vpp_export_value_AUD"]
+
+    # --- ROW 8 Prep (Bill Comparisons) — mengikuti formula notebook ---
+    if "bill_actual" in monthly.columns:
+        monthly["bill_pv_battery_with_vpp_payment"] = monthly["bill_actual"] - monthly["vpp_payment"]
+        monthly["bill_pv_battery_no_vpp"] = (
+            monthly["bill_actual"] + monthly["vpp_operational_net_value_AUD"]
+        )
+
+    # --- Metric tahunan (dipakai ui_helpers._render_analysis) ---
+    totals = {
+        'solar_kwh': df_year['solar_output_kw'].sum() * DT_HOURS,
+        'load_kwh':  df_year[col_load].sum() * DT_HOURS,
+    }
+    if 'grid_net_kw' in df_year.columns:
+        totals['grid_import_kwh'] = df_year['grid_net_kw'].clip(lower=0).sum() * DT_HOURS
+
+    return {
+        'hourly':                   hourly,
+        'daily':                    daily,
+        'monthly':                  monthly,
+        'monthly_pct':              monthly_pct,
+        'heatmap_vpp':              heatmap_vpp,
+        'heatmap_imp':              heatmap_imp,
+        'cumulative_vpp':           cumulative_vpp,
+        'event_df':                 event_df,
+        'dispatch_price_threshold': dispatch_price_threshold,
+        'has_vpp_status':           has_vpp_status,
+        'has_vpp_export':           'vpp_grid_export_kw' in df_year.columns,
+        'totals':                   totals,
+    }
+
+
+def build_cube(df_result, col_bat=None):
+    """
+    Cube untuk semua tahun di df_result: {tahun: build_year_cube(...)}.
+    df_result harus terurut waktu (output run_simulation).
+    """
+    col_bat = col_bat or get_bat_column(df_result)
+    years = df_result['timestamp'].to_numpy().astype('datetime64[Y]').astype(np.int64) + 1970
+    starts = _group_starts(years)
+    bounds = np.r_[starts, len(years)]
+    return {
+        int(years[a]): build_year_cube(df_result.iloc[a:b], col_bat)
+        for a, b in zip(bounds[:-1], bounds[1:])
+    }
@@ -0,0 +1,176 @@
+"""
+modules/batch_generate.py
+Generate dataset mahasiswa 1 cohort sekaligus tanpa Streamlit (headless).
+
+Parameter tiap NIM di-resolve persis seperti tombol Generate di main.py
+(param_resolver + seed dari student_log.generate_seed), sehingga file yang
+dihasilkan identik dengan download mahasiswa untuk config yang sama.
+
+    python -m modules.batch_generate "Exam Config 1" z5593968 z5593969
+    python -m modules.batch_generate "Exam Config 1" --nims-file nims.txt \\
+        --assignment assignment_2 --format partitioned --out output/exam1
+
+Config dibaca dari storage (nama + assignment), atau dari file JSON berisi
+1 baris config_history (--config-file) untuk dipakai offline.
+
+Output (--out):
+- csv / csv.gz / parquet : Data_{NIM}_{region}_{titik}_{tahun}{ext} per mahasiswa
+- partitioned            : nim={NIM}/part-0.parquet (partisi Parquet gaya hive)
+- _params.jsonl          : 1 baris per NIM (seed, file, used_params / error)
+
+Tiap NIM dikerjakan di process pool (--workers, default jumlah CPU).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from modules import calculator, exporter
+from modules import config as cfg
+from modules import student_log as s_log
+from modules import assignment as asgn
+from modules import param_resolver as p_res
+
+OUTPUT_FORMATS = ("csv", "csv.gz", "parquet", "partitioned")
+INDEX_FILE     = "_params.jsonl"     # prefix _ -> diabaikan pembaca dataset Parquet
+
+
+def _quiet():
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+
+
+def _init_worker():
+    _quiet()
+    calculator.warmup_kernels()
+
+
+def _output_path(out_dir, fmt, nim, resolved):
+    if fmt == "partitioned":
+        return os.path.join(out_dir, f"nim={nim}", "part-0.parquet")
+    info = f"{resolved['region']}_{resolved['point']}_{resolved['start_year']}-{resolved['end_year']}"
+    return os.path.join(out_dir, f"Data_{nim}_{info}{exporter.EXPORT_FORMATS[fmt][1]}")
+
+
+def generate_one(nim, seed_val, state, assignment_type, out_dir, fmt):
+    """Resolve + simulasi + tulis file untuk 1 NIM. Return dict untuk _params.jsonl."""
+    p_res.seed_all(seed_val)
+    resolved = p_res.resolve_generate(state, assignment_type)
+    df_result = p_res.run_resolved(state, resolved)
+    if df_result is None:
+        raise ValueError(f"Dataset failed to load: {resolved['region']}/{resolved['point']}")
+
+    path = _output_path(out_dir, fmt, nim, resolved)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        exporter.write_export(df_result, assignment_type, "parquet" if fmt == "partitioned" else fmt, fh)
+
+    return {
+        'nim':         nim,
+        'seed':        seed_val,
+        'file':        os.path.relpath(path, out_dir),
+        'rows':        len(df_result),
+        'used_params': resolved['used_params'],
+    }
+
+
+def _generate_safe(nim, seed_val, state, assignment_type, out_dir, fmt):
+    try:
+        return generate_one(nim, seed_val, state, assignment_type, out_dir, fmt)
+    except Exception as e:
+        return {'nim': nim, 'seed': seed_val, 'error': f"{type(e).__name__}: {e}"}
+
+
+def generate_cohort(config_name, nims, state, assignment_type, out_dir, fmt="csv", workers=None):
+    """Generate dataset semua NIM. Return list hasil per NIM (urutan sama dengan `nims`)."""
+
+    nims = list(dict.fromkeys(str(n).strip().upper() for n in nims if str(n).strip()))
+    tasks = [(nim, s_log.generate_seed(nim, config_name)) for nim in nims]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    os.makedirs(out_dir, exist_ok=True)
+
+    results = {}
+    if workers == 1:
+        _init_worker()
+        for nim, seed_val in tasks:
+            results[nim] = _generate_safe(nim, seed_val, state, assignment_type, out_dir, fmt)
+            _report(results[nim], len(results), len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(_generate_safe, nim, seed_val, state, assignment_type, out_dir, fmt)
+                for nim, seed_val in tasks
+            ]
+            for fut in as_completed(futures):
+                res = fut.result()
+                results[res['nim']] = res
+                _report(res, len(results), len(tasks))
+
+    ordered = [results[nim] for nim, _ in tasks]
+    with open(os.path.join(out_dir, INDEX_FILE), "w") as f:
+        for res in ordered:
+            f.write(json.dumps(res, default=str) + "\n")
+    return ordered
+
+
+def _report(res, done, total):
+    status = f"❌ {res['error']}" if 'error' in res else f"✅ {res['file']}"
+    print(f"[{done}/{total}] {res['nim']}: {status}", flush=True)
+
+
+def _read_nims_file(path):
+    """1 NIM per baris; untuk CSV dipakai kolom pertama. Baris header 'NIM' diabaikan."""
+    nims = []
+    with open(path) as f:
+        for line in f:
+            nim = line.split(",")[0].strip()
+            if nim and nim.upper() != "NIM":
+                nims.append(nim)
+    return nims
+
+
+def _load_state(args):
+
+    if args.config_file:
+        with open(args.config_file) as f:
+            row = json.load(f)
+    else:
+        row = cfg.get_config_by_name(args.config_name, args.assignment)
+        if row is None:
+            raise SystemExit(f"Config '{args.config_name}' ({args.assignment}) not found")
+    return cfg.build_state(row)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m modules.batch_generate", description="Generate dataset 1 cohort tanpa Streamlit")
+    parser.add_argument("config_name", help="Config_Name (bagian dari seed, sama seperti di UI)")
+    parser.add_argument("nims", nargs="*", help="daftar NIM")
+    parser.add_argument("--nims-file", help="file berisi NIM (1 per baris / kolom pertama CSV)")
+    parser.add_argument("--assignment", default=asgn.ASSIGNMENT_1, choices=asgn.ALL_ASSIGNMENTS)
+    parser.add_argument("--config-file", help="JSON 1 baris config_history (tanpa storage)")
+    parser.add_argument("--out", default=os.path.join("output", "batch"))
+    parser.add_argument("--format", default="csv", choices=OUTPUT_FORMATS)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    nims = list(args.nims) + (_read_nims_file(args.nims_file) if args.nims_file else [])
+    if not nims:
+        parser.error("no NIM given")
+
+    _quiet()
+    state = _load_state(args)
+    t0 = time.perf_counter()
+    results = generate_cohort(args.config_name, nims, state, args.assignment,
+                              args.out, args.format, args.workers)
+    n_err = sum('error' in r for r in results)
+    print(f"Done: {len(results) - n_err}/{len(results)} datasets in {time.perf_counter() - t0:.1f}s -> {args.out}")
+    return 1 if n_err else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
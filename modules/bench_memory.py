@@ -0,0 +1,135 @@
+"""
+modules/bench_memory.py
+Benchmark memori 1x generate (load -> simulasi -> pack session -> CSV download).
+
+Tiap skenario dijalankan di proses terpisah agar peak RSS tidak terpengaruh
+skenario sebelumnya. Peak alokasi (tracemalloc) diukur di proses kedua karena
+tracemalloc sendiri menambah RSS:
+    python -m modules.bench_memory
+    python -m modules.bench_memory NSW "Sydney - Warm Temperate" 2022 2025 assignment_1
+
+Output per skenario:
+- rss_base : RSS setelah import modul (sebelum generate)
+- rss_peak : peak RSS proses selama generate (ru_maxrss)
+- alloc_peak: peak alokasi Python/numpy (tracemalloc) selama generate
+- result   : ukuran hasil di session (compact_result) vs DataFrame penuh
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+import tracemalloc
+import warnings
+import logging
+
+DEFAULT_SCENARIOS = [
+    ("NSW", 1, "assignment_1", "Flat"),
+    ("NSW", 4, "assignment_1", "Wholesale Price"),
+    ("NSW", 4, "assignment_2", "Time of Use"),
+]
+
+
+def _rss_now_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+
+
+def _params(scheme, region):
+    from datetime import time as dtime
+    from modules import loader
+    return {
+        'solar_capacity_kw': 6.6, 'temp_coeff': -0.004, 'pr': 0.8,
+        't_offpeak_start': dtime(22, 0), 't_offpeak_end': dtime(6, 0),
+        't_peak_start': dtime(17, 0), 't_peak_end': dtime(20, 0),
+        't_shoulder_start': dtime(14, 0), 't_shoulder_end': dtime(17, 0),
+        'tariff_scheme': scheme, 'df_wholesale_fees': loader.get_wholesale_fees(region),
+        'export_price': 0.08, 'import_flat': 0.30,
+        'peak_price': 0.45, 'offpeak_price': 0.15, 'shoulder_price': 0.25,
+        'exp_peak': 0.15, 'exp_offpeak': 0.05, 'exp_shoulder': 0.10,
+        'battery_capacity_kwh': 10.0, 'battery_efficiency': 0.95, 'battery_initial_soc': 0.5,
+        'max_charge_kw': 5.0, 'max_discharge_kw': 5.0, 'soc_min_pct': 0.1, 'soc_max_pct': 0.9,
+        'dispatch_price_threshold': 300,
+    }
+
+
+def run_one(region, point, start_year, end_year, assignment_type, scheme, trace=False):
+    """1x generate di proses ini. Return dict hasil pengukuran (alloc_peak hanya jika trace)."""
+    warnings.filterwarnings("ignore"); logging.disable(logging.WARNING)
+    from modules import loader, calculator, exporter, compact_result
+
+    load_file = loader.get_list_load_profiles()[0]
+    calculator.warmup_kernels()
+    rss_base = _rss_now_mb()
+
+    if trace: tracemalloc.start()
+    t0 = time.perf_counter()
+    df_input = loader.load_and_merge_data(region, point, start_year, end_year, fixed_load_file=load_file)
+    df_input['load_profile'] = df_input['load_profile'] * 15.0
+    df_result = calculator.run_simulation(df_input, _params(scheme, region), assignment_type)
+    del df_input
+    result_mb = df_result.memory_usage(deep=True).sum() / 1024 ** 2
+    packed = compact_result.pack(df_result)
+    del df_result
+    csv_mb = len(exporter.lazy_csv(packed, assignment_type)().getvalue()) / 1024 ** 2
+    elapsed = time.perf_counter() - t0
+    alloc_peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    tracemalloc.stop()
+
+    return {
+        'scenario':      f"{region}/{point} {start_year}-{end_year} {assignment_type} {scheme}",
+        'rows':          len(packed),
+        'seconds':       round(elapsed, 2),
+        'rss_base_mb':   round(rss_base, 1),
+        'rss_peak_mb':   round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'alloc_peak_mb': round(alloc_peak / 1024 ** 2, 1),
+        'result_df_mb':  round(result_mb, 1),
+        'session_mb':    round(packed.nbytes / 1024 ** 2, 1),
+        'csv_mb':        round(csv_mb, 1),
+    }
+
+
+def _default_scenarios():
+    from modules import loader
+    out = []
+    for region, n_years, asg, scheme in DEFAULT_SCENARIOS:
+        points = loader.get_list_titik(region)
+        years  = loader.get_available_years(region, points[0]) if points else []
+        if len(years) < n_years: continue
+        out.append((region, points[0], years[0], years[n_years - 1], asg, scheme))
+    return out
+
+
+def main(argv):
+    if argv and argv[0] in ("--child", "--child-trace"):
+        region, point, sy, ey, asg, scheme = argv[1:7]
+        print(json.dumps(run_one(region, point, int(sy), int(ey), asg, scheme, trace=argv[0] == "--child-trace")))
+        return
+
+    if argv:
+        scenarios = [(argv[0], argv[1], int(argv[2]), int(argv[3]),
+                      argv[4] if len(argv) > 4 else "assignment_1",
+                      argv[5] if len(argv) > 5 else "Wholesale Price")]
+    else:
+        scenarios = _default_scenarios()
+
+    def _child(flag, sc):
+        out = subprocess.run(
+            [sys.executable, "-m", "modules.bench_memory", flag, *map(str, sc)],
+            capture_output=True, text=True, check=True,
+        )
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    for sc in scenarios:
+        res = _child("--child", sc)
+        res['alloc_peak_mb'] = _child("--child-trace", sc)['alloc_peak_mb']
+        print(f"{res['scenario']}  rows={res['rows']}  {res['seconds']}s")
+        print(f"    RSS base {res['rss_base_mb']} MB -> peak {res['rss_peak_mb']} MB "
+              f"(+{res['rss_peak_mb'] - res['rss_base_mb']:.1f})  alloc peak {res['alloc_peak_mb']} MB")
+        print(f"    result DataFrame {res['result_df_mb']} MB, session {res['session_mb']} MB, CSV {res['csv_mb']} MB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,44 @@
+"""
+modules/build_kernels.py
+Build step AOT (ahead-of-time) untuk kernel numba di calculator.py.
+
+Jalankan sekali saat build/deploy image:
+    python -m modules.build_kernels
+
+Hasilnya modul ekstensi modules/_calculator_aot.*.so beserta file hash source.
+calculator.py otomatis memakai modul ini saat import; jika belum di-build
+atau source kernel sudah berubah (hash beda), calculator fallback ke JIT.
+"""
+
+import os
+from numba.pycc import CC
+
+from modules import calculator
+
+
+def build(output_dir=None):
+    """Compile kernel ke modul ekstensi dan tulis hash source-nya."""
+    output_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+
+    cc = CC(calculator.AOT_MODULE_NAME)
+    cc.output_dir = output_dir
+    cc.verbose = False
+
+    cc.export("simulate_battery", calculator.SIG_SIMULATE_BATTERY)(
+        calculator.simulate_battery_numba.py_func
+    )
+    cc.export("calculate_extra_import", calculator.SIG_EXTRA_IMPORT)(
+        calculator.calculate_extra_import_numba.py_func
+    )
+    cc.compile()
+
+    hash_path = os.path.join(output_dir, calculator.AOT_MODULE_NAME + ".hash")
+    with open(hash_path, "w") as f:
+        f.write(calculator.kernel_source_hash())
+
+    return hash_path
+
+
+if __name__ == "__main__":
+    path = build()
+    print(f"✅ AOT kernels built: {path}")
@@ -1,6 +1,12 @@
+import os
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-from numba import jit
+from numba import jit, prange
 
 MODE_SHOULDER = 0  
 MODE_CHARGE   = 1 
@@ -8,7 +14,7 @@ MODE_DISCHARGE= 2
 MODE_PEAK     = 3  
 
 @jit(nopython=True, cache=True)
-def simulate_battery_numba(
+def _simulate_battery_core(
     net_load_arr,      
     spot_price_arr,       
     tariff_import_arr,    
@@ -23,13 +29,17 @@ def simulate_battery_numba(
     max_soc_pct,     
     max_chg_kw,      
     max_dis_kw,      
-    eff_roundtrip    
+    eff_roundtrip,
+    soc_tracker,
+    bat_power_out
 ):
+    """
+    Inti loop fisika baterai. Menulis hasil langsung ke soc_tracker & bat_power_out
+    (boleh berupa view baris dari matriks) agar bisa dipakai bersama oleh
+    simulate_battery_numba (1 skenario) dan simulate_battery_batch_numba (banyak skenario).
+    """
     n = len(net_load_arr)
     
-    soc_tracker = np.zeros(n)
-    bat_power_out = np.zeros(n) 
-    
     current_kwh = bat_cap * init_soc_pct
     min_kwh = bat_cap * min_soc_pct
     max_kwh = bat_cap * max_soc_pct
@@ -147,9 +157,144 @@ def simulate_battery_numba(
             soc_tracker[i] = (current_kwh / bat_cap) * 100.0
         else:
             soc_tracker[i] = 0.0
+
+
+@jit(nopython=True, cache=True)
+def simulate_battery_numba(
+    net_load_arr,      
+    spot_price_arr,       
+    tariff_import_arr,    
+    is_offpeak_arr,      
+    is_peak_arr,        
+    is_shoulder_arr,    
+    is_vpp_arr,          
+    tariff_mode_int,     
+    bat_cap,           
+    init_soc_pct,     
+    min_soc_pct,       
+    max_soc_pct,     
+    max_chg_kw,      
+    max_dis_kw,      
+    eff_roundtrip    
+):
+    n = len(net_load_arr)
+    
+    soc_tracker = np.zeros(n)
+    bat_power_out = np.zeros(n) 
+
+    _simulate_battery_core(
+        net_load_arr, spot_price_arr, tariff_import_arr,
+        is_offpeak_arr, is_peak_arr, is_shoulder_arr, is_vpp_arr,
+        tariff_mode_int, bat_cap, init_soc_pct, min_soc_pct, max_soc_pct,
+        max_chg_kw, max_dis_kw, eff_roundtrip,
+        soc_tracker, bat_power_out
+    )
             
     return soc_tracker, bat_power_out
 
+
+# =====================================================================
+# BATCH MULTI-SKENARIO (1 kernel, paralel per skenario)
+# =====================================================================
+# API mandiri untuk sweep parameter baterai di atas 1 input yang sama (semua
+# skenario harus sepanjang n_steps). Tidak dipakai run_simulation maupun
+# batch_generate: tiap NIM punya lokasi/periode/load sendiri (panjang & deret
+# berbeda), sehingga cohort diparalelkan per proses, bukan per baris kernel.
+@jit(nopython=True, parallel=True, cache=True)
+def simulate_battery_batch_numba(
+    net_load_2d,
+    spot_price_2d,
+    tariff_import_2d,
+    is_offpeak_2d,
+    is_peak_2d,
+    is_shoulder_2d,
+    is_vpp_2d,
+    tariff_mode_arr,
+    bat_cap_arr,
+    init_soc_arr,
+    min_soc_arr,
+    max_soc_arr,
+    max_chg_arr,
+    max_dis_arr,
+    eff_arr
+):
+    """
+    Versi batch dari simulate_battery_numba.
+    Semua input deret waktu berbentuk (n_scenarios, n_steps), parameter baterai
+    berbentuk (n_scenarios,). Tiap skenario independen sehingga di-prange per baris.
+    Return: (soc_pct, bat_power) masing-masing (n_scenarios, n_steps).
+    """
+    n_scen, n_steps = net_load_2d.shape
+
+    soc_out = np.zeros((n_scen, n_steps))
+    power_out = np.zeros((n_scen, n_steps))
+
+    for s in prange(n_scen):
+        _simulate_battery_core(
+            net_load_2d[s], spot_price_2d[s], tariff_import_2d[s],
+            is_offpeak_2d[s], is_peak_2d[s], is_shoulder_2d[s], is_vpp_2d[s],
+            tariff_mode_arr[s], bat_cap_arr[s], init_soc_arr[s],
+            min_soc_arr[s], max_soc_arr[s], max_chg_arr[s], max_dis_arr[s], eff_arr[s],
+            soc_out[s], power_out[s]
+        )
+
+    return soc_out, power_out
+
+
+def simulate_battery_batch(
+    net_load_2d,
+    spot_price,
+    tariff_import,
+    is_offpeak,
+    is_peak,
+    is_shoulder,
+    is_vpp,
+    tariff_mode,
+    bat_cap,
+    init_soc_pct,
+    min_soc_pct,
+    max_soc_pct,
+    max_chg_kw,
+    max_dis_kw,
+    eff_roundtrip
+):
+    """
+    Wrapper Python untuk simulate_battery_batch_numba.
+    - net_load_2d wajib (n_scenarios, n_steps).
+    - Deret lain boleh 1-D (dipakai bersama semua skenario) atau 2-D.
+    - Parameter baterai boleh skalar (sama untuk semua) atau array (n_scenarios,).
+    """
+    net_load_2d = np.ascontiguousarray(net_load_2d, dtype=np.float64)
+    if net_load_2d.ndim != 2:
+        raise ValueError("net_load_2d harus berbentuk (n_scenarios, n_steps)")
+    shape = net_load_2d.shape
+    n_scen = shape[0]
+
+    # Deret 1-D di-broadcast sebagai view (stride 0), tanpa menyalin per skenario
+    def _series(arr, dtype):
+        return np.broadcast_to(np.asarray(arr, dtype=dtype), shape)
+
+    def _per_scen(val, dtype):
+        return np.ascontiguousarray(np.broadcast_to(np.asarray(val, dtype=dtype), (n_scen,)))
+
+    return simulate_battery_batch_numba(
+        net_load_2d,
+        _series(spot_price, np.float64),
+        _series(tariff_import, np.float64),
+        _series(is_offpeak, np.bool_),
+        _series(is_peak, np.bool_),
+        _series(is_shoulder, np.bool_),
+        _series(is_vpp, np.bool_),
+        _per_scen(tariff_mode, np.int64),
+        _per_scen(bat_cap, np.float64),
+        _per_scen(init_soc_pct, np.float64),
+        _per_scen(min_soc_pct, np.float64),
+        _per_scen(max_soc_pct, np.float64),
+        _per_scen(max_chg_kw, np.float64),
+        _per_scen(max_dis_kw, np.float64),
+        _per_scen(eff_roundtrip, np.float64),
+    )
+
 # =====================================================================
 # FUNGSI NUMBA UNTUK EXTRA IMPORT VPP 
 # =====================================================================
@@ -208,6 +353,78 @@ def calculate_extra_import_numba(vpp_discharge_arr, bat_power_arr, grid_net_arr,
     return arr_extra_import
 
 
+# =====================================================================
+# SIGNATURE EKSPLISIT, MODUL AOT & WARM-UP
+# =====================================================================
+# Tipe persis seperti yang dikirim run_simulation_full (array C-contiguous,
+# skalar float64/int64). Dipakai oleh warmup_kernels() dan build_kernels.py.
+SIG_SIMULATE_BATTERY = (
+    "UniTuple(float64[::1], 2)("
+    "float64[::1], float64[::1], float64[::1], "
+    "boolean[::1], boolean[::1], boolean[::1], boolean[::1], "
+    "int64, float64, float64, float64, float64, float64, float64, float64)"
+)
+SIG_EXTRA_IMPORT = (
+    "float64[::1](boolean[::1], float64[::1], float64[::1], float64[::1], float64)"
+)
+
+AOT_MODULE_NAME = "_calculator_aot"
+AOT_HASH_FILE   = os.path.join(os.path.dirname(os.path.abspath(__file__)), AOT_MODULE_NAME + ".hash")
+
+
+def kernel_source_hash():
+    """Hash source kernel numba — modul AOT hanya dipakai jika hash-nya sama."""
+    h = hashlib.sha256()
+    for fn in (_simulate_battery_core, simulate_battery_numba, calculate_extra_import_numba):
+        h.update(inspect.getsource(fn.py_func).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _load_aot_module():
+    """
+    Import modul hasil build AOT (python -m modules.build_kernels).
+    Fallback ke JIT jika modul belum di-build atau sudah basi (source kernel berubah).
+    """
+    try:
+        from modules import _calculator_aot as aot
+        with open(AOT_HASH_FILE) as f:
+            if f.read().strip() != kernel_source_hash():
+                return None
+        return aot
+    except (ImportError, OSError):
+        return None
+
+
+_AOT = _load_aot_module()
+
+if _AOT is not None:
+    _battery_kernel      = _AOT.simulate_battery
+    _extra_import_kernel = _AOT.calculate_extra_import
+else:
+    _battery_kernel      = simulate_battery_numba
+    _extra_import_kernel = calculate_extra_import_numba
+
+
+def warmup_kernels():
+    """
+    Compile kernel JIT sesuai signature eksplisit lalu jalankan sekali dengan
+    data dummy, agar klik "Generate Data" pertama tidak menanggung waktu compile.
+    Aman dipanggil dari background thread; jika modul AOT aktif hanya
+    menjalankan dummy call (tanpa compile).
+    """
+    if _AOT is None:
+        simulate_battery_numba.compile(SIG_SIMULATE_BATTERY)
+        calculate_extra_import_numba.compile(SIG_EXTRA_IMPORT)
+
+    n = 288
+    f_zero = np.zeros(n)
+    b_zero = np.zeros(n, dtype=np.bool_)
+    _battery_kernel(f_zero, f_zero, f_zero, b_zero, b_zero, b_zero, b_zero,
+                    0, 10.0, 0.5, 0.1, 0.9, 5.0, 5.0, 0.95)
+    _extra_import_kernel(b_zero, f_zero, f_zero, f_zero, 5.0 / 60.0)
+    return _AOT is not None
+
+
 def get_time_mask(time_float_arr, start_t, end_t):
     """
     Membuat array True/False apakah jam saat ini masuk rentang waktu.
@@ -222,93 +439,252 @@ def get_time_mask(time_float_arr, start_t, end_t):
         return (time_float_arr >= s_val) | (time_float_arr < e_val)
 
 
-def _compute_tariffs(df_res: pd.DataFrame, scheme: str, params: dict) -> None:
+def _mask_float(arr, s, e):
+    """Seperti get_time_mask, tapi s == e berarti rentang kosong (dipakai tarif ToU)."""
+    if s < e:   return (arr >= s) & (arr < e)
+    elif s > e: return (arr >= s) | (arr < e)
+    else:       return np.zeros(len(arr), dtype=bool)
+
+
+def _time_to_float(t):
+    return t.hour + t.minute / 60.0
+
+
+# =====================================================================
+# SLOT WAKTU HARIAN (LOOKUP TABLE)
+# =====================================================================
+# Data 5-menit -> tiap baris punya slot 0..287 (int16) yang dihitung sekali
+# per dataset. Mask periode (offpeak/peak/shoulder) dan tarif ToU dihitung
+# untuk 288 slot saja, lalu diambil per baris dengan 1 gather lut[slot].
+# Nilai LUT memakai time_float yang sama persis (jam + menit/60) dengan
+# versi per baris. Jika ada timestamp yang tidak rata 5 menit, resolusi slot
+# turun ke 1 menit (1440 slot) agar hasil tetap identik.
+SLOT_MINUTES   = 5
+MINUTES_PER_DAY = 24 * 60
+NS_PER_MINUTE  = 60 * 10**9
+
+
+def slot_of_day(timestamps):
+    """(slot int16 per baris, menit per slot). Detik diabaikan, sama seperti dt.hour/dt.minute."""
+    ns = np.asarray(timestamps, dtype='datetime64[ns]').astype(np.int64)
+    minute_of_day = (ns // NS_PER_MINUTE) % MINUTES_PER_DAY
+    if np.all(minute_of_day % SLOT_MINUTES == 0):
+        return (minute_of_day // SLOT_MINUTES).astype(np.int16), SLOT_MINUTES
+    return minute_of_day.astype(np.int16), 1
+
+
+@lru_cache(maxsize=None)
+def _slot_time_float(slot_minutes):
+    """time_float (jam + menit/60) untuk awal tiap slot dalam sehari."""
+    minutes = np.arange(0, MINUTES_PER_DAY, slot_minutes)
+    time_float = (minutes // 60) + (minutes % 60) / 60.0
+    time_float.setflags(write=False)
+    return time_float
+
+
+@lru_cache(maxsize=64)
+def _time_mask_lut(slot_minutes, start_t, end_t):
+    lut = get_time_mask(_slot_time_float(slot_minutes), start_t, end_t)
+    lut.setflags(write=False)
+    return lut
+
+
+@lru_cache(maxsize=64)
+def _tou_tariff_luts(slot_minutes, peak_range, shoulder_range, import_prices, export_prices):
+    """LUT (import, export) per slot. *_range = (start_float, end_float); *_prices = (peak, shoulder, offpeak)."""
+    time_float = _slot_time_float(slot_minutes)
+    cond_peak     = _mask_float(time_float, *peak_range)
+    cond_shoulder = _mask_float(time_float, *shoulder_range)
+    luts = []
+    for peak, shoulder, offpeak in (import_prices, export_prices):
+        lut = np.select([cond_peak, cond_shoulder], [peak, shoulder], default=offpeak).astype(np.float64)
+        lut.setflags(write=False)
+        luts.append(lut)
+    return tuple(luts)
+
+
+# =====================================================================
+# TABEL FEE WHOLESALE PER FINANCIAL YEAR
+# =====================================================================
+# FY diindeks dengan 2 digit tahun awal FY (fy_start % 100): label "23/24"
+# -> index 23. Kolom: Market_Fee, Network_Fee, Other_Fee. FY yang tidak ada
+# di tabel bernilai 0 (sama dengan .map(...).fillna(0) sebelumnya).
+FEE_COLS = ('Market_Fee', 'Network_Fee', 'Other_Fee')
+
+_fee_table_memo = {}
+
+
+def build_fee_table(df_fees: pd.DataFrame) -> np.ndarray:
+    """Compile tabel fee (hasil loader.get_wholesale_fees) menjadi array (100, 3)."""
+    table = np.zeros((100, len(FEE_COLS)), dtype=np.float64)
+    for label, row in zip(df_fees['FY_Year'].astype(str), df_fees[list(FEE_COLS)].to_numpy(dtype=np.float64)):
+        yy = label[:2]
+        if yy.isdigit() and label == f"{int(yy):02d}/{(int(yy) + 1) % 100:02d}":
+            table[int(yy)] = np.nan_to_num(row)   # baris duplikat: yang terakhir menang
+    table.setflags(write=False)
+    return table
+
+
+def _get_fee_table(df_fees: pd.DataFrame) -> np.ndarray:
+    """build_fee_table dengan memo per isi tabel (praktis sekali per region per proses)."""
+    key = _param_token(df_fees)
+    table = _fee_table_memo.get(key)
+    if table is None:
+        table = _fee_table_memo[key] = build_fee_table(df_fees)
+    return table
+
+
+def fy_codes(timestamps) -> np.ndarray:
+    """
+    Kode FY per baris (tahun awal FY % 100); FY dimulai 1 Juli.
+    Tanpa komponen tanggal per baris: cukup searchsorted ke daftar tanggal 1 Juli.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    if len(ts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    y_min = int(ts.min().astype('datetime64[Y]').astype(np.int64)) + 1970
+    y_max = int(ts.max().astype('datetime64[Y]').astype(np.int64)) + 1970
+    july_1 = np.array([f"{y}-07-01" for y in range(y_min, y_max + 1)], dtype='datetime64[ns]')
+    fy_start = y_min - 1 + np.searchsorted(july_1, ts, side='right')
+    return fy_start % 100
+
+
+def _tariff_arrays(timestamps: pd.Series, price_profile, scheme: str, params: dict, slots=None):
+    """
+    Array (tariff_import, tariff_export) AUD/kWh per baris untuk skema tarif aktif.
+    slots = hasil slot_of_day(timestamps) jika sudah ada (dipakai skema ToU).
+    """
+    n = len(timestamps)
 
     if scheme == 'Wholesale Price':
         df_fees = params.get('df_wholesale_fees', pd.DataFrame())
-        if 'price_profile' in df_res.columns and not df_fees.empty:
-            spot_kwh    = df_res['price_profile'] / 1000.0
-            years       = df_res['timestamp'].dt.year
-            months      = df_res['timestamp'].dt.month
-            fy_start_yr = np.where(months >= 7, years, years - 1)
-            fy_str = (
-                (pd.Series(fy_start_yr) % 100).astype(str).str.zfill(2)
-                + '/'
-                + ((pd.Series(fy_start_yr) + 1) % 100).astype(str).str.zfill(2)
-            )
-            m_map = df_fees.set_index('FY_Year')['Market_Fee'].to_dict()
-            n_map = df_fees.set_index('FY_Year')['Network_Fee'].to_dict()
-            o_map = df_fees.set_index('FY_Year')['Other_Fee'].to_dict()
-            m_fee = fy_str.map(m_map).fillna(0).values
-            n_fee = fy_str.map(n_map).fillna(0).values
-            o_fee = fy_str.map(o_map).fillna(0).values
-            df_res['tariff_import_AUD'] = spot_kwh + m_fee + n_fee + o_fee
-            df_res['tariff_export_AUD'] = spot_kwh + m_fee
-        else:
-            df_res['tariff_import_AUD'] = 0.0
-            df_res['tariff_export_AUD'] = 0.0
+        if price_profile is not None and not df_fees.empty:
+            spot_kwh = np.asarray(price_profile, dtype=np.float64) / 1000.0
+            fees     = _get_fee_table(df_fees)[fy_codes(timestamps)]   # 1 gather: (n, 3)
+            m_fee, n_fee, o_fee = fees[:, 0], fees[:, 1], fees[:, 2]
+            return spot_kwh + m_fee + n_fee + o_fee, spot_kwh + m_fee
+        return np.zeros(n), np.zeros(n)
 
     elif scheme == 'Time of Use':
-        timestamps_local  = df_res['timestamp']
-        time_float_tariff = (
-            timestamps_local.dt.hour + timestamps_local.dt.minute / 60.0
-        ).to_numpy(dtype=np.float64)
-
-        def _mask_float(arr, s, e):
-            if s < e:   return (arr >= s) & (arr < e)
-            elif s > e: return (arr >= s) | (arr < e)
-            else:       return np.zeros(len(arr), dtype=bool)
-
-        p_start_f = params['t_peak_start'].hour     + params['t_peak_start'].minute / 60.0
-        p_end_f   = params['t_peak_end'].hour       + params['t_peak_end'].minute   / 60.0
-        s_start_f = params['t_shoulder_start'].hour + params['t_shoulder_start'].minute / 60.0
-        s_end_f   = params['t_shoulder_end'].hour   + params['t_shoulder_end'].minute   / 60.0
-
-        cond_peak     = _mask_float(time_float_tariff, p_start_f, p_end_f)
-        cond_shoulder = _mask_float(time_float_tariff, s_start_f, s_end_f)
-
-        df_res['tariff_import_AUD'] = np.select(
-            [cond_peak, cond_shoulder],
-            [params['peak_price'], params['shoulder_price']],
-            default=params['offpeak_price']
-        )
-        df_res['tariff_export_AUD'] = np.select(
-            [cond_peak, cond_shoulder],
-            [params.get('exp_peak', 0.0), params.get('exp_shoulder', 0.0)],
-            default=params.get('exp_offpeak', 0.0)
+        slot, slot_minutes = slots if slots is not None else slot_of_day(timestamps)
+        lut_import, lut_export = _tou_tariff_luts(
+            slot_minutes,
+            (_time_to_float(params['t_peak_start']),     _time_to_float(params['t_peak_end'])),
+            (_time_to_float(params['t_shoulder_start']), _time_to_float(params['t_shoulder_end'])),
+            (params['peak_price'], params['shoulder_price'], params['offpeak_price']),
+            (params.get('exp_peak', 0.0), params.get('exp_shoulder', 0.0), params.get('exp_offpeak', 0.0)),
         )
+        return lut_import[slot], lut_export[slot]
 
     else:  # Default: Flat
-        df_res['tariff_import_AUD'] = params['import_flat']
-        df_res['tariff_export_AUD'] = params['export_price']
+        return np.full(n, params['import_flat']), np.full(n, params['export_price'])
 
 
-def _round_export(df_export: pd.DataFrame,
-                  tariff_cols: list,
-                  monetary_cols: list = None) -> pd.DataFrame:
-
-    monetary_cols = monetary_cols or []
-    bool_cols     = ['vpp_status', 'vpp_charge']
-
-    skip = set(tariff_cols) | set(monetary_cols) | set(bool_cols) | {'timestamp'}
-    other_numeric = [
-        c for c in df_export.columns
-        if c not in skip
-        and pd.api.types.is_numeric_dtype(df_export[c])
-    ]
-
-    # Bangun spec dict sekali, lalu satu panggilan .round()
-    round_spec = {}
-    round_spec.update({c: 5 for c in tariff_cols  if c in df_export.columns})
-    round_spec.update({c: 6 for c in monetary_cols if c in df_export.columns})
-    round_spec.update({c: 2 for c in other_numeric})
+# =====================================================================
+# ENGINE BERTAHAP + CACHE STAGE
+# =====================================================================
+# run_simulation_full dipecah menjadi stage:
+#   solar (+ net load) -> tariff -> dispatch (baterai + extra import) -> accounting
+# Key tiap stage = hash data input + hanya params yang dibaca stage tsb
+# (+ key stage sebelumnya). Stage dengan key sama diambil dari cache, sehingga
+# edit tarif saja hanya menjalankan ulang tariff + accounting. Dispatch ikut
+# dihitung ulang hanya pada skema Wholesale (kernel membaca tariff_import).
+STAGE_PARAMS = {
+    'solar': ('solar_capacity_kw', 'temp_coeff', 'pr'),
+    'dispatch': (
+        'tariff_scheme', 'dispatch_price_threshold',
+        't_offpeak_start', 't_offpeak_end', 't_peak_start', 't_peak_end',
+        't_shoulder_start', 't_shoulder_end',
+        'battery_capacity_kwh', 'battery_initial_soc', 'soc_min_pct', 'soc_max_pct',
+        'max_charge_kw', 'max_discharge_kw', 'battery_efficiency',
+    ),
+}
+TARIFF_PARAMS = {
+    'Flat':            ('import_flat', 'export_price'),
+    'Time of Use':     ('t_peak_start', 't_peak_end', 't_shoulder_start', 't_shoulder_end',
+                        'peak_price', 'shoulder_price', 'offpeak_price',
+                        'exp_peak', 'exp_shoulder', 'exp_offpeak'),
+    'Wholesale Price': ('df_wholesale_fees',),
+}
+STAGE_CACHE_ENTRIES = 4     # entry per stage (LRU)
+
+_stage_cache = {}
+_stage_stats = {}
+_stage_lock  = threading.Lock()
+
+
+def _param_token(value):
+    if isinstance(value, pd.DataFrame):
+        return hashlib.blake2b(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes(),
+                               digest_size=16).hexdigest()
+    return repr(value)
+
+
+def _stage_key(*parts, params=None, names=()):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(str(part).encode("utf-8")); h.update(b"|")
+    for name in names:
+        h.update(f"{name}={_param_token(params.get(name))}|".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _data_key(df):
+    """Hash isi kolom input (timestamp, irradiance, temperature, load, price)."""
+    h = hashlib.blake2b(digest_size=16)
+    for col in ('timestamp', 'irradiance', 'temperature', 'load_profile', 'price_import', 'price_profile'):
+        if col in df.columns:
+            h.update(col.encode("utf-8"))
+            h.update(np.ascontiguousarray(df[col].to_numpy()).view(np.uint8))
+    return h.hexdigest()
+
+
+def _cached_stage(stage, key, compute):
+    """Ambil hasil stage dari cache atau hitung (array disimpan read-only)."""
+    with _stage_lock:
+        entries = _stage_cache.setdefault(stage, OrderedDict())
+        stats   = _stage_stats.setdefault(stage, {'hits': 0, 'misses': 0})
+        if key in entries:
+            entries.move_to_end(key)
+            stats['hits'] += 1
+            return entries[key]
+        stats['misses'] += 1
+
+    value = compute()
+    for arr in value.values():
+        if isinstance(arr, np.ndarray): arr.flags.writeable = False
+
+    with _stage_lock:
+        entries[key] = value
+        while len(entries) > STAGE_CACHE_ENTRIES:
+            entries.popitem(last=False)
+    return value
+
+
+def get_stage_stats():
+    with _stage_lock:
+        return {k: dict(v) for k, v in _stage_stats.items()}
+
+
+def clear_stage_cache():
+    with _stage_lock:
+        _stage_cache.clear()
+
+
+def _get_tariff_mode(scheme_name):
+    if scheme_name == 'Time of Use':
+        return 1
+    elif scheme_name == 'Wholesale Price':
+        return 2
+    return 0
 
-    return df_export.round(round_spec)
 
+def _price_column(df):
+    return 'price_profile' if 'price_profile' in df.columns else 'price_import'
 
-def run_simulation_full(df, params):
-    """Engine simulasi Assignment 1: Solar PV + Battery + Grid + VPP."""
 
+def _stage_solar(df, params):
+    """Output PV dan net load murni (beban - solar)."""
     arr_irr = df['irradiance'].to_numpy(dtype=np.float64)
     arr_temp = df['temperature'].to_numpy(dtype=np.float64)
     arr_load = df['load_profile'].to_numpy(dtype=np.float64)
@@ -319,149 +695,232 @@ def run_simulation_full(df, params):
     
     # Hitung Net Load Awal (Beban Murni - Solar)
     net_load_pure = arr_load - solar_kw
-    
-    df_res = df.copy()
-    if 'price_import' in df_res.columns:
-        df_res.rename(columns={'price_import': 'price_profile'}, inplace=True)
+    return {'solar_kw': solar_kw, 'net_load': net_load_pure}
 
-    # price_profile bertipe AUD/MWh, dibagi 1000 agar menjadi AUD/kWh
-    arr_spot_kwh = df_res['price_profile'].to_numpy(dtype=np.float64) / 1000.0
+
+def _stage_slots(df):
+    slot, slot_minutes = slot_of_day(df['timestamp'])
+    return {'slot': slot, 'slot_minutes': slot_minutes}
+
+
+def _stage_tariff(df, params, slots):
     scheme = params.get('tariff_scheme', 'Flat')
-    
-    _compute_tariffs(df_res, scheme, params)
+    price = df[_price_column(df)].to_numpy() if _price_column(df) in df.columns else None
+    tariff_import, tariff_export = _tariff_arrays(
+        df['timestamp'], price, scheme, params, slots=(slots['slot'], slots['slot_minutes'])
+    )
+    return {'tariff_import': tariff_import, 'tariff_export': tariff_export}
 
 
+def _stage_dispatch(df, params, slots, solar, tariff):
+    """Strategi & fisika baterai (kernel numba) + tracking extra import VPP."""
     # -------------------------------------------------------------
     # PERSIAPAN STRATEGI MODE BATERAI
     # -------------------------------------------------------------
-    timestamps = df_res['timestamp']
-    time_float = timestamps.dt.hour + timestamps.dt.minute / 60.0
-    time_float = time_float.to_numpy(dtype=np.float64)
-    
-    # 1. Siapkan Semua Array Waktu untuk ToU
-    is_offpeak = get_time_mask(time_float, params['t_offpeak_start'], params['t_offpeak_end'])
-    is_peak    = get_time_mask(time_float, params['t_peak_start'], params['t_peak_end'])
-    is_shoulder = get_time_mask(time_float, params['t_shoulder_start'], params['t_shoulder_end'])
+    slot, slot_minutes = slots['slot'], slots['slot_minutes']
+
+    # 1. Siapkan Semua Array Waktu untuk ToU (LUT per slot -> 1 gather per mask)
+    is_offpeak  = _time_mask_lut(slot_minutes, params['t_offpeak_start'], params['t_offpeak_end'])[slot]
+    is_peak     = _time_mask_lut(slot_minutes, params['t_peak_start'], params['t_peak_end'])[slot]
+    is_shoulder = _time_mask_lut(slot_minutes, params['t_shoulder_start'], params['t_shoulder_end'])[slot]
     
     # 2. Siapkan Array Harga (VPP tetap pakai raw price, Arbitrase pakai Tariff Export Matang)
-    arr_price_raw = df_res['price_profile'].to_numpy(dtype=np.float64)
+    arr_price_raw = df[_price_column(df)].to_numpy(dtype=np.float64)
+    # price_profile bertipe AUD/MWh, dibagi 1000 agar menjadi AUD/kWh
+    arr_spot_kwh = arr_price_raw / 1000.0
     vpp_thresh = params['dispatch_price_threshold']
     is_vpp_arr = arr_price_raw >= vpp_thresh
     
-    scheme_name = params.get('tariff_scheme', 'Flat')
-    if scheme_name == 'Time of Use':
-        tariff_mode_int = 1
-    elif scheme_name == 'Wholesale Price':
-        tariff_mode_int = 2
-    else:
-        tariff_mode_int = 0
-        
-    arr_tariff_import = df_res['tariff_import_AUD'].to_numpy(dtype=np.float64)
-
-    soc_pct, bat_power = simulate_battery_numba(
-        net_load_pure,
-        arr_spot_kwh,       
-        arr_tariff_import,   
-        is_offpeak,
-        is_peak,         
-        is_shoulder,      
-        is_vpp_arr,
+    tariff_mode_int = _get_tariff_mode(params.get('tariff_scheme', 'Flat'))
+
+    soc_pct, bat_power = _battery_kernel(
+        np.ascontiguousarray(solar['net_load']),
+        np.ascontiguousarray(arr_spot_kwh),
+        np.ascontiguousarray(tariff['tariff_import'], dtype=np.float64),
+        np.ascontiguousarray(is_offpeak),
+        np.ascontiguousarray(is_peak),
+        np.ascontiguousarray(is_shoulder),
+        np.ascontiguousarray(is_vpp_arr),
         tariff_mode_int,
-        params['battery_capacity_kwh'],
-        params['battery_initial_soc'],
-        params['soc_min_pct'],
-        params['soc_max_pct'],
-        params['max_charge_kw'],
-        params['max_discharge_kw'],
-        params['battery_efficiency']
+        float(params['battery_capacity_kwh']),
+        float(params['battery_initial_soc']),
+        float(params['soc_min_pct']),
+        float(params['soc_max_pct']),
+        float(params['max_charge_kw']),
+        float(params['max_discharge_kw']),
+        float(params['battery_efficiency'])
     )
-    
+
+    arr_load    = df['load_profile'].to_numpy(dtype=np.float64)
+    grid_net    = arr_load - solar['solar_kw'] - bat_power
+    soc_kwh     = (soc_pct / 100.0) * params['battery_capacity_kwh']
+
+    # Kalkulasi Extra Import Menggunakan Numba (Sangat Cepat)
+    arr_extra_import = _extra_import_kernel(
+        np.ascontiguousarray(is_vpp_arr),
+        np.ascontiguousarray(bat_power),
+        np.ascontiguousarray(grid_net),
+        np.ascontiguousarray(soc_kwh, dtype=np.float64),
+        5.0 / 60.0
+    )
+    return {
+        'soc_pct':      soc_pct,
+        'bat_power':    bat_power,
+        'soc_kwh':      soc_kwh,
+        'grid_net':     grid_net,
+        'is_vpp':       is_vpp_arr,
+        'is_charge':    arr_price_raw < 0,
+        'extra_import': arr_extra_import,
+    }
+
+
+FINAL_COLS_FULL = [
+    'timestamp', 'irradiance', 'temperature', 'load_profile', 'price_profile',
+    'solar_output_kw', 'battery_soc_pct', 'battery_soc_kwh', 'battery_power_ac_kw',
+    'grid_net_kw', 'tariff_import_AUD', 'tariff_export_AUD',
+    'vpp_status', 'vpp_charge', 'grid_import_kw', 'grid_export_kw',
+    'vpp_battery_discharge_kw', 'vpp_grid_export_kw', 'vpp_grid_import_after_discharge_kw',
+    'vpp_export_value_AUD', 'vpp_extra_import_cost_AUD', 'vpp_operational_net_value_AUD',
+    'bill_actual', 'bill_solar_only', 'bill_grid_only'
+]
+TARIFF_COLS   = ['tariff_import_AUD', 'tariff_export_AUD']
+MONETARY_COLS = [
+    'bill_actual', 'bill_solar_only', 'bill_grid_only',
+    'vpp_export_value_AUD', 'vpp_extra_import_cost_AUD', 'vpp_operational_net_value_AUD'
+]
+
+
+def _round_arrays(cols: dict, tariff_cols: list, monetary_cols: list = None, owned: set = ()) -> dict:
+    """
+    Pembulatan per kolom untuk dict kolom -> array (tanpa DataFrame perantara):
+    tarif 5 desimal, moneter 6, numerik lain 2; bool & timestamp apa adanya.
+    Kolom di `owned` (array yang dibuat sendiri oleh caller) di-round in-place,
+    kolom lain (input / cache stage) disalin sekali; jadi tiap kolom output
+    tepat 1 alokasi.
+    """
+    monetary_cols = set(monetary_cols or [])
+    tariff_cols   = set(tariff_cols)
+    skip          = {'vpp_status', 'vpp_charge', 'timestamp'}
+
+    out = {}
+    for c, v in cols.items():
+        if c in skip or v.dtype.kind not in 'iuf':
+            out[c] = v if c in owned else v.copy()
+            continue
+        decimals = 5 if c in tariff_cols else 6 if c in monetary_cols else 2
+        if c in owned and v.dtype.kind == 'f':
+            out[c] = np.round(v, decimals, out=v)
+        else:
+            out[c] = np.round(v, decimals)
+    return out
+
+
+def _result_frame(cols: dict, index) -> pd.DataFrame:
+    """DataFrame dari kolom yang sudah final, tanpa konsolidasi (tidak menyalin array)."""
+    return pd.DataFrame(cols, index=index, copy=False)
+
+
+def _stage_accounting(df, params, solar, tariff, dispatch):
+    """
+    Gabungkan hasil stage lalu hitung aliran grid, ekonomi VPP & tagihan.
+    Semua pakai array numpy (formula sama dengan versi DataFrame), DataFrame
+    hasil dibangun sekali di akhir.
+    """
+    dt_hours = 5.0 / 60.0
+
+    res = {c: df[c].to_numpy() for c in df.columns}
+    if 'price_import' in res and 'price_profile' not in res:
+        res['price_profile'] = res.pop('price_import')
+
+    tariff_import = tariff['tariff_import']
+    tariff_export = tariff['tariff_export']
+    res['tariff_import_AUD'] = tariff_import
+    res['tariff_export_AUD'] = tariff_export
+
     # -------------------------------------------------------------
-    # PENGGABUNGAN HASIL BATERAI KE DATAFRAME
+    # PENGGABUNGAN HASIL BATERAI
     # -------------------------------------------------------------
-    df_res['solar_output_kw'] = solar_kw
-    df_res['battery_power_ac_kw'] = bat_power
-    df_res['battery_soc_pct'] = soc_pct
-    
-    # Hitung Grid Net 
-    df_res['grid_net_kw'] = arr_load - solar_kw - bat_power
-    df_res['vpp_status'] = is_vpp_arr
-    
-    # Hitung Kapasitas Baterai kWh
-    df_res['battery_soc_kwh'] = (df_res['battery_soc_pct'] / 100.0) * params['battery_capacity_kwh']
-        
+    solar_kw  = solar['solar_kw']
+    bat_power = dispatch['bat_power']
+    grid_net  = dispatch['grid_net']
+    is_vpp    = dispatch['is_vpp']
+
+    res['solar_output_kw']     = solar_kw
+    res['battery_power_ac_kw'] = bat_power
+    res['battery_soc_pct']     = dispatch['soc_pct']
+    res['grid_net_kw']         = grid_net
+    res['vpp_status']          = is_vpp
+    res['battery_soc_kwh']     = dispatch['soc_kwh']
+
     # =====================================================================
     # FINALISASI KALKULASI & EKONOMI VPP
     # =====================================================================
-    dt_hours = 5.0 / 60.0
-
     # 1. Aliran Daya Dasar — dihitung dari nilai presisi penuh (belum di-round)
-    df_res['grid_import_kw'] = np.where(df_res['grid_net_kw'] > 0, df_res['grid_net_kw'], 0)
-    df_res['grid_export_kw'] = np.where(df_res['grid_net_kw'] < 0, -df_res['grid_net_kw'], 0)
-    df_res['vpp_charge'] = arr_price_raw < 0
+    grid_import = np.where(grid_net > 0, grid_net, 0)
+    grid_export = np.where(grid_net < 0, -grid_net, 0)
+    res['grid_import_kw'] = grid_import
+    res['grid_export_kw'] = grid_export
+    res['vpp_charge']     = dispatch['is_charge']
 
     # 2. Akuntansi VPP Discharge
-    df_res['vpp_battery_discharge_kw'] = np.where(
-        df_res['vpp_status'] > 0,
-        np.where(df_res['battery_power_ac_kw'] > 0, df_res['battery_power_ac_kw'], 0),
-        0
-    )
-    df_res['vpp_grid_export_kw'] = np.where(df_res['vpp_status'] > 0, df_res['grid_export_kw'], 0)
-
-    # 3. Kalkulasi Extra Import Menggunakan Numba (Sangat Cepat)
-    arr_soc_kwh = df_res['battery_soc_kwh'].to_numpy()
-    arr_extra_import = calculate_extra_import_numba(
-        df_res['vpp_status'].to_numpy() > 0,
-        df_res['battery_power_ac_kw'].to_numpy(),
-        df_res['grid_net_kw'].to_numpy(),
-        arr_soc_kwh,
-        dt_hours
-    )
-    df_res['vpp_grid_import_after_discharge_kw'] = arr_extra_import
+    vpp_grid_export = np.where(is_vpp, grid_export, 0)
+    res['vpp_battery_discharge_kw'] = np.where(is_vpp, np.where(bat_power > 0, bat_power, 0), 0)
+    res['vpp_grid_export_kw']       = vpp_grid_export
 
-    # 4. Kalkulasi Ekonomi (Financials) — semua pakai nilai presisi penuh
-    tariff_import = df_res['tariff_import_AUD']
-    tariff_export = df_res['tariff_export_AUD']
+    # 3. Extra Import (dihitung di stage dispatch)
+    extra_import = dispatch['extra_import']
+    res['vpp_grid_import_after_discharge_kw'] = extra_import
 
-    df_res['vpp_export_value_AUD'] = (df_res['vpp_grid_export_kw'] * dt_hours) * tariff_export
-    df_res['vpp_extra_import_cost_AUD'] = (df_res['vpp_grid_import_after_discharge_kw'] * dt_hours) * tariff_import
-    df_res['vpp_operational_net_value_AUD'] = df_res['vpp_export_value_AUD'] - df_res['vpp_extra_import_cost_AUD']
+    # 4. Kalkulasi Ekonomi (Financials) — semua pakai nilai presisi penuh
+    vpp_export_value = (vpp_grid_export * dt_hours) * tariff_export
+    vpp_extra_cost   = (extra_import * dt_hours) * tariff_import
+    res['vpp_export_value_AUD']          = vpp_export_value
+    res['vpp_extra_import_cost_AUD']     = vpp_extra_cost
+    res['vpp_operational_net_value_AUD'] = vpp_export_value - vpp_extra_cost
 
     # 5. Kalkulasi Perbandingan Tagihan (Bill Comparison)
-    df_res['bill_actual'] = (df_res['grid_import_kw'] * dt_hours * tariff_import) - (df_res['grid_export_kw'] * dt_hours * tariff_export)
+    res['bill_actual'] = (grid_import * dt_hours * tariff_import) - (grid_export * dt_hours * tariff_export)
 
     # Skenario Solar Only
-    col_load = 'load_profile' if 'load_profile' in df_res.columns else 'beban_rumah_kw'
-    net_solar_only = df_res[col_load] - df_res['solar_output_kw']
+    col_load = 'load_profile' if 'load_profile' in res else 'beban_rumah_kw'
+    net_solar_only = res[col_load] - solar_kw
     import_solar = np.where(net_solar_only > 0, net_solar_only, 0)
     export_solar = np.where(net_solar_only < 0, -net_solar_only, 0)
-    df_res['bill_solar_only'] = (import_solar * dt_hours * tariff_import) - (export_solar * dt_hours * tariff_export)
+    res['bill_solar_only'] = (import_solar * dt_hours * tariff_import) - (export_solar * dt_hours * tariff_export)
 
     # Skenario Grid Only
-    df_res['bill_grid_only'] = (df_res[col_load] * dt_hours) * tariff_import
+    res['bill_grid_only'] = (res[col_load] * dt_hours) * tariff_import
 
     # =====================================================================
     # DAFTAR KOLOM FINAL (FINAL COLS)
     # =====================================================================
-    final_cols = [
-        'timestamp', 'irradiance', 'temperature', 'load_profile', 'price_profile',
-        'solar_output_kw', 'battery_soc_pct', 'battery_soc_kwh', 'battery_power_ac_kw',
-        'grid_net_kw', 'tariff_import_AUD', 'tariff_export_AUD',
-        'vpp_status', 'vpp_charge', 'grid_import_kw', 'grid_export_kw',
-        'vpp_battery_discharge_kw', 'vpp_grid_export_kw', 'vpp_grid_import_after_discharge_kw',
+    owned = {
+        'grid_import_kw', 'grid_export_kw', 'vpp_battery_discharge_kw', 'vpp_grid_export_kw',
         'vpp_export_value_AUD', 'vpp_extra_import_cost_AUD', 'vpp_operational_net_value_AUD',
-        'bill_actual', 'bill_solar_only', 'bill_grid_only'
-    ]
+        'bill_actual', 'bill_solar_only', 'bill_grid_only',
+    }
+    avail = {c: res[c] for c in FINAL_COLS_FULL if c in res}
+    return _result_frame(_round_arrays(avail, TARIFF_COLS, MONETARY_COLS, owned=owned), df.index)
 
-    avail_cols = [c for c in final_cols if c in df_res.columns]
-    df_export  = df_res[avail_cols].copy()
 
-    tariff_cols        = ['tariff_import_AUD', 'tariff_export_AUD']
-    monetary_bill_cols = [
-        'bill_actual', 'bill_solar_only', 'bill_grid_only',
-        'vpp_export_value_AUD', 'vpp_extra_import_cost_AUD', 'vpp_operational_net_value_AUD'
-    ]
-    return _round_export(df_export, tariff_cols, monetary_bill_cols)
+def run_simulation_full(df, params):
+    """Engine simulasi Assignment 1: Solar PV + Battery + Grid + VPP."""
+    data_key = _data_key(df)
+    scheme   = params.get('tariff_scheme', 'Flat')
+    slots    = _cached_stage('slots', data_key, lambda: _stage_slots(df))
+
+    solar_key = _stage_key('solar', data_key, params=params, names=STAGE_PARAMS['solar'])
+    solar     = _cached_stage('solar', solar_key, lambda: _stage_solar(df, params))
+
+    tariff_key = _stage_key('tariff', data_key, scheme, params=params, names=TARIFF_PARAMS.get(scheme, TARIFF_PARAMS['Flat']))
+    tariff     = _cached_stage('tariff', tariff_key, lambda: _stage_tariff(df, params, slots))
+
+    # Hanya strategi Wholesale yang membaca nilai tariff_import di kernel
+    dispatch_deps = (solar_key, tariff_key) if _get_tariff_mode(scheme) == 2 else (solar_key,)
+    dispatch_key  = _stage_key('dispatch', data_key, *dispatch_deps, params=params, names=STAGE_PARAMS['dispatch'])
+    dispatch      = _cached_stage('dispatch', dispatch_key, lambda: _stage_dispatch(df, params, slots, solar, tariff))
+
+    return _stage_accounting(df, params, solar, tariff, dispatch)
 
 
 def run_simulation_solar_only(df, params):
@@ -475,21 +934,21 @@ def run_simulation_solar_only(df, params):
     solar_kw = params['solar_capacity_kw'] * (arr_irr / 1000.0) * temp_factor * params['pr']
     solar_kw = np.maximum(solar_kw, 0.0)
 
-    df_res = df.copy()
-    if 'price_import' in df_res.columns:
-        df_res.rename(columns={'price_import': 'price_profile'}, inplace=True)
+    res = {c: df[c].to_numpy() for c in df.columns}
+    if 'price_import' in res and 'price_profile' not in res:
+        res['price_profile'] = res.pop('price_import')
 
     scheme = params.get('tariff_scheme', 'Flat')
-
-    _compute_tariffs(df_res, scheme, params)
-
+    res['tariff_import_AUD'], res['tariff_export_AUD'] = _tariff_arrays(
+        df['timestamp'], res.get('price_profile'), scheme, params
+    )
 
     # Grid net sederhana: load - solar (tanpa baterai)
-    df_res['solar_output_kw'] = solar_kw
-    df_res['grid_net_kw']     = arr_load - solar_kw
-
-    df_res['grid_import_kw'] = np.where(df_res['grid_net_kw'] > 0, df_res['grid_net_kw'], 0)
-    df_res['grid_export_kw'] = np.where(df_res['grid_net_kw'] < 0, -df_res['grid_net_kw'], 0)
+    grid_net = arr_load - solar_kw
+    res['solar_output_kw'] = solar_kw
+    res['grid_net_kw']     = grid_net
+    res['grid_import_kw']  = np.where(grid_net > 0, grid_net, 0)
+    res['grid_export_kw']  = np.where(grid_net < 0, -grid_net, 0)
 
     final_cols = [
         'timestamp', 'irradiance', 'temperature', 'load_profile',
@@ -497,12 +956,12 @@ def run_simulation_solar_only(df, params):
         'grid_import_kw', 'grid_export_kw',
         'tariff_import_AUD', 'tariff_export_AUD',
     ]
-    avail_cols = [c for c in final_cols if c in df_res.columns]
-    df_export  = df_res[avail_cols].copy()
+    avail = {c: res[c] for c in final_cols if c in res}
 
-    # [Fix F] Rounding vectorized via _round_export.
-    tariff_cols = ['tariff_import_AUD', 'tariff_export_AUD']
-    return _round_export(df_export, tariff_cols)  # Assignment 2 tidak punya monetary_bill_cols
+    # Assignment 2 tidak punya monetary_bill_cols
+    owned = {'solar_output_kw', 'grid_net_kw', 'grid_import_kw', 'grid_export_kw',
+             'tariff_import_AUD', 'tariff_export_AUD'}
+    return _result_frame(_round_arrays(avail, TARIFF_COLS, owned=owned), df.index)
 
 
 def run_simulation(df, params, assignment_type="assignment_1"):
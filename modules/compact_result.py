@@ -0,0 +1,228 @@
+"""
+modules/compact_result.py
+Container hasil simulasi yang hemat memori untuk disimpan di session_state.
+
+Kolom hasil calculator sudah di-round (2/5/6 desimal), sehingga bisa disimpan
+sebagai integer fixed-point (nilai * 10^d) tanpa kehilangan presisi: decode
+k / 10^d menghasilkan float64 yang identik bit-per-bit dengan hasil np.round.
+
+- Lebar integer dipilih sekecil mungkin (int8/16/32); kolom yang sebagian
+  besar nol (kolom VPP) disimpan sparse (index + nilai).
+- Kolom bool disimpan packbits; timestamp berinterval tetap disimpan sebagai
+  (awal, step).
+- Kolom turunan (DERIVED_COLS: split import/export grid, VPP export/discharge)
+  tidak disimpan: dihitung dari kolom lain saat pertama diakses, lalu disimpan
+  dalam bentuk encoded (di-decode tiap akses seperti kolom lain).
+- Setiap kolom diverifikasi saat pack(); yang tidak lolos round-trip disimpan
+  apa adanya.
+
+Akses mirip DataFrame untuk exporter: res['kolom'] -> pd.Series, res.columns,
+len(res). Visualizer memakai to_frame(columns, rows): hanya kolom & baris
+(mis. 1 tahun) yang dibutuhkan chart yang di-decode.
+"""
+
+import numpy as np
+import pandas as pd
+
+DECIMALS            = (2, 5, 6)     # presisi pembulatan di calculator (umum -> tarif -> moneter)
+INT_DTYPES          = (np.int8, np.int16, np.int32)
+SPARSE_MAX_FRACTION = 0.1           # simpan sparse jika nilai non-nol <= 10% baris
+
+
+# Kolom turunan: nama -> (kolom sumber, fungsi). Dihitung dari nilai yang sudah
+# di-round; hasilnya sama dengan round(formula presisi penuh) karena round
+# simetris terhadap tanda dan monoton (diverifikasi ulang di pack()).
+DERIVED_COLS = {
+    'grid_import_kw': (
+        ('grid_net_kw',),
+        lambda g: np.where(g > 0, g, 0),
+    ),
+    'grid_export_kw': (
+        ('grid_net_kw',),
+        lambda g: np.where(g < 0, -g, 0),
+    ),
+    'vpp_grid_export_kw': (
+        ('vpp_status', 'grid_export_kw'),
+        lambda vpp, exp: np.where(vpp, exp, 0),
+    ),
+    'vpp_battery_discharge_kw': (
+        ('vpp_status', 'battery_power_ac_kw'),
+        lambda vpp, bat: np.where(vpp, np.where(bat > 0, bat, 0), 0),
+    ),
+}
+
+
+# =====================================================================
+# ENCODE / DECODE 1 KOLOM
+# =====================================================================
+def _same_bits(a, b):
+    return a.dtype == b.dtype and np.array_equal(a.view(np.uint8), b.view(np.uint8))
+
+
+def _smallest_int(k):
+    lo, hi = (int(k.min()), int(k.max())) if len(k) else (0, 0)
+    for dt in INT_DTYPES:
+        info = np.iinfo(dt)
+        if info.min <= lo and hi <= info.max:
+            return dt
+    return None
+
+
+def _pack_ints(k):
+    """Array integer -> dense atau sparse (mana yang lebih kecil)."""
+    nz = np.flatnonzero(k)
+    if len(nz) <= SPARSE_MAX_FRACTION * len(k):
+        vals = k[nz]
+        return {'sparse': True, 'idx': nz.astype(np.int32), 'vals': vals.astype(_smallest_int(vals))}
+    return {'sparse': False, 'vals': k.astype(_smallest_int(k))}
+
+
+def _in_range(idx, a, b):
+    """Posisi di array index terurut `idx` yang nilainya a <= i < b."""
+    return slice(np.searchsorted(idx, a), np.searchsorted(idx, b))
+
+
+def _unpack_ints(enc, n, a=0, b=None):
+    """Integer baris a..b (default semua baris)."""
+    b = n if b is None else b
+    if not enc['sparse']:
+        return enc['vals'][a:b]
+    out = np.zeros(b - a, dtype=enc['vals'].dtype)
+    sel = _in_range(enc['idx'], a, b)
+    out[enc['idx'][sel] - a] = enc['vals'][sel]
+    return out
+
+
+def _decode_fixed(enc, n, a=0, b=None):
+    b = n if b is None else b
+    out = _unpack_ints(enc, n, a, b).astype(np.float64)
+    out /= enc['scale']
+    negz = enc['negz']
+    out[negz[_in_range(negz, a, b)] - a] = -0.0
+    return out
+
+
+def _encode_float(v):
+    """Coba fixed-point untuk tiap presisi di DECIMALS; None jika tidak ada yang identik."""
+    if not np.isfinite(v).all():
+        return None
+    negz = np.flatnonzero((v == 0) & np.signbit(v)).astype(np.int32)
+    for d in DECIMALS:
+        scale = 10.0 ** d
+        k = np.rint(v * scale)
+        if _smallest_int(k) is None:
+            continue
+        enc = dict(_pack_ints(k.astype(np.int64)), kind='fixed', scale=scale, negz=negz)
+        if _same_bits(_decode_fixed(enc, len(v)), v):
+            return enc
+    return None
+
+
+def _encode_column(v):
+    n = len(v)
+    if v.dtype == np.bool_:
+        return {'kind': 'bool', 'bits': np.packbits(v)}
+    if v.dtype.kind == 'M' and n > 1:
+        step = v[1] - v[0]
+        if (np.diff(v) == step).all():
+            return {'kind': 'range', 'start': v[0], 'step': step}
+    if v.dtype == np.float64:
+        enc = _encode_float(v)
+        if enc is not None:
+            return enc
+    return {'kind': 'raw', 'values': v}
+
+
+def _decode_column(enc, n, rows=None):
+    """
+    Decode 1 kolom. rows: None (semua), slice kontigu (hanya baris itu yang
+    di-decode), atau index/mask numpy (decode penuh lalu diambil).
+    """
+    if rows is not None and not isinstance(rows, slice):
+        return _decode_column(enc, n)[rows]
+    a, b = (0, n) if rows is None else rows.indices(n)[:2]
+    b = max(a, b)
+
+    kind = enc['kind']
+    if kind == 'fixed':
+        return _decode_fixed(enc, n, a, b)
+    if kind == 'bool':
+        return np.unpackbits(enc['bits'], count=b)[a:].astype(bool)
+    if kind == 'range':
+        return enc['start'] + np.arange(a, b) * enc['step']
+    return enc['values'][a:b]
+
+
+def _nbytes(enc):
+    return sum(v.nbytes for v in enc.values() if isinstance(v, np.ndarray))
+
+
+# =====================================================================
+# CONTAINER
+# =====================================================================
+class CompactResult:
+    """Hasil simulasi terkompresi. Buat lewat pack(df_result)."""
+
+    def __init__(self, columns, index, encoded, derived):
+        self.columns  = pd.Index(columns)
+        self.index    = index
+        self._encoded = encoded     # kolom -> dict encoding
+        self._derived = derived     # kolom turunan yang belum dihitung
+
+    def __len__(self):
+        return len(self.index)
+
+    def _values(self, col, rows=None):
+        if col not in self._encoded:
+            if col not in self._derived:
+                raise KeyError(col)
+            src, fn = DERIVED_COLS[col]
+            self._encoded[col] = _encode_column(fn(*(self._values(s) for s in src)))
+            self._derived.discard(col)
+        return _decode_column(self._encoded[col], len(self), rows)
+
+    def __getitem__(self, col):
+        if isinstance(col, (list, tuple, pd.Index)):
+            return self.to_frame(col)
+        return pd.Series(self._values(col), index=self.index, name=col)
+
+    def to_frame(self, columns=None, rows=None):
+        """
+        DataFrame float64 biasa (kolom & urutan sama dengan hasil run_simulation).
+        columns / rows (slice, index, atau mask) membatasi yang di-decode.
+        """
+        columns = self.columns if columns is None else columns
+        index = self.index if rows is None else self.index[rows]
+        return pd.DataFrame({c: self._values(c, rows) for c in columns}, index=index)
+
+    @property
+    def nbytes(self):
+        """Memori yang ditempati data terkompresi (tanpa kolom turunan yang belum dihitung)."""
+        return sum(_nbytes(enc) for enc in self._encoded.values())
+
+
+def pack(df_result: pd.DataFrame) -> CompactResult:
+    """Kompres DataFrame hasil run_simulation. Semua kolom dijamin identik saat di-decode."""
+    n = len(df_result)
+    encoded = {c: _encode_column(df_result[c].to_numpy()) for c in df_result.columns}
+
+    derived = set()
+    for col, (src, fn) in DERIVED_COLS.items():
+        if col not in df_result.columns or not all(s in df_result.columns for s in src):
+            continue
+        expect = df_result[col].to_numpy()
+        got = fn(*(_decode_column(encoded[s], n) for s in src))
+        if _same_bits(np.asarray(got, dtype=expect.dtype), expect) and got.dtype == expect.dtype:
+            derived.add(col)
+    for col in derived:
+        del encoded[col]
+
+    return CompactResult(list(df_result.columns), df_result.index, encoded, derived)
+
+
+def as_frame(df_result, columns=None, rows=None):
+    """DataFrame dari hasil simulasi (CompactResult atau DataFrame), opsional hanya columns / rows."""
+    if isinstance(df_result, CompactResult):
+        return df_result.to_frame(columns, rows)
+    df = df_result if columns is None else df_result[list(columns)]
+    return df if rows is None else df.iloc[rows]
@@ -1,51 +1,47 @@
+import os
+import json
+import threading
+import time as _time
 import streamlit as st
 import pandas as pd
 from datetime import time, datetime
-from supabase import create_client, Client
+from modules.storage import get_storage
 
-TAB_CONFIG = "config_history"
-
-@st.cache_resource
-def init_connection():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
-
-supabase = init_connection()
+# Nilai default state config (key widget -> nilai)
+DEFAULT_STATES = {
+    "chk_dur": False,
+    "rand_dur_years": 1,
+    "chk_loc": False,
+    "chk_load": False,
+    "load_mult": 15.0,
+    "chk_solar": False,
+    "chk_bat": False,
+    "vpp_threshold": 800,
+    "sol_min": 4.0,
+    "sol_max": 6.0,
+    "sol_fix": 5.0,
+    "sol_temp": -0.004,
+    "sol_pr": 0.8,
+    "bat_min": 8.0,
+    "bat_max": 12.0,
+    "bat_fix": 10.0,
+    "bat_eff": 95,
+    "bat_soc_init": 50,
+    "bat_soc_range": (10, 90),
+    "tariff_scheme": "Flat",
+    "e_peak": 0.15,
+    "e_offpeak": 0.05,
+    "e_shoulder": 0.10,
+    "pp": 0.45,  
+    "po": 0.15,  
+    "ps": 0.25,  
+    "exp_tariff": 0.08, 
+    "imp_tariff": 0.20,
+}
 
 def init_default_states():
     """Mengisi nilai default ke dalam memori agar widget tidak bentrok (tanpa warning)"""
-    defaults = {
-        "chk_dur": False,
-        "rand_dur_years": 1,
-        "chk_loc": False,
-        "chk_load": False,
-        "load_mult": 15.0,
-        "chk_solar": False,
-        "chk_bat": False,
-        "vpp_threshold": 800,
-        "sol_min": 4.0,
-        "sol_max": 6.0,
-        "sol_fix": 5.0,
-        "sol_temp": -0.004,
-        "sol_pr": 0.8,
-        "bat_min": 8.0,
-        "bat_max": 12.0,
-        "bat_fix": 10.0,
-        "bat_eff": 95,
-        "bat_soc_init": 50,
-        "bat_soc_range": (10, 90),
-        "tariff_scheme": "Flat",
-        "e_peak": 0.15,
-        "e_offpeak": 0.05,
-        "e_shoulder": 0.10,
-        "pp": 0.45,  
-        "po": 0.15,  
-        "ps": 0.25,  
-        "exp_tariff": 0.08, 
-        "imp_tariff": 0.20,
-    }
-    for k, v in defaults.items():
+    for k, v in DEFAULT_STATES.items():
         if k not in st.session_state:
             st.session_state[k] = v
 
@@ -55,22 +51,170 @@ def time_encoder(obj):
         return obj.strftime("%H:%M")
     raise TypeError("Type not serializable")
 
-def load_config_history(assignment_type="assignment_1"):
-    """Mengambil 10 config terakhir dari Supabase, difilter per assignment."""
+# =====================================================================
+# CACHE CONFIG HISTORY
+# =====================================================================
+# 10 config terakhir per assignment disimpan di memori proses + snapshot disk
+# (dibagi antar proses / bertahan saat restart). Setelah TTL lewat, refresh ke
+# storage dijalankan di thread terpisah dan ditunggu maksimal
+# CONFIG_FETCH_TIMEOUT; jika backend lambat / error, dipakai data terakhir yang
+# berhasil (last-known-good). Hanya 1 refresh berjalan per assignment; request
+# lain selama refresh langsung memakai data lama. save_config_to_sheets
+# meng-invalidate entry assignment-nya (termasuk di proses lain, lewat mtime
+# file snapshot). fetched_at dicatat saat fetch dimulai dan invalidasi
+# meninggalkan penanda invalidated_at: hasil refresh yang dimulai sebelum
+# invalidasi dibuang lalu di-fetch ulang, sehingga config yang baru disimpan
+# tidak tertutup data lama.
+CONFIG_CACHE_TTL          = 60      # detik
+CONFIG_FETCH_TIMEOUT      = 3.0     # detik, jika ada data lama sebagai fallback
+CONFIG_FETCH_TIMEOUT_COLD = 30.0    # detik, jika belum ada data sama sekali
+CONFIG_RETRY_AFTER        = 10      # detik jeda retry setelah refresh gagal (selama ada data lama)
+CONFIG_REFETCH_MAX        = 3       # fetch ulang maksimal jika hasil refresh kalah oleh invalidasi
+CONFIG_SNAPSHOT_FILE      = os.path.join(".cache", "config_history.json")
+
+_config_lock    = threading.Lock()
+_config_memo    = {'entries': {}, 'snapshot_mtime': None}   # assignment -> {fetched_at, records} / {invalidated_at}
+_config_refresh = {}                                        # assignment -> thread refresh aktif
+_config_errors  = {}                                        # assignment -> (waktu, exception) refresh gagal terakhir
+
+
+def _fetch_config_history(assignment_type):
+    return get_storage().config_history(assignment_type)
+
+
+def _snapshot_mtime():
     try:
-        response = supabase.table(TAB_CONFIG)\
-            .select("*")\
-            .neq("Config_Name", "")\
-            .eq("assignment_type", assignment_type)\
-            .order("id", desc=True)\
-            .limit(10)\
-            .execute()
-            
-        df_history = pd.DataFrame(response.data)
-        return df_history
+        return os.stat(CONFIG_SNAPSHOT_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_snapshot():
+    try:
+        with open(CONFIG_SNAPSHOT_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_snapshot(entries):
+    """Tulis snapshot secara atomik. Dipanggil dengan _config_lock dipegang."""
+    try:
+        os.makedirs(os.path.dirname(CONFIG_SNAPSHOT_FILE), exist_ok=True)
+        path_tmp = f"{CONFIG_SNAPSHOT_FILE}.{os.getpid()}.tmp"
+        with open(path_tmp, 'w') as f:
+            json.dump(entries, f, default=str)
+        os.replace(path_tmp, CONFIG_SNAPSHOT_FILE)
+    except OSError:
+        pass
+    _config_memo['snapshot_mtime'] = _snapshot_mtime()
+
+
+def _get_entry(assignment_type):
+    """Entry dari memori; dimuat ulang dari disk jika snapshot diubah proses lain."""
+    with _config_lock:
+        mtime = _snapshot_mtime()
+        if mtime is not None and mtime != _config_memo['snapshot_mtime']:
+            _config_memo['entries'] = _read_snapshot()
+            _config_memo['snapshot_mtime'] = mtime
+        return _config_memo['entries'].get(assignment_type)
+
+
+def _stamp(entry):
+    """Waktu entry: awal fetch (data) atau waktu invalidasi (penanda)."""
+    return entry.get('fetched_at', entry.get('invalidated_at', 0))
+
+
+def _merged_entries():
+    """Gabungan entry memori & disk, per assignment diambil yang paling baru (data atau invalidasi)."""
+    entries = dict(_config_memo['entries'])
+    for key, entry in _read_snapshot().items():
+        if key not in entries or _stamp(entry) >= _stamp(entries[key]):
+            entries[key] = entry
+    return entries
+
+
+def _refresh_config(assignment_type):
+    """
+    Isi thread refresh: fetch storage -> memori + snapshot disk. Hasil fetch
+    yang dimulai sebelum entry saat ini (invalidasi / fetch lain yang lebih
+    baru) tidak ditulis; jika kalah oleh invalidasi, fetch diulang.
+    """
+    try:
+        for _ in range(CONFIG_REFETCH_MAX):
+            started = _time.time()
+            records = _fetch_config_history(assignment_type)
+            with _config_lock:
+                entries = _merged_entries()
+                current = entries.get(assignment_type)
+                if current is None or _stamp(current) <= started:
+                    entries[assignment_type] = {'fetched_at': started, 'records': records}
+                    _config_memo['entries'] = entries
+                    _write_snapshot(entries)
+                    break
+                if 'records' in current:
+                    break   # sudah ada hasil fetch yang lebih baru
+        _config_errors.pop(assignment_type, None)
     except Exception as e:
-        st.error(f"⚠️ Failed to read config history from Supabase: {e}")
-        return pd.DataFrame()
+        _config_errors[assignment_type] = (_time.time(), e)
+    finally:
+        with _config_lock:
+            _config_refresh.pop(assignment_type, None)
+
+
+def invalidate_config_cache(assignment_type=None):
+    """
+    Invalidasi cache config (1 assignment atau semua), di memori & snapshot disk.
+    Entry diganti penanda invalidated_at agar refresh yang sedang berjalan tidak menulis data lama.
+    """
+    with _config_lock:
+        entries = _merged_entries()
+        now = _time.time()
+        keys = set(entries) | set(_config_refresh) if assignment_type is None else {assignment_type}
+        for key in keys:
+            entries[key] = {'invalidated_at': now}
+        _config_memo['entries'] = entries
+        _write_snapshot(entries)
+
+
+def _get_records_entry(assignment_type):
+    """Entry berisi data (None jika belum ada / baru di-invalidate)."""
+    entry = _get_entry(assignment_type)
+    return entry if entry is not None and 'records' in entry else None
+
+
+def load_config_history(assignment_type="assignment_1"):
+    """Mengambil 10 config terakhir (cache TTL + fallback last-known-good), difilter per assignment."""
+    entry = _get_records_entry(assignment_type)
+    if entry is not None and _time.time() - entry['fetched_at'] < CONFIG_CACHE_TTL:
+        return pd.DataFrame(entry['records'])
+
+    # Backend baru saja gagal -> pakai data lama dulu, retry setelah CONFIG_RETRY_AFTER
+    failed_at, _ = _config_errors.get(assignment_type, (0, None))
+    if entry is not None and _time.time() - failed_at < CONFIG_RETRY_AFTER:
+        return pd.DataFrame(entry['records'])
+
+    with _config_lock:
+        thread = _config_refresh.get(assignment_type)
+        in_flight = thread is not None
+        if not in_flight:
+            thread = threading.Thread(target=_refresh_config, args=(assignment_type,),
+                                      name=f"config-refresh-{assignment_type}", daemon=True)
+            _config_refresh[assignment_type] = thread
+            thread.start()
+
+    # Refresh sedang dikerjakan request lain -> pakai data lama tanpa menunggu
+    if in_flight and entry is not None:
+        return pd.DataFrame(entry['records'])
+
+    thread.join(CONFIG_FETCH_TIMEOUT if entry is not None else CONFIG_FETCH_TIMEOUT_COLD)
+    latest = _get_records_entry(assignment_type) or entry
+    if latest is not None:
+        return pd.DataFrame(latest['records'])
+
+    err = _config_errors.get(assignment_type, (0, "timeout"))[1]
+    st.error(f"⚠️ Failed to read config history: {err}")
+    return pd.DataFrame()
 
 def get_latest_config_for_assignment(assignment_type="assignment_1"):
     """
@@ -80,32 +224,15 @@ def get_latest_config_for_assignment(assignment_type="assignment_1"):
               pakai config assignment_1 terbaru.
     """
     try:
-        response = supabase.table(TAB_CONFIG)\
-            .select("*")\
-            .eq("assignment_type", assignment_type)\
-            .order("id", desc=True)\
-            .limit(1)\
-            .execute()
-        
-        if response.data:
-            return pd.Series(response.data[0])
-
-        if assignment_type != "assignment_1":
-            fallback = supabase.table(TAB_CONFIG)\
-                .select("*")\
-                .eq("assignment_type", "assignment_1")\
-                .order("id", desc=True)\
-                .limit(1)\
-                .execute()
-            if fallback.data:
-                return pd.Series(fallback.data[0])
-
-        return None
+        row = get_storage().latest_config(assignment_type)
+        if row is None and assignment_type != "assignment_1":
+            row = get_storage().latest_config("assignment_1")
+        return pd.Series(row) if row is not None else None
     except Exception:
         return None
 
 def save_config_to_sheets(config_name, current_state):
-    """Simpan konfigurasi admin ke Supabase, termasuk assignment_type aktif."""
+    """Simpan konfigurasi admin ke storage, termasuk assignment_type aktif."""
     try:
         new_row = {
             "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -154,15 +281,17 @@ def save_config_to_sheets(config_name, current_state):
         }
         
         # Eksekusi Insert (Sangat Cepat & Ramping!)
-        supabase.table(TAB_CONFIG).insert(new_row).execute()
+        get_storage().insert_config(new_row)
         
-        st.cache_data.clear()
+        invalidate_config_cache(new_row["assignment_type"])
         return True
     except Exception as e:
         st.error(f"⚠️ Failed to save config: {e}")
         return False
     
-def apply_row_to_session(selected_row):
+def row_to_state(selected_row):
+    """Baris config (DB) -> dict key widget -> nilai, tanpa menyentuh session_state."""
+    state = {}
     mapping = {
         "use_rand_duration": "chk_dur",
         "rand_dur_years": "rand_dur_years",
@@ -186,35 +315,51 @@ def apply_row_to_session(selected_row):
             if db_col.startswith("t_") and isinstance(val, str):
                 try:
                     h, m = map(int, val.split(':'))
-                    st.session_state[widget_key] = time(h, m)
+                    state[widget_key] = time(h, m)
                 except: pass
             elif widget_key.startswith("chk_"):
                 if pd.isna(val): 
-                    st.session_state[widget_key] = False
+                    state[widget_key] = False
                 else:
                     teks_val = str(val).strip().upper()
                     if teks_val in ["TRUE", "1", "1.0"]:
-                        st.session_state[widget_key] = True
+                        state[widget_key] = True
                     else:
-                        st.session_state[widget_key] = False
+                        state[widget_key] = False
             else:
                 if not pd.isna(val):
                     if db_col == "bat_init_soc":
-                        st.session_state[widget_key] = int(float(val) * 100)
+                        state[widget_key] = int(float(val) * 100)
                     elif widget_key in ["vpp_threshold", "bat_eff", "date_start", "date_end", "rand_dur_years"]:
-                        st.session_state[widget_key] = int(float(val))
+                        state[widget_key] = int(float(val))
                     elif widget_key in ["load_mult","sol_min", "sol_max", "sol_fix", "sol_temp", "sol_pr", "bat_min", "bat_max", "bat_fix", "exp_tariff", "imp_tariff", "pp", "po", "ps", "e_peak", "e_offpeak", "e_shoulder"]:
-                        st.session_state[widget_key] = float(val)
+                        state[widget_key] = float(val)
                     else:
-                        st.session_state[widget_key] = val
+                        state[widget_key] = val
                 
     if "soc_min" in selected_row and "soc_max" in selected_row:
         val_min = selected_row["soc_min"]
         val_max = selected_row["soc_max"]
         if not pd.isna(val_min) and not pd.isna(val_max):
-            st.session_state["bat_soc_range"] = (int(float(val_min)*100), int(float(val_max)*100))
+            state["bat_soc_range"] = (int(float(val_min)*100), int(float(val_max)*100))
             
     if "start_year" in selected_row and not pd.isna(selected_row["start_year"]): 
-        st.session_state["date_start"] = int(float(selected_row["start_year"]))
+        state["date_start"] = int(float(selected_row["start_year"]))
     if "end_year" in selected_row and not pd.isna(selected_row["end_year"]): 
-        st.session_state["date_end"] = int(float(selected_row["end_year"]))
\ No newline at end of file
+        state["date_end"] = int(float(selected_row["end_year"]))
+    return state
+
+def apply_row_to_session(selected_row):
+    for widget_key, val in row_to_state(selected_row).items():
+        st.session_state[widget_key] = val
+
+def build_state(selected_row):
+    """State config lengkap (default + baris config) untuk generate di luar Streamlit."""
+    state = dict(DEFAULT_STATES)
+    state.update(row_to_state(selected_row))
+    return state
+
+def get_config_by_name(config_name, assignment_type="assignment_1"):
+    """Config terbaru dengan nama tertentu untuk assignment tertentu, atau None."""
+    row = get_storage().config_by_name(config_name, assignment_type)
+    return pd.Series(row) if row is not None else None
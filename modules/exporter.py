@@ -0,0 +1,171 @@
+"""
+modules/exporter.py
+Export dataset hasil simulasi (kolom output mahasiswa) ke CSV, CSV gzip, dan Parquet.
+
+- Rename kolom internal -> nama output dihitung sekali (CSV_RENAME).
+- CSV ditulis per potongan baris (CSV_CHUNK_ROWS) dengan format float
+  vectorized (identik dengan default DataFrame.to_csv), tanpa menyalin
+  DataFrame penuh.
+- lazy_csv() / lazy_exports() mengembalikan callable untuk st.download_button
+  sehingga bytes hanya dibuat saat tombol download diklik, tidak disimpan di
+  session_state.
+- Semua format memakai kolom, rename, dan pembulatan yang sama.
+"""
+
+import io
+import gzip
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from modules import assignment as asgn
+
+CSV_CHUNK_ROWS = 10_000      # ~30 MB string sementara per potongan (25 kolom)
+GZIP_LEVEL     = 6
+
+# Format download: key -> (label tombol, ekstensi file, mime)
+EXPORT_FORMATS = {
+    "csv":     ("CSV",      ".csv",     "text/csv"),
+    "csv.gz":  ("CSV gzip", ".csv.gz",  "application/gzip"),
+    "parquet": ("Parquet",  ".parquet", "application/vnd.apache.parquet"),
+}
+
+# Kolom internal (hasil run_simulation) -> nama kolom di file download
+CSV_RENAME = {
+    'irradiance':          'irradiance_W/m^2',
+    'temperature':         'temperature_C',
+    'load_profile':        'load_kW',
+    'price_profile':       'price_AUD/MWh',
+    'battery_soc_pct':     'battery_soc_%',
+    'battery_soc_kwh':     'battery_soc_kwh',
+    'battery_power_ac_kw': 'battery_power_ac_kW',
+    'tariff_import_AUD':   'tariff_import_AUD/kWh',
+    'tariff_export_AUD':   'tariff_export_AUD/kWh',
+    'grid_net_kw':         'grid_net_kW',
+}
+_SRC_FOR_OUT = {v: k for k, v in CSV_RENAME.items()}
+
+# Pembulatan default saat generate (kolom lain sudah di-round oleh calculator)
+DEFAULT_ROUND = {
+    'tariff_import_AUD': 5,
+    'tariff_export_AUD': 5,
+}
+
+
+def get_export_columns(df_result, assignment_type):
+    """List (kolom_internal, kolom_output) sesuai asgn.get_output_columns, yang ada di df_result."""
+    pairs = []
+    for out_col in asgn.get_output_columns(assignment_type):
+        src_col = _SRC_FOR_OUT.get(out_col, out_col)
+        if src_col in df_result.columns:
+            pairs.append((src_col, out_col))
+    return pairs
+
+
+def _round_values(values, src_col, decimals):
+    """decimals=None -> DEFAULT_ROUND per kolom; int -> semua kolom numerik (mis. flow regenerate)."""
+    if values.dtype.kind != 'f':
+        return values
+    n_dec = decimals if decimals is not None else DEFAULT_ROUND.get(src_col)
+    return values if n_dec is None else np.round(values, n_dec)
+
+
+def _format_values(values):
+    """Format 1 kolom ke array string, sama seperti default DataFrame.to_csv."""
+    kind = values.dtype.kind
+    if kind == 'M':
+        return np.char.replace(np.datetime_as_string(values, unit='s'), 'T', ' ')
+    if kind == 'f':
+        out = values.astype(str)
+        nan_mask = np.isnan(values)
+        if nan_mask.any():
+            out[nan_mask] = ''
+        return out
+    if kind == 'b':
+        return np.where(values, 'True', 'False')
+    return values.astype(str)
+
+
+def iter_csv_chunks(df_result, assignment_type, decimals=None, chunk_rows=CSV_CHUNK_ROWS):
+    """Generator bytes CSV: header lalu tiap potongan `chunk_rows` baris."""
+    pairs = get_export_columns(df_result, assignment_type)
+    yield (','.join(out for _, out in pairs) + '\n').encode('utf-8')
+
+    arrays = [df_result[src].to_numpy() for src, _ in pairs]
+    n_rows = len(df_result)
+    for start in range(0, n_rows, chunk_rows):
+        end = min(start + chunk_rows, n_rows)
+        cols = [
+            _format_values(_round_values(arr[start:end], src, decimals)).tolist()
+            for arr, (src, _) in zip(arrays, pairs)
+        ]
+        lines = '\n'.join(map(','.join, zip(*cols)))
+        yield (lines + '\n').encode('utf-8')
+
+
+def write_csv(df_result, assignment_type, fh, decimals=None, chunk_rows=CSV_CHUNK_ROWS):
+    """Tulis CSV ke file-like biner `fh` secara bertahap."""
+    for chunk in iter_csv_chunks(df_result, assignment_type, decimals, chunk_rows):
+        fh.write(chunk)
+
+
+def to_csv_bytes(df_result, assignment_type, decimals=None):
+    buf = io.BytesIO()
+    write_csv(df_result, assignment_type, buf, decimals)
+    return buf.getvalue()
+
+
+def write_csv_gzip(df_result, assignment_type, fh, decimals=None, chunk_rows=CSV_CHUNK_ROWS):
+    """Sama dengan write_csv, tapi dikompres gzip secara streaming."""
+    with gzip.GzipFile(fileobj=fh, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as gz:
+        write_csv(df_result, assignment_type, gz, decimals, chunk_rows)
+
+
+def write_parquet(df_result, assignment_type, fh, decimals=None):
+    """Tulis kolom output ke Parquet (zstd) langsung dari array numpy, tanpa DataFrame baru."""
+    pairs = get_export_columns(df_result, assignment_type)
+    table = pa.table({
+        out: _round_values(df_result[src].to_numpy(), src, decimals)
+        for src, out in pairs
+    })
+    pq.write_table(table, fh, compression='zstd')
+
+
+_WRITERS = {
+    "csv":     write_csv,
+    "csv.gz":  write_csv_gzip,
+    "parquet": write_parquet,
+}
+
+
+def lazy_csv(df_result, assignment_type, decimals=None):
+    """
+    Callable tanpa argumen untuk `data=` st.download_button.
+    Dieksekusi Streamlit hanya saat tombol diklik.
+    """
+    return lazy_export(df_result, assignment_type, "csv", decimals)
+
+
+def write_export(df_result, assignment_type, fmt, fh, decimals=None):
+    """Tulis dataset ke `fh` dalam format `fmt` (key EXPORT_FORMATS)."""
+    _WRITERS[fmt](df_result, assignment_type, fh, decimals)
+
+
+def lazy_export(df_result, assignment_type, fmt, decimals=None):
+    """Seperti lazy_csv, untuk format apa pun di EXPORT_FORMATS."""
+    _WRITERS[fmt]   # format tidak dikenal -> KeyError saat dibuat, bukan saat diklik
+
+    def _build():
+        buf = io.BytesIO()
+        write_export(df_result, assignment_type, fmt, buf, decimals)
+        buf.seek(0)
+        return buf
+    return _build
+
+
+def lazy_exports(df_result, assignment_type, decimals=None):
+    """Dict format -> callable lazy, untuk semua format di EXPORT_FORMATS."""
+    return {
+        fmt: lazy_export(df_result, assignment_type, fmt, decimals)
+        for fmt in EXPORT_FORMATS
+    }
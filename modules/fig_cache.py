@@ -0,0 +1,128 @@
+"""
+modules/fig_cache.py
+Cache gambar chart (PNG) untuk panel Detailed Analysis (admin).
+
+Rerun fragment analysis yang tidak mengubah tahun/bulan/hasil simulasi
+langsung menampilkan PNG dari cache tanpa membuat figure matplotlib.
+
+- Key = (key hasil simulasi, vis_config, tahun, bulan, nama chart).
+  Key hasil simulasi memakai key result_cache (hash parameter + versi data).
+- Store dibagi lintas session (st.cache_resource), dibatasi FIG_CACHE_MAX_BYTES
+  dengan eviction LRU.
+- Counter hit/miss/evict bisa dibaca lewat get_stats().
+"""
+
+import io
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import streamlit as st
+
+FIG_CACHE_MAX_BYTES = 256 * 1024 ** 2   # 256 MB
+FIG_DPI             = 200               # sama dengan default st.pyplot
+
+
+@st.cache_resource
+def _get_store():
+    return {
+        'items':     OrderedDict(),   # key -> png bytes (urutan = LRU)
+        'bytes':     0,
+        'hits':      0,
+        'misses':    0,
+        'evictions': 0,
+        'lock':      threading.Lock(),
+    }
+
+
+def make_key(result_key, vis_config=None, *parts):
+    """
+    Prefix key untuk 1 panel. None jika result_key tidak ada (cache dimatikan).
+    Contoh: make_key(r_key, vc, 2024) lalu sub_key(prefix, 'price').
+    """
+    if not result_key:
+        return None
+    vc_hash = hashlib.sha1(
+        json.dumps(vis_config or {}, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()[:12]
+    return (result_key, vc_hash) + tuple(parts)
+
+
+def sub_key(prefix, *parts):
+    return None if prefix is None else prefix + tuple(parts)
+
+
+def _get(key):
+    store = _get_store()
+    with store['lock']:
+        png = store['items'].get(key)
+        if png is None:
+            store['misses'] += 1
+            return None
+        store['items'].move_to_end(key)
+        store['hits'] += 1
+        return png
+
+
+def _put(key, png):
+    store = _get_store()
+    with store['lock']:
+        old = store['items'].pop(key, None)
+        if old is not None:
+            store['bytes'] -= len(old)
+        store['items'][key] = png
+        store['bytes'] += len(png)
+        while store['bytes'] > FIG_CACHE_MAX_BYTES and len(store['items']) > 1:
+            _, evicted = store['items'].popitem(last=False)
+            store['bytes'] -= len(evicted)
+            store['evictions'] += 1
+
+
+def _to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=FIG_DPI, bbox_inches='tight')
+    return buf.getvalue()
+
+
+def pyplot(key, draw_fn):
+    """
+    Pengganti `plt.tight_layout(); st.pyplot(fig); plt.close(fig)`.
+    draw_fn() membuat dan mengembalikan figure; hanya dipanggil saat cache miss.
+    key=None -> tanpa cache (perilaku lama).
+    """
+    if key is None:
+        fig = draw_fn()
+        fig.tight_layout(); st.pyplot(fig); plt.close(fig)
+        return
+
+    png = _get(key)
+    if png is None:
+        fig = draw_fn()
+        fig.tight_layout()
+        png = _to_png(fig)
+        plt.close(fig)
+        _put(key, png)
+    st.image(png, width="stretch", output_format="PNG")
+
+
+def get_stats():
+    store = _get_store()
+    with store['lock']:
+        total = store['hits'] + store['misses']
+        return {
+            'hits':      store['hits'],
+            'misses':    store['misses'],
+            'hit_rate':  store['hits'] / total if total else 0.0,
+            'entries':   len(store['items']),
+            'bytes':     store['bytes'],
+            'evictions': store['evictions'],
+        }
+
+
+def clear():
+    store = _get_store()
+    with store['lock']:
+        store['items'].clear()
+        store['bytes'] = 0
@@ -1,9 +1,16 @@
 import os
+import json
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import streamlit as st
 import random
 import calendar
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 DATASET_DIR = "dataset"
 LOAD_PROFILE_DIR = os.path.join(DATASET_DIR, "load_profile")
@@ -12,85 +19,410 @@ ROWS_PER_DAY = 288
 IDX_FEB_29_START = 59 * ROWS_PER_DAY  
 IDX_FEB_28_START = 58 * ROWS_PER_DAY  
 
+# Thread pool baca file price per tahun (jalur fallback tanpa region store)
+PRICE_READ_WORKERS = 4
+
+# Columnar store per region (hasil build_region_store), 1 file Arrow IPC per region
+REGION_STORE_FILE = "store.arrow"
+
+# Bank load profile (hasil build_load_profile_bank): 1 matriks .npy + index nama file
+LOAD_BANK_FILE  = os.path.join(LOAD_PROFILE_DIR, "_bank.npy")
+LOAD_BANK_INDEX = os.path.join(LOAD_PROFILE_DIR, "_bank_index.json")
+
+# =====================================================================
+# MANIFEST DATASET
+# =====================================================================
+# Index dataset (region, titik + file solar, tahun price, load profile) beserta
+# detail per file (jumlah baris, kolom, min/max timestamp, ukuran, sha256).
+# Dibuat saat build (build_manifest) ke MANIFEST_FILE, dimuat sekali per proses,
+# dan dianggap basi jika mtime salah satu folder dataset berubah (file/folder
+# ditambah, dihapus, atau di-replace). Jika basi / belum ada, index dibangun
+# ulang di memori dari listing folder (tanpa detail & checksum).
+# Fungsi discovery (get_list_*, get_available_years, get_master_solar_path)
+# cukup lookup dict ke manifest.
+MANIFEST_FILE    = os.path.join(".cache", "dataset_manifest.json")
+MANIFEST_VERSION = 1
+
+_manifest_memo = {}
+_manifest_lock = threading.Lock()
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _list_dirs(path, exclude):
+    try:
+        return sorted(d for d in os.listdir(path) if d != exclude and os.path.isdir(os.path.join(path, d)))
+    except OSError:
+        return []
+
+
+def _list_parquet(path):
+    try:
+        return sorted(f for f in os.listdir(path) if f.endswith('.parquet'))
+    except OSError:
+        return []
+
+
+def _parse_year(file_name):
+    try:
+        return int(file_name.replace('.parquet', ''))
+    except ValueError:
+        return None
+
+
+def _data_columns(schema):
+    """Nama kolom data (tanpa kolom index pandas), sama dengan df.columns hasil read_parquet."""
+    index_cols = {c for c in (schema.pandas_metadata or {}).get('index_columns', []) if isinstance(c, str)}
+    return [c for c in schema.names if c not in index_cols]
+
+
+def _sha256_file(path, chunk_size=1024 ** 2):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _source_stats(paths):
+    """path -> [size, mtime_ns] (None jika file hilang). Dipakai cek basi region store & bank load profile."""
+    out = {}
+    for path in paths:
+        try:
+            st_ = os.stat(path)
+            out[path] = [st_.st_size, st_.st_mtime_ns]
+        except OSError:
+            out[path] = None
+    return out
+
+
+def _file_details(path, checksum=False):
+    """Detail 1 file parquet dari metadata (tanpa baca data)."""
+    st_  = os.stat(path)
+    meta = pq.read_metadata(path)
+    schema = meta.schema.to_arrow_schema()
+    out = {
+        'rows':     meta.num_rows,
+        'columns':  _data_columns(schema),
+        'size':     st_.st_size,
+        'mtime_ns': st_.st_mtime_ns,
+    }
+    if 'timestamp' in schema.names:
+        i = schema.get_field_index('timestamp')
+        stats = [meta.row_group(rg).column(i).statistics for rg in range(meta.num_row_groups)]
+        stats = [s for s in stats if s is not None and s.has_min_max]
+        if stats:
+            out['ts_min'] = str(min(s.min for s in stats))
+            out['ts_max'] = str(max(s.max for s in stats))
+    if checksum:
+        out['sha256'] = _sha256_file(path)
+    return out
+
+
+def scan_dataset(details=False, checksum=False):
+    """Bangun manifest dari isi DATASET_DIR. details/checksum hanya untuk build (baca metadata / isi file)."""
+    dirs = {DATASET_DIR: _mtime_ns(DATASET_DIR)}
+    regions = {}
+    for nama_lokasi in _list_dirs(DATASET_DIR, "load_profile"):
+        path_lokasi = os.path.join(DATASET_DIR, nama_lokasi)
+        dirs[path_lokasi] = _mtime_ns(path_lokasi)
+
+        points = {}
+        for nama_titik in _list_dirs(path_lokasi, "Price"):
+            path_titik = os.path.join(path_lokasi, nama_titik)
+            dirs[path_titik] = _mtime_ns(path_titik)
+            files = _list_parquet(path_titik)
+            entry = {'solar_file': files[0] if files else None}
+            if details and files:
+                entry.update(_file_details(os.path.join(path_titik, files[0]), checksum))
+            points[nama_titik] = entry
+
+        path_price = os.path.join(path_lokasi, "Price")
+        dirs[path_price] = _mtime_ns(path_price)
+        price = {}
+        for f in _list_parquet(path_price):
+            year = _parse_year(f)
+            if year is None: continue
+            entry = {'file': f}
+            if details:
+                entry.update(_file_details(os.path.join(path_price, f), checksum))
+            price[str(year)] = entry
+
+        regions[nama_lokasi] = {'points': points, 'price': price}
+
+    dirs[LOAD_PROFILE_DIR] = _mtime_ns(LOAD_PROFILE_DIR)
+    load_profiles = {
+        f: _file_details(os.path.join(LOAD_PROFILE_DIR, f), checksum) if details else {}
+        for f in _list_parquet(LOAD_PROFILE_DIR)
+    }
+
+    return {
+        'version':       MANIFEST_VERSION,
+        'dirs':          dirs,
+        'regions':       regions,
+        'load_profiles': load_profiles,
+    }
+
+
+def build_manifest(path=MANIFEST_FILE):
+    """Build step: tulis manifest lengkap (detail + sha256) secara atomik."""
+    manifest = scan_dataset(details=True, checksum=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    with open(path_tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path_tmp, path)
+    with _manifest_lock:
+        _manifest_memo.clear()
+    return path
+
+
+def _is_fresh(manifest):
+    return all(_mtime_ns(path) == mtime for path, mtime in manifest['dirs'].items())
+
+
+def _read_manifest_file():
+    try:
+        with open(MANIFEST_FILE) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def get_manifest():
+    """Manifest aktif: memo proses -> file manifest -> scan ulang (jika basi)."""
+    with _manifest_lock:
+        manifest = _manifest_memo.get('manifest')
+        if manifest is not None and _is_fresh(manifest):
+            return manifest
+        manifest = _read_manifest_file()
+        if manifest is None or not _is_fresh(manifest):
+            manifest = scan_dataset()
+        _manifest_memo['manifest'] = manifest
+        return manifest
+
+
+def verify_manifest(manifest=None):
+    """Cek checksum semua file di manifest. Return list path yang hilang / berubah isinya."""
+    manifest = manifest or _read_manifest_file()
+    if manifest is None: return None
+    files = []
+    for nama_lokasi, region in manifest['regions'].items():
+        for nama_titik, point in region['points'].items():
+            if point.get('solar_file'):
+                files.append((os.path.join(DATASET_DIR, nama_lokasi, nama_titik, point['solar_file']), point))
+        for entry in region['price'].values():
+            files.append((os.path.join(DATASET_DIR, nama_lokasi, "Price", entry['file']), entry))
+    for f, entry in manifest['load_profiles'].items():
+        files.append((os.path.join(LOAD_PROFILE_DIR, f), entry))
+
+    bad = []
+    for path, entry in files:
+        if 'sha256' not in entry: continue
+        if not os.path.exists(path) or _sha256_file(path) != entry['sha256']:
+            bad.append(path)
+    return bad
+
+
 def get_list_lokasi():
-    if not os.path.exists(DATASET_DIR): return []
-    items = os.listdir(DATASET_DIR)
-    return sorted([item for item in items if os.path.isdir(os.path.join(DATASET_DIR, item)) and item != "load_profile"])
+    return sorted(get_manifest()['regions'])
 
 def get_list_titik(nama_lokasi):
-    path_lokasi = os.path.join(DATASET_DIR, nama_lokasi)
-    if not os.path.exists(path_lokasi): return []
-    items = os.listdir(path_lokasi)
-    return sorted([item for item in items if os.path.isdir(os.path.join(path_lokasi, item)) and item != "Price"])
+    region = get_manifest()['regions'].get(nama_lokasi)
+    return sorted(region['points']) if region else []
 
 def get_available_years(nama_lokasi, nama_titik):
-    path_price = os.path.join(DATASET_DIR, nama_lokasi, "Price")
-    if not os.path.exists(path_price): return []
-    files = os.listdir(path_price)
-    years = []
-    for f in files:
-        if f.endswith('.parquet'):
-            try: years.append(int(f.replace('.parquet', '')))
-            except ValueError: pass 
-    return sorted(years)
+    region = get_manifest()['regions'].get(nama_lokasi)
+    return sorted(int(y) for y in region['price']) if region else []
 
 def get_list_load_profiles():
-    """Mengambil list semua file CSV di folder load_profile"""
-    if not os.path.exists(LOAD_PROFILE_DIR): return []
-    return sorted([f for f in os.listdir(LOAD_PROFILE_DIR) if f.endswith('.parquet')])
+    """Mengambil list semua file parquet di folder load_profile"""
+    return sorted(get_manifest()['load_profiles'])
+
+
+# =====================================================================
+# RESOLUSI SCHEMA PARQUET
+# =====================================================================
+# Nama kolom tiap file ditentukan sekali dari metadata parquet (tanpa baca
+# data), di-cache per (path, mtime). Aturan pencocokan sama dengan sebelumnya
+# (substring pada nama kolom); kolom index pandas diabaikan seperti read_parquet.
+
+
+def _first_column(columns, *keys):
+    return next((c for c in columns if any(k in c.lower() for k in keys)), None)
+
+
+def _find_load_column(columns):
+    return _first_column(columns, 'beban', 'load')
+
+
+@st.cache_resource(show_spinner=False, max_entries=512)
+def _resolve_parquet_schema(path_file, file_mtime):
+    schema = pq.read_schema(path_file)
+    columns = _data_columns(schema)
+
+    return {
+        'columns':     columns,
+        'timestamp':   'timestamp' if 'timestamp' in columns else None,
+        'irradiance':  _first_column(columns, 'irradiance', 'solar', 'glob'),
+        'temperature': _first_column(columns, 'temperature', 'amb'),
+        'load':        _find_load_column(columns),
+        'price':       next((c for c in ('price_import', 'harga_listrik') if c in columns), None),
+    }
+
+
+def get_parquet_schema(path_file):
+    """Kolom hasil resolusi untuk 1 file parquet (dict nama kolom per peran)."""
+    return _resolve_parquet_schema(path_file, os.path.getmtime(path_file))
+
+
+def _read_columns(path_file, columns):
+    """Baca hanya `columns` via pyarrow -> dict nama -> numpy (tanpa DataFrame)."""
+    table = pq.read_table(path_file, columns=list(columns))
+    return {c: table.column(c).to_numpy() for c in columns}
 
 
 @st.cache_data(show_spinner=False)
 def load_solar_array(path_file):
     """
-    Load CSV Solar -> Langsung ambil kolom data -> Jadi Array.
+    Load Parquet Solar -> Langsung ambil kolom irradiance & temperature -> Jadi Array.
     """
     if path_file.endswith('.csv'):
         path_file = path_file.replace('.csv', '.parquet')
 
     if not os.path.exists(path_file): return None, None
     try:
-        df = pd.read_parquet(path_file)
-        
-        col_irr = next((c for c in df.columns if 'irradiance' in c.lower() or 'solar' in c.lower() or 'glob' in c.lower()), None)
-        col_temp = next((c for c in df.columns if 'temperature' in c.lower() or 'amb' in c.lower()), None)
-        
+        schema = get_parquet_schema(path_file)
+        col_irr, col_temp = schema['irradiance'], schema['temperature']
         if not col_irr: return None, None
 
-        arr_irr = df[col_irr].to_numpy()
-        arr_temp = df[col_temp].to_numpy() if col_temp else np.full(len(arr_irr), 25.0)
-        
+        cols = _read_columns(path_file, [c for c in (col_irr, col_temp) if c])
+        arr_irr = cols[col_irr]
+        arr_temp = cols[col_temp] if col_temp else np.full(len(arr_irr), 25.0)
+
         return arr_irr, arr_temp
     except Exception:
         return None, None
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def _read_load_profile_file(path_file):
+    """Fallback tanpa bank: parse 1 file parquet load profile (di-cache per file)."""
+    col_load = get_parquet_schema(path_file)['load']
+    if not col_load: return None
+    return _read_columns(path_file, [col_load])[col_load]
+
+
+def build_load_profile_bank():
+    """
+    Build step: gabungkan semua file load profile menjadi 1 matriks
+    (n_profiles, n_rows) float64 di LOAD_BANK_FILE + index nama file di LOAD_BANK_INDEX.
+    Float64 dipertahankan agar hasil regenerate identik dengan baca parquet langsung.
+    """
+    sources = _load_profile_sources()
+    names, rows = [], []
+    for f in get_list_load_profiles():
+        arr = _read_load_profile_file.__wrapped__(os.path.join(LOAD_PROFILE_DIR, f))
+        if arr is None: continue
+        names.append(f)
+        rows.append(np.asarray(arr, dtype=np.float64))
+
+    if not rows:
+        raise ValueError("No load profile files found")
+    if len({len(r) for r in rows}) != 1:
+        raise ValueError("Load profile files have different lengths")
+
+    # Kedua file ditulis via tmp + os.replace; index terakhir, karena index
+    # (beserta stat file sumber) yang menentukan bank dianggap valid
+    path_tmp = f"{LOAD_BANK_FILE}.{os.getpid()}.tmp.npy"
+    np.save(path_tmp, np.vstack(rows))
+    os.replace(path_tmp, LOAD_BANK_FILE)
+
+    path_tmp = f"{LOAD_BANK_INDEX}.{os.getpid()}.tmp"
+    with open(path_tmp, 'w') as f:
+        json.dump({'names': names, 'sources': sources}, f)
+    os.replace(path_tmp, LOAD_BANK_INDEX)
+    return LOAD_BANK_FILE
+
+
+def _load_profile_sources():
+    return _source_stats(os.path.join(LOAD_PROFILE_DIR, f) for f in get_list_load_profiles())
+
+
+@st.cache_resource(show_spinner=False)
+def _open_load_profile_bank(index_mtime):
+    """
+    Memory-map bank (read-only). Halaman file dibagi antar proses worker lewat
+    page cache OS. index_mtime ikut jadi key cache agar rebuild terbaca.
+    """
+    with open(LOAD_BANK_INDEX) as f:
+        index = json.load(f)
+    matrix = np.load(LOAD_BANK_FILE, mmap_mode='r')
+    names = index['names']
+    if matrix.shape[0] != len(names):
+        return None
+    return matrix, names, {name: i for i, name in enumerate(names)}, index.get('sources')
+
+
+def get_load_profile_bank():
+    """
+    Kembalikan (matrix, names, index) atau None jika bank belum di-build / basi:
+    file load profile ditambah, dihapus, atau berubah (size / mtime_ns).
+    """
+    try:
+        index_mtime = os.stat(LOAD_BANK_INDEX).st_mtime_ns
+        bank = _open_load_profile_bank(index_mtime)
+    except (OSError, ValueError, KeyError):
+        return None
+    if bank is None or bank[3] != _load_profile_sources():
+        return None
+    return bank[:3]
+
+
 def load_load_profile_array(specific_filename=None):
     """
     Load CSV Load Profile -> Langsung ambil kolom data -> Jadi Array.
     Jika specific_filename ada, pakai itu. Jika None, pilih random.
+    Jika bank tersedia, hasilnya view 1 baris dari memory map (tanpa parse file).
     """
     if not os.path.exists(LOAD_PROFILE_DIR): return None, "No Folder"
+
+    bank = get_load_profile_bank()
     
     if specific_filename:
         selected_file = specific_filename.replace('.csv', '.parquet')
+    elif bank is not None:
+        selected_file = random.choice(bank[1])
     else:
         files = [f for f in os.listdir(LOAD_PROFILE_DIR) if f.endswith('.parquet')]
         if not files: return None, "Empty"
         selected_file = random.choice(files)
+
+    if bank is not None and selected_file in bank[2]:
+        return np.asarray(bank[0][bank[2][selected_file]]), selected_file
     
     path_file = os.path.join(LOAD_PROFILE_DIR, selected_file)
     
     try:
-        df = pd.read_parquet(path_file)
-        
-        col_load = next((c for c in df.columns if 'beban' in c.lower() or 'load' in c.lower()), None)
-        if not col_load: return None, "Invalid CSV"
-        
-        return df[col_load].to_numpy(), selected_file
+        arr_load = _read_load_profile_file(path_file)
+        if arr_load is None: return None, "Invalid CSV"
+        return arr_load, selected_file
     except Exception:
         return None, "Error Read"
 
 def get_master_solar_path(folder_path):
+    # Folder titik dataset -> lookup manifest; folder lain -> listing langsung
+    parts = os.path.relpath(folder_path, DATASET_DIR).split(os.sep)
+    if len(parts) == 2:
+        point = get_manifest()['regions'].get(parts[0], {}).get('points', {}).get(parts[1])
+        if point is not None:
+            return os.path.join(folder_path, point['solar_file']) if point['solar_file'] else None
+
     if not os.path.exists(folder_path): return None
     files = sorted([f for f in os.listdir(folder_path) if f.endswith('.parquet')])
     return os.path.join(folder_path, files[0]) if files else None
@@ -103,10 +435,255 @@ def get_wholesale_fees(region_name):
         return df_fees[df_fees['Region'] == region_name]
     return pd.DataFrame()
 
+def _year_gather_index(year, length, base_len):
+    """Index ke array dasar 365 hari untuk 1 tahun: 28 Feb diduplikasi jadi 29 Feb, lalu potong/pad (edge)."""
+    idx = np.arange(base_len, dtype=np.int64)
+    if calendar.isleap(year):
+        idx = np.concatenate([idx[:IDX_FEB_29_START], idx[IDX_FEB_28_START:IDX_FEB_29_START], idx[IDX_FEB_29_START:]])
+
+    if length <= len(idx):
+        return idx[:length]
+    return np.pad(idx, (0, length - len(idx)), 'edge')
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def get_gather_index(year_lengths, base_len):
+    """
+    Index gather tunggal untuk rangkaian tahun [(year, n_rows), ...].
+    Mapping hanya bergantung pada kalender & panjang tiap tahun, jadi di-cache
+    per rentang tahun dan dipakai ulang: base_arr[idx] langsung menghasilkan
+    kolom multi-tahun lengkap (kabisat + padding) dalam 1 fancy-index.
+    """
+    idx = np.concatenate([_year_gather_index(y, n, base_len) for y, n in year_lengths]) \
+        if year_lengths else np.zeros(0, dtype=np.int64)
+    idx.setflags(write=False)
+    return idx
+
+
+def _parse_timestamps(column):
+    """Kolom arrow string/timestamp -> datetime64[ns]. Cast pyarrow; format lain via pd.to_datetime."""
+    try:
+        return pc.cast(column, pa.timestamp('ns')).to_numpy()
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pd.to_datetime(column.to_numpy()).to_numpy(dtype='datetime64[ns]')
+
+
+def _read_price_year(file_price):
+    """
+    Baca 1 file price tahunan -> dict array {'timestamp', 'price_import'} terurut.
+    Hanya 2 kolom yang dibaca.
+    """
+    schema = get_parquet_schema(file_price)
+    col_ts, col_price = schema['timestamp'] or 'timestamp', schema['price'] or 'price_import'
+    if col_ts not in schema['columns'] or col_price not in schema['columns']:
+        raise KeyError(f"{os.path.basename(file_price)}: kolom timestamp/price_import tidak ditemukan")
+
+    table = pq.read_table(file_price, columns=[col_ts, col_price])
+    ts, price = _parse_timestamps(table.column(col_ts)), table.column(col_price).to_numpy()
+
+    if len(ts) > 1 and not (ts[1:] >= ts[:-1]).all():
+        order = pd.Series(ts).sort_values().index.to_numpy()
+        ts, price = ts[order], price[order]
+    return {'timestamp': ts, 'price_import': price}
+
+
+def _load_price_year(file_price):
+    """Worker thread: (dict array timestamp & price_import, None) atau (None, exception)."""
+    try:
+        return _read_price_year(file_price), None
+    except Exception as e:
+        return None, e
+
+
+def read_price_years(path_price_dir, start_year, end_year, workers=None, years=None):
+    """
+    Baca file price per tahun secara paralel di thread pool (decode parquet
+    pyarrow melepas GIL). Return list (year, df_price, error) urut tahun;
+    tahun tanpa file dilewati. Worker tidak memanggil st.*, caller yang
+    melaporkan error. workers=1 -> baca serial.
+    years: daftar tahun yang tersedia (dari manifest) -> tanpa cek file per tahun.
+    """
+    if years is None:
+        years = [y for y in range(start_year, end_year + 1)
+                 if os.path.exists(os.path.join(path_price_dir, f"{y}.parquet"))]
+    files = [(year, os.path.join(path_price_dir, f"{year}.parquet"))
+             for year in years if start_year <= year <= end_year]
+    if not files: return []
+
+    workers = min(workers or PRICE_READ_WORKERS, len(files))
+    if workers <= 1:
+        results = [_load_price_year(path) for _, path in files]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="price-read") as pool:
+            results = list(pool.map(_load_price_year, [path for _, path in files]))
+    return [(year, df_price, err) for (year, _), (df_price, err) in zip(files, results)]
+
+
+# =====================================================================
+# COLUMNAR REGION STORE
+# =====================================================================
+def get_region_store_path(nama_lokasi):
+    return os.path.join(DATASET_DIR, nama_lokasi, REGION_STORE_FILE)
+
+
+def _region_store_sources(nama_lokasi):
+    """File sumber region store (price per tahun + file solar tiap titik), dari manifest."""
+    region = get_manifest()['regions'].get(nama_lokasi, {'points': {}, 'price': {}})
+    path_lokasi = os.path.join(DATASET_DIR, nama_lokasi)
+    paths = [os.path.join(path_lokasi, "Price", entry['file']) for entry in region['price'].values()]
+    paths += [os.path.join(path_lokasi, nama_titik, point['solar_file'])
+              for nama_titik, point in region['points'].items() if point['solar_file']]
+    return sorted(paths)
+
+
+def build_region_store(nama_lokasi):
+    """
+    Compile 1 region menjadi 1 file Arrow IPC (tanpa kompresi, 1 chunk):
+    - timestamp            : int64 epoch (ns), grid 5 menit semua tahun berurutan
+    - price_import         : float64
+    - irradiance::<titik>  : float64, sudah di-expand per tahun (kabisat + padding)
+    - temperature::<titik> : float64
+    Sengaja float64 (bukan float32): nilai sumber seperti 38.325 bergeser saat
+    di-round 2 desimal, sehingga dataset regenerate mahasiswa tidak identik lagi.
+    Offset baris per tahun disimpan di schema metadata 'year_bounds'; (size,
+    mtime_ns) tiap file sumber di 'sources' (dicatat sebelum dibaca, sehingga
+    file yang berubah selama build tetap membuat store basi).
+    """
+    path_price_dir = os.path.join(DATASET_DIR, nama_lokasi, "Price")
+    sources = _source_stats(_region_store_sources(nama_lokasi))
+
+    ts_parts, price_parts, year_bounds = [], [], {}
+    offset = 0
+    for year in get_available_years(nama_lokasi, None):
+        price = _read_price_year(os.path.join(path_price_dir, f"{year}.parquet"))
+        n = len(price['timestamp'])
+        ts_parts.append(price['timestamp'].view(np.int64))
+        price_parts.append(np.asarray(price['price_import'], dtype=np.float64))
+        year_bounds[str(year)] = [offset, offset + n]
+        offset += n
+
+    if not year_bounds:
+        raise ValueError(f"No price data found for region {nama_lokasi}")
+
+    columns = {
+        'timestamp':    np.concatenate(ts_parts),
+        'price_import': np.concatenate(price_parts),
+    }
+
+    for nama_titik in get_list_titik(nama_lokasi):
+        solar_path = get_master_solar_path(os.path.join(DATASET_DIR, nama_lokasi, nama_titik))
+        if not solar_path: continue
+        base_irr, base_temp = load_solar_array(solar_path)
+        if base_irr is None: continue
+
+        year_lengths = tuple((int(y), end - start) for y, (start, end) in year_bounds.items())
+        idx = get_gather_index(year_lengths, len(base_irr))
+        columns[f'irradiance::{nama_titik}']  = np.asarray(base_irr, dtype=np.float64)[idx]
+        columns[f'temperature::{nama_titik}'] = np.asarray(base_temp, dtype=np.float64)[idx]
+
+    table = pa.table(columns).replace_schema_metadata({
+        'year_bounds': json.dumps(year_bounds),
+        'sources':     json.dumps(sources),
+    })
+
+    path_store = get_region_store_path(nama_lokasi)
+    path_tmp = path_store + ".tmp"
+    with pa.OSFile(path_tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=table.num_rows)
+    os.replace(path_tmp, path_store)
+    return path_store
+
+
+def build_all_region_stores():
+    """Build step: compile store untuk semua region di DATASET_DIR."""
+    return [build_region_store(lokasi) for lokasi in get_list_lokasi()]
+
+
+@st.cache_resource(show_spinner=False)
+def _open_region_store(path_store, store_mtime):
+    """Memory-map file store (zero-copy). store_mtime ikut jadi key cache agar rebuild terbaca."""
+    source = pa.memory_map(path_store, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    metadata = table.schema.metadata
+    year_bounds = {int(y): tuple(v) for y, v in json.loads(metadata[b'year_bounds']).items()}
+    sources = json.loads(metadata[b'sources']) if b'sources' in metadata else None
+    return table, year_bounds, sources
+
+
+def get_region_store(nama_lokasi):
+    """
+    Kembalikan (table, year_bounds) atau None jika store belum di-build atau
+    basi: file sumber (price / solar) ditambah, dihapus, atau berubah
+    (size / mtime_ns berbeda dari saat build, termasuk overwrite in-place).
+    """
+    path_store = get_region_store_path(nama_lokasi)
+    try:
+        store_mtime = os.stat(path_store).st_mtime_ns
+    except OSError:
+        return None
+    table, year_bounds, sources = _open_region_store(path_store, store_mtime)
+    if sources != _source_stats(_region_store_sources(nama_lokasi)):
+        return None
+    return table, year_bounds
+
+
+def get_region_slice(nama_lokasi, nama_titik, start_year, end_year):
+    """
+    Ambil slice zero-copy (view read-only ke memory map) untuk rentang tahun.
+    Return dict array + 'years' [(year, n_rows), ...], atau None jika store
+    tidak tersedia / titik tidak ada di store (caller fallback ke parquet).
+    """
+    store = get_region_store(nama_lokasi)
+    if store is None: return None
+    table, year_bounds = store
+
+    col_irr, col_temp = f'irradiance::{nama_titik}', f'temperature::{nama_titik}'
+    if col_irr not in table.column_names: return None
+
+    years = [y for y in sorted(year_bounds) if start_year <= y <= end_year]
+    if not years:
+        return {'years': []}
+
+    # Tahun di store berurutan & bersambung, jadi rentang tahun = 1 slice kontigu
+    row_start = year_bounds[years[0]][0]
+    row_end   = year_bounds[years[-1]][1]
+
+    def _col(name):
+        return table.column(name).chunk(0).to_numpy(zero_copy_only=True)[row_start:row_end]
+
+    return {
+        'timestamp':    _col('timestamp'),
+        'price_import': _col('price_import'),
+        'irradiance':   _col(col_irr),
+        'temperature':  _col(col_temp),
+        'years':        [(y, year_bounds[y][1] - year_bounds[y][0]) for y in years],
+    }
+
+
 @st.cache_data(show_spinner=False, max_entries=10)
 def load_and_merge_data(nama_lokasi, nama_titik, start_year, end_year, fixed_load_file=None):
     path_titik = os.path.join(DATASET_DIR, nama_lokasi, nama_titik)
     path_price_dir = os.path.join(DATASET_DIR, nama_lokasi, "Price")
+
+    # Jalur cepat: slice dari columnar store region (tanpa baca parquet per tahun)
+    store_cols = get_region_slice(nama_lokasi, nama_titik, start_year, end_year)
+    if store_cols is not None:
+        base_load, load_name = load_load_profile_array(fixed_load_file)
+        if base_load is None:
+            st.error("Failed to load solar/load array data.")
+            return None
+        if not store_cols['years']: return None
+
+        idx = get_gather_index(tuple(store_cols['years']), len(base_load))
+        arr_load = base_load[idx]
+        return pd.DataFrame({
+            'timestamp':    store_cols['timestamp'].view('datetime64[ns]'),
+            'price_import': store_cols['price_import'],
+            'irradiance':   store_cols['irradiance'],
+            'temperature':  store_cols['temperature'],
+            'load_profile': arr_load,
+        })
     
     solar_path = get_master_solar_path(path_titik)
     if not solar_path:
@@ -120,56 +697,38 @@ def load_and_merge_data(nama_lokasi, nama_titik, start_year, end_year, fixed_loa
     if base_irr is None or base_load is None:
         st.error("Failed to load solar/load array data.")
         return None
-        
 
-    extra_irr = base_irr[IDX_FEB_28_START:IDX_FEB_29_START]
-    extra_temp = base_temp[IDX_FEB_28_START:IDX_FEB_29_START]
-    extra_load = base_load[IDX_FEB_28_START:IDX_FEB_29_START]
+    list_price = []
+    year_lengths = []
 
-    list_df_final = []
+    # Semua tahun dibaca paralel; error dilaporkan di sini (script thread) urut tahun
+    available = get_available_years(nama_lokasi, nama_titik)
+    for year, price, err in read_price_years(path_price_dir, start_year, end_year, years=available):
+        if err is not None:
+            st.error(f"Error processing year {year}: {err}")
+            continue
+        list_price.append(price)
+        year_lengths.append((year, len(price['timestamp'])))
 
-    for year in range(start_year, end_year + 1):
-        file_price = os.path.join(path_price_dir, f"{year}.parquet")
-        if not os.path.exists(file_price): continue
-            
-        try:
-            df_price = pd.read_parquet(file_price)
-            df_price['timestamp'] = pd.to_datetime(df_price['timestamp'])
-            df_price = df_price.sort_values('timestamp').reset_index(drop=True)
-
-            if 'harga_listrik' in df_price.columns:
-                df_price.rename(columns={'harga_listrik': 'price_import'}, inplace=True)
-
-            is_leap = calendar.isleap(year)
-            
-            if is_leap:
-                curr_irr = np.concatenate([base_irr[:IDX_FEB_29_START], extra_irr, base_irr[IDX_FEB_29_START:]])
-                curr_temp = np.concatenate([base_temp[:IDX_FEB_29_START], extra_temp, base_temp[IDX_FEB_29_START:]])
-                curr_load = np.concatenate([base_load[:IDX_FEB_29_START], extra_load, base_load[IDX_FEB_29_START:]])
-            else:
-                curr_irr = base_irr
-                curr_temp = base_temp
-                curr_load = base_load
-
-            len_price = len(df_price)
-            len_data = len(curr_irr)
-            
-            if len_price <= len_data:
-                df_price['irradiance'] = curr_irr[:len_price]
-                df_price['temperature'] = curr_temp[:len_price]
-                df_price['load_profile'] = curr_load[:len_price]
-            else:
-                pad_len = len_price - len_data
-                df_price['irradiance'] = np.pad(curr_irr, (0, pad_len), 'edge')
-                df_price['temperature'] = np.pad(curr_temp, (0, pad_len), 'edge')
-                df_price['load_profile'] = np.pad(curr_load, (0, pad_len), 'edge')
-
-            cols = ['timestamp', 'price_import', 'irradiance', 'temperature', 'load_profile']
-            list_df_final.append(df_price[cols])
-            
-        except Exception as e:
-            st.error(f"Error processing year {year}: {e}")
-
-    if not list_df_final: return None
-
-    return pd.concat(list_df_final, ignore_index=True)
\ No newline at end of file
+    if not list_price: return None
+
+    df_final = pd.DataFrame({
+        col: np.concatenate([p[col] for p in list_price])
+        for col in ('timestamp', 'price_import')
+    })
+
+    # Semua tahun sekaligus: 1 gather index -> 1 fancy-index per kolom
+    idx_solar = get_gather_index(tuple(year_lengths), len(base_irr))
+    idx_load  = idx_solar if len(base_load) == len(base_irr) else get_gather_index(tuple(year_lengths), len(base_load))
+    df_final['irradiance']   = base_irr[idx_solar]
+    df_final['temperature']  = base_temp[idx_solar]
+    df_final['load_profile'] = base_load[idx_load]
+
+    return df_final
+
+if __name__ == "__main__":
+    for path in build_all_region_stores():
+        print(f"✅ Region store built: {path}")
+    print(f"✅ Load profile bank built: {build_load_profile_bank()}")
+    # Terakhir: build di atas mengubah mtime folder dataset
+    print(f"✅ Dataset manifest built: {build_manifest()}")
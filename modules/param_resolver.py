@@ -0,0 +1,289 @@
+"""
+modules/param_resolver.py
+Resolusi parameter generate dari state config (session_state atau dict hasil
+config.build_state): lokasi, durasi, load profile, ukuran solar & baterai,
+dan skema tarif -> snapshot `used_params` + params untuk calculator.
+
+Dipakai oleh main.py (tombol Generate) dan modules/batch_generate.py (CLI).
+Urutan pemanggilan `random` sama persis dengan flow UI, sehingga dengan seed
+yang sama (student_log.generate_seed) hasilnya identik.
+"""
+
+import random
+import numpy as np
+from datetime import time
+
+from modules import loader, calculator
+from modules import assignment as asgn
+
+SEGMENTS        = 5              # jumlah segmen rentang solar / baterai
+LOAD_MULT_RANGE = (8.0, 32.0)    # multiplier load profile jika di-random
+TARIFF_SCHEMES  = ("Flat", "Time of Use", "Wholesale Price")
+
+
+def seed_all(seed_val):
+    """Set seed `random` & `np.random` (seed_val=None -> acak)."""
+    random.seed(seed_val)
+    np.random.seed(seed_val)
+
+
+# =====================================================================
+# RESOLUSI PARAMETER
+# =====================================================================
+def _resolve_location(state):
+    if state.get('chk_loc', False):
+        selected_loc = state.get('loc_region')
+        raw_point = state.get('loc_point')
+
+        if raw_point == "Randomize":
+            list_titik = loader.get_list_titik(selected_loc)
+            selected_point = random.choice(list_titik) if list_titik else None
+        else:
+            selected_point = raw_point
+    else:
+        list_lokasi = loader.get_list_lokasi()
+        selected_loc = random.choice(list_lokasi)
+        list_titik_random = loader.get_list_titik(selected_loc)
+        selected_point = random.choice(list_titik_random) if list_titik_random else None
+    return selected_loc, selected_point
+
+
+def _resolve_duration(state, selected_loc, selected_point):
+    if state.get('chk_dur', False):
+        return state.get('date_start', 2020), state.get('date_end', 2020)
+
+    actual_years = loader.get_available_years(selected_loc, selected_point)
+    if not actual_years:
+        return 2020, 2020
+
+    dur_req = state.get('rand_dur_years', 1)
+    dur_req = min(dur_req, len(actual_years))
+
+    max_start_idx = len(actual_years) - dur_req
+    rand_idx = random.randint(0, max_start_idx)
+    return actual_years[rand_idx], actual_years[rand_idx + dur_req - 1]
+
+
+def _resolve_load(state):
+    all_files = loader.get_list_load_profiles()
+
+    if state.get('chk_load', False):
+        return state.get('sel_load_file', None), state.get('load_mult', 15.0)
+    if not all_files:
+        raise ValueError("No load profile files found!")
+    return random.choice(all_files), round(random.uniform(*LOAD_MULT_RANGE), 1)
+
+
+def _resolve_solar(state, final_load_mult):
+    """Return (kapasitas kWp, is_fixed). Segmen solar mengikuti besar multiplier load."""
+    if state.get('chk_solar', False):
+        return round(state.get('sol_fix', 5.0) * 2) / 2, True
+
+    p_solar_min = state.get('sol_min', 4.0)
+    p_solar_max = state.get('sol_max', 6.0)
+    solar_segment_width = (p_solar_max - p_solar_min) / SEGMENTS
+
+    if final_load_mult < 16.0:
+        start_seg_solar, end_seg_solar = 0, 2
+    elif final_load_mult < 24.0:
+        start_seg_solar, end_seg_solar = 1, 3
+    else:
+        start_seg_solar, end_seg_solar = 2, 4
+
+    final_solar_min = p_solar_min + (start_seg_solar * solar_segment_width)
+    final_solar_max = p_solar_min + ((end_seg_solar + 1) * solar_segment_width)
+
+    raw_solar = random.uniform(final_solar_min, final_solar_max)
+    return round(raw_solar * 2) / 2, False
+
+
+def _resolve_battery(state, final_p_solar, is_solar_fixed):
+    """Return (kapasitas kWh, daya charge/discharge kW). Segmen baterai mengikuti posisi solar."""
+    p_solar_min = state.get('sol_min', 4.0)
+    p_solar_max = state.get('sol_max', 6.0)
+    p_bat_min = state.get('bat_min', 8.0)
+    p_bat_max = state.get('bat_max', 12.0)
+    bat_total_range = p_bat_max - p_bat_min
+
+    if not state.get('chk_bat', False):
+        bat_segment_width = bat_total_range / SEGMENTS
+
+        if is_solar_fixed:
+            mid = (SEGMENTS - 1) // 2
+            start_seg = max(0, mid - 1)
+            end_seg   = min(SEGMENTS - 1, mid + 1)
+        else:
+            solar_range = p_solar_max - p_solar_min
+            if solar_range <= 0:
+                current_segment = (SEGMENTS - 1) // 2
+            else:
+                relative_pos = (final_p_solar - p_solar_min) / solar_range
+                raw_segment = int(relative_pos * SEGMENTS)
+                current_segment = max(0, min(SEGMENTS - 1, raw_segment))
+
+            start_seg = max(0, current_segment - 1)
+            end_seg   = min(SEGMENTS - 1, current_segment + 1)
+
+        final_bat_min = p_bat_min + (start_seg * bat_segment_width)
+        final_bat_max = p_bat_min + ((end_seg + 1) * bat_segment_width)
+
+        raw_bat = random.uniform(final_bat_min, final_bat_max)
+        final_p_bat = round(raw_bat * 2) / 2
+    else:
+        final_p_bat = state.get('bat_fix', 10.0)
+
+    if bat_total_range <= 0:
+        bat_segment_idx = 2
+    else:
+        bat_segment_idx = int((final_p_bat - p_bat_min) / (bat_total_range / SEGMENTS))
+        bat_segment_idx = max(0, min(SEGMENTS - 1, bat_segment_idx))
+
+    if bat_segment_idx == 0:
+        auto_charge_power = 5.0
+    elif bat_segment_idx in [1, 2]:
+        auto_charge_power = 10.0
+    else:
+        auto_charge_power = 15.0
+    return final_p_bat, auto_charge_power
+
+
+def _tariff_snapshot(state, tariff_scheme):
+    tariff_snapshot = {'tariff_scheme': tariff_scheme}
+
+    if tariff_scheme == "Time of Use":
+        tariff_snapshot.update({
+            'peak_price': state.get('pp', 0.45), 'exp_peak': state.get('e_peak', 0.15),
+            'peak_start': state.get('t_p_start', time(17,0)).strftime("%H:%M"),
+            'peak_end': state.get('t_p_end', time(20,0)).strftime("%H:%M"),
+            'offpeak_price': state.get('po', 0.15), 'exp_offpeak': state.get('e_offpeak', 0.05),
+            'offpeak_start': state.get('t_o_start', time(22,0)).strftime("%H:%M"),
+            'offpeak_end': state.get('t_o_end', time(6,0)).strftime("%H:%M"),
+            'shoulder_price': state.get('ps', 0.25), 'exp_shoulder': state.get('e_shoulder', 0.10),
+            'shoulder_start': state.get('t_s_start', time(14,0)).strftime("%H:%M"),
+            'shoulder_end': state.get('t_s_end', time(17,0)).strftime("%H:%M"),
+        })
+    elif tariff_scheme == "Flat":
+        tariff_snapshot['import_flat'] = state.get('imp_tariff', 0.20)
+        tariff_snapshot['export_price'] = state.get('exp_tariff', 0.08)
+    return tariff_snapshot
+
+
+def resolve_generate(state, assignment_type):
+    """
+    Tentukan semua parameter 1x generate dari state config.
+    Memakai `random` global: panggil seed_all() dulu untuk hasil ber-seed.
+    Return dict: used_params (snapshot untuk log/cache), region, point,
+    start_year, end_year, load_file, load_mult, tariff_scheme.
+    Raise ValueError jika tidak ada file load profile.
+    """
+    tariff_scheme = state.get('tariff_scheme', 'Flat')
+    if tariff_scheme == "Random":
+        tariff_scheme = random.choice(list(TARIFF_SCHEMES))
+
+    selected_loc, selected_point = _resolve_location(state)
+    final_start_y, final_end_y = _resolve_duration(state, selected_loc, selected_point)
+    final_load_file, final_load_mult = _resolve_load(state)
+    final_p_solar, is_solar_fixed = _resolve_solar(state, final_load_mult)
+
+    # Baterai hanya untuk Assignment 1
+    final_p_bat, auto_charge_power = None, None
+    if assignment_type == asgn.ASSIGNMENT_1:
+        final_p_bat, auto_charge_power = _resolve_battery(state, final_p_solar, is_solar_fixed)
+
+    range_soc = state.get('bat_soc_range', (10, 90))
+    used_params = {
+        'assignment_type': assignment_type,
+        'solar': final_p_solar,
+        'solar_pr': state.get('sol_pr', 0.8),
+        'solar_temp': state.get('sol_temp', -0.004),
+        'bat': final_p_bat,
+        'bat_eff': state.get('bat_eff', 95) / 100,
+        'bat_soc_init': state.get('bat_soc_init', 50) / 100,
+        'bat_charge_kw': auto_charge_power,
+        'bat_discharge_kw': auto_charge_power,
+        'soc_min': range_soc[0] / 100,
+        'soc_max': range_soc[1] / 100,
+        'vpp_thresh': state.get('vpp_threshold', 800),
+        'tariff_data': _tariff_snapshot(state, tariff_scheme),
+        'location': f"{selected_loc} - {selected_point}",
+        'period': f"{final_start_y}" if final_start_y == final_end_y else f"{final_start_y} to {final_end_y}",
+        'load_source': final_load_file,
+        'load_multiplier': final_load_mult
+    }
+
+    return {
+        'used_params':   used_params,
+        'region':        selected_loc,
+        'point':         selected_point,
+        'start_year':    final_start_y,
+        'end_year':      final_end_y,
+        'load_file':     final_load_file,
+        'load_mult':     final_load_mult,
+        'tariff_scheme': tariff_scheme,
+    }
+
+
+# =====================================================================
+# INPUT & PARAMS SIMULASI
+# =====================================================================
+def build_sim_params(state, resolved):
+    """Params untuk calculator.run_simulation dari state + hasil resolve_generate."""
+    used = resolved['used_params']
+    params = {
+        'solar_capacity_kw': used['solar'],
+        'temp_coeff': used['solar_temp'],
+        'pr': used['solar_pr'],
+        't_offpeak_start': state.get('t_o_start', time(22,0)),
+        't_offpeak_end': state.get('t_o_end', time(6,0)),
+        't_peak_start': state.get('t_p_start', time(17,0)),
+        't_peak_end': state.get('t_p_end', time(20,0)),
+        't_shoulder_start': state.get('t_s_start', time(14,0)),
+        't_shoulder_end': state.get('t_s_end', time(17,0)),
+        'tariff_scheme': resolved['tariff_scheme'],
+        'df_wholesale_fees': loader.get_wholesale_fees(resolved['region']),
+        'export_price': state.get('exp_tariff', 0.08),
+        'import_flat': state.get('imp_tariff', 0.20),
+        'peak_price': state.get('pp', 0.45),
+        'offpeak_price': state.get('po', 0.15),
+        'shoulder_price': state.get('ps', 0.25),
+        'exp_peak': state.get('e_peak', 0.15),
+        'exp_offpeak': state.get('e_offpeak', 0.05),
+        'exp_shoulder': state.get('e_shoulder', 0.10)
+    }
+
+    if used['assignment_type'] == asgn.ASSIGNMENT_1 and used['bat'] is not None:
+        params.update({
+            'battery_capacity_kwh': used['bat'],
+            'battery_efficiency': used['bat_eff'],
+            'battery_initial_soc': used['bat_soc_init'],
+            'max_charge_kw': used['bat_charge_kw'],
+            'max_discharge_kw': used['bat_discharge_kw'],
+            'soc_min_pct': used['soc_min'],
+            'soc_max_pct': used['soc_max'],
+            'dispatch_price_threshold': used['vpp_thresh'],
+        })
+    return params
+
+
+def load_input(resolved):
+    """Data input gabungan (solar + price + load x multiplier), atau None jika gagal dimuat."""
+    df_input = loader.load_and_merge_data(
+        resolved['region'],
+        resolved['point'],
+        resolved['start_year'],
+        resolved['end_year'],
+        fixed_load_file=resolved['load_file']
+    )
+    if df_input is not None:
+        col_load_name = 'load_profile' if 'load_profile' in df_input.columns else 'beban_rumah_kw'
+        df_input[col_load_name] = df_input[col_load_name] * resolved['load_mult']
+    return df_input
+
+
+def run_resolved(state, resolved):
+    """Load input + simulasi untuk hasil resolve_generate. None jika dataset gagal dimuat."""
+    df_input = load_input(resolved)
+    if df_input is None:
+        return None
+    assignment_type = resolved['used_params']['assignment_type']
+    return calculator.run_simulation(df_input, build_sim_params(state, resolved), assignment_type)
@@ -0,0 +1,141 @@
+"""
+modules/result_cache.py
+Cache hasil simulasi lintas session & proses (content-addressed, di disk).
+
+Key = hash kanonik dari snapshot `used_params` + versi dataset + versi pipeline
+(kode loader / param_resolver / calculator + RESULT_FORMAT_VERSION).
+Value = DataFrame hasil run_simulation, disimpan sebagai 1 file parquet.
+Ukuran folder dibatasi; file yang paling lama tidak dipakai dihapus dulu (LRU
+berdasarkan mtime, di-update setiap cache hit).
+"""
+
+import os
+import json
+import hashlib
+import pandas as pd
+
+from modules import loader
+
+CACHE_DIR       = os.path.join(".cache", "results")
+CACHE_MAX_BYTES = 2 * 1024 ** 3     # 2 GB
+CACHE_EXT       = ".parquet"
+
+# Naikkan jika ada perubahan pipeline di luar _PIPELINE_FILES (mis. susunan
+# sim_params di main.py) yang membuat hasil lama tidak valid lagi
+RESULT_FORMAT_VERSION = 1
+
+# Kode yang menentukan isi hasil: penyusunan input (loader, param_resolver) + engine
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PIPELINE_FILES = [os.path.join(_MODULE_DIR, f) for f in ("calculator.py", "loader.py", "param_resolver.py")]
+
+# Artefak turunan di folder dataset (dibangun ulang loader dari file sumber)
+_DERIVED_FILES = {
+    loader.REGION_STORE_FILE,
+    os.path.basename(loader.LOAD_BANK_FILE),
+    os.path.basename(loader.LOAD_BANK_INDEX),
+}
+_version_memo = {}
+
+
+def _hash_pipeline_source():
+    h = hashlib.sha256(f"format={RESULT_FORMAT_VERSION}\n".encode("utf-8"))
+    for path in _PIPELINE_FILES:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _is_source_file(name):
+    return name not in _DERIVED_FILES and ".tmp" not in name
+
+
+def _hash_dataset_files():
+    """Hash (path, size, mtime) semua file sumber dataset. Tanpa membaca isi file."""
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(loader.DATASET_DIR):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(filter(_is_source_file, files)):
+            path = os.path.join(root, name)
+            try:
+                st_ = os.stat(path)
+            except OSError:
+                continue
+            h.update(f"{path}|{st_.st_size}|{st_.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_dataset_version():
+    """
+    Versi data + pipeline. Kode di-hash sekali per proses (kode baru = proses
+    baru); stat file dataset dicek ulang setiap dipanggil, sehingga file yang
+    diganti / diubah saat app berjalan langsung menghasilkan key baru.
+    """
+    if "pipeline" not in _version_memo:
+        _version_memo["pipeline"] = _hash_pipeline_source()
+    return f"{_hash_dataset_files()[:16]}-{_version_memo['pipeline'][:16]}"
+
+
+def make_key(used_params, dataset_version=None):
+    """Hash kanonik (sort_keys, separator tetap) dari snapshot parameter."""
+    dataset_version = dataset_version or get_dataset_version()
+    canonical = json.dumps(used_params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{dataset_version}|{canonical}".encode("utf-8")).hexdigest()
+
+
+def _path_for(key):
+    return os.path.join(CACHE_DIR, key + CACHE_EXT)
+
+
+def get_result(key):
+    """Ambil hasil dari cache, atau None jika miss / file rusak / sudah di-evict proses lain."""
+    path = _path_for(key)
+    try:
+        df = pd.read_parquet(path)
+        os.utime(path)  # tandai baru dipakai (LRU)
+        return df
+    except Exception:
+        return None
+
+
+def put_result(key, df_result):
+    """Simpan hasil secara atomik (tmp + os.replace) lalu jalankan eviction."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path_for(key)
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        df_result.to_parquet(path_tmp, index=False)
+        os.replace(path_tmp, path)
+    except Exception:
+        if os.path.exists(path_tmp):
+            os.remove(path_tmp)
+        return False
+    evict(CACHE_MAX_BYTES)
+    return True
+
+
+def evict(max_bytes=CACHE_MAX_BYTES):
+    """Hapus file paling lama tidak dipakai sampai total ukuran <= max_bytes."""
+    try:
+        entries = []
+        for name in os.listdir(CACHE_DIR):
+            if not name.endswith(CACHE_EXT): continue
+            path = os.path.join(CACHE_DIR, name)
+            try:
+                st_ = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st_.st_mtime, st_.st_size, path))
+    except OSError:
+        return 0
+
+    total = sum(e[1] for e in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes: break
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+        total -= size
+    return removed
@@ -0,0 +1,479 @@
+"""
+modules/storage.py
+Backend penyimpanan untuk tabel config_history & student_logs.
+
+- SupabaseBackend: tabel Supabase (PostgREST).
+- SQLiteBackend  : file SQLite lokal (WAL, kolom filter ber-index) untuk
+  deployment 1 node, load test, dan CI tanpa jaringan.
+
+Backend dipilih saat pertama dipakai (get_storage), bukan saat import:
+STORAGE_BACKEND = "supabase" / "sqlite" dari environment variable atau
+st.secrets. Jika tidak di-set: supabase (butuh SUPABASE_URL & SUPABASE_KEY).
+SQLite (SQLITE_PATH, default STORAGE_SQLITE_PATH) hanya dipakai jika
+STORAGE_BACKEND=sqlite di-set eksplisit, supaya deployment yang lupa secrets
+tidak diam-diam menulis ke file lokal.
+
+Semua method mengembalikan baris sebagai dict (seperti response.data
+Supabase; Parameter_Snapshot berupa dict). Error diteruskan ke pemanggil.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import warnings
+from abc import ABC, abstractmethod
+import streamlit as st
+
+TAB_CONFIG = "config_history"
+TAB_LOGS   = "student_logs"
+
+CONFIG_HISTORY_LIMIT = 10
+STORAGE_SQLITE_PATH  = os.path.join("data", "storage.sqlite")
+
+# Kolom ringkasan parameter di student_logs (dihitung saat log ditulis, lihat
+# student_log.log_summary) -> tipe kolom SQL
+LOG_SUMMARY_COLS = {
+    "location":        "TEXT",
+    "period":          "TEXT",
+    "solar_kwp":       "REAL",
+    "battery_kwh":     "REAL",
+    "load_source":     "TEXT",
+    "load_multiplier": "REAL",
+    "tariff_scheme":   "TEXT",
+}
+
+# Id unik per log (dibuat saat log masuk antrian writer): insert log idempoten,
+# sehingga log yang terkirim ulang (retry / spool di-replay) tidak dobel
+LOG_ENTRY_COL = "entry_id"
+
+# Kolom student_logs yang ditambah lewat migrasi. Selama migrasi belum
+# dijalankan, SupabaseBackend menulis log tanpa kolom ini.
+LOG_OPTIONAL_COLS = (LOG_ENTRY_COL, *LOG_SUMMARY_COLS)
+
+# Kode error PostgREST / Postgres untuk kolom yang tidak ada
+MISSING_COLUMN_CODES = ("PGRST204", "42703")
+
+# Migrasi tabel Supabase (jalankan sekali di SQL editor sebelum deploy)
+SUPABASE_LOG_ENTRY_SQL = (
+    f"ALTER TABLE {TAB_LOGS} ADD COLUMN IF NOT EXISTS {LOG_ENTRY_COL} text;\n"
+    f"CREATE UNIQUE INDEX IF NOT EXISTS idx_logs_entry ON {TAB_LOGS} ({LOG_ENTRY_COL});\n"
+)
+SUPABASE_LOG_SUMMARY_SQL = (
+    f"ALTER TABLE {TAB_LOGS}\n"
+    + ",\n".join(
+        f"  ADD COLUMN IF NOT EXISTS {c} {'double precision' if t == 'REAL' else 'text'}"
+        for c, t in LOG_SUMMARY_COLS.items()
+    )
+    + f";\nCREATE INDEX IF NOT EXISTS idx_logs_tariff ON {TAB_LOGS} (tariff_scheme);\n"
+)
+
+
+def _setting(key, default=None):
+    """Environment variable, lalu st.secrets (tanpa error jika secrets.toml tidak ada)."""
+    if os.environ.get(key):
+        return os.environ[key]
+    try:
+        return st.secrets.get(key, default)
+    except Exception:
+        return default
+
+
+class StorageBackend(ABC):
+    """Interface backend. Filter teks (nim, config_name) = 'mengandung', case-insensitive."""
+
+    name = "base"
+
+    # --- config_history ---
+    @abstractmethod
+    def config_history(self, assignment_type, limit=CONFIG_HISTORY_LIMIT):
+        """Config terbaru (id desc) dengan Config_Name tidak kosong."""
+
+    @abstractmethod
+    def latest_config(self, assignment_type):
+        ...
+
+    @abstractmethod
+    def config_by_name(self, config_name, assignment_type):
+        ...
+
+    @abstractmethod
+    def insert_config(self, row):
+        ...
+
+    # --- student_logs ---
+    @abstractmethod
+    def insert_logs(self, rows):
+        """
+        Bulk insert beberapa baris log dalam 1 request / transaksi. Baris dengan
+        entry_id yang sudah ada diabaikan (aman dikirim ulang).
+        """
+
+    @abstractmethod
+    def query_logs(self, assignment_type=None, nim=None, config_name=None, date_from=None, date_to=None,
+                   location=None, tariff_scheme=None, sort=None, offset=0, limit=None, count=False):
+        """
+        Log dengan NIM & Timestamp terisi. location: 'mengandung'; tariff_scheme: sama persis.
+        sort: (kolom, descending) atau None.
+        Return (rows, total baris yang cocok jika count=True, selain itu None).
+        """
+
+    @abstractmethod
+    def logs_missing_summary(self, after_id=0, limit=500):
+        """Log (id, Parameter_Snapshot) dengan id > after_id yang kolom ringkasannya belum terisi, urut id."""
+
+    @abstractmethod
+    def update_log_summaries(self, updates):
+        """updates: list (id, dict kolom ringkasan)."""
+
+    def is_permanent_error(self, error):
+        """True jika error tidak akan hilang dengan retry (data / schema ditolak), bukan gangguan sementara."""
+        return isinstance(error, (TypeError, ValueError))
+
+
+# =====================================================================
+# SUPABASE
+# =====================================================================
+class SupabaseBackend(StorageBackend):
+    name = "supabase"
+
+    def __init__(self, client):
+        self.client = client
+        self.missing_log_cols = None   # dicek saat insert log pertama
+
+    def _has_log_cols(self, cols):
+        """False jika salah satu kolom belum ada di student_logs."""
+        try:
+            self.client.table(TAB_LOGS).select(",".join(cols)).limit(0).execute()
+            return True
+        except Exception as e:
+            if str(getattr(e, "code", "")) not in MISSING_COLUMN_CODES:
+                raise
+            return False
+
+    def _missing_log_cols(self):
+        """Kolom LOG_OPTIONAL_COLS yang belum ada di tabel (dicek sekali per proses)."""
+        if self.missing_log_cols is None:
+            missing = set()
+            if not self._has_log_cols(LOG_OPTIONAL_COLS):
+                missing = {c for c in LOG_OPTIONAL_COLS if not self._has_log_cols([c])}
+            if missing:
+                warnings.warn(
+                    f"{TAB_LOGS} belum punya kolom {', '.join(sorted(missing))}: log disimpan tanpa kolom "
+                    f"tersebut. Jalankan SUPABASE_LOG_ENTRY_SQL / SUPABASE_LOG_SUMMARY_SQL lalu restart app."
+                )
+            self.missing_log_cols = missing
+        return self.missing_log_cols
+
+    @staticmethod
+    def _like(text):
+        # Wildcard PostgREST = *
+        return "*" + str(text).strip().replace("*", "").replace("%", "") + "*"
+
+    def config_history(self, assignment_type, limit=CONFIG_HISTORY_LIMIT):
+        return self.client.table(TAB_CONFIG)\
+            .select("*")\
+            .neq("Config_Name", "")\
+            .eq("assignment_type", assignment_type)\
+            .order("id", desc=True)\
+            .limit(limit)\
+            .execute().data
+
+    def latest_config(self, assignment_type):
+        data = self.client.table(TAB_CONFIG)\
+            .select("*")\
+            .eq("assignment_type", assignment_type)\
+            .order("id", desc=True)\
+            .limit(1)\
+            .execute().data
+        return data[0] if data else None
+
+    def config_by_name(self, config_name, assignment_type):
+        data = self.client.table(TAB_CONFIG)\
+            .select("*")\
+            .eq("Config_Name", config_name)\
+            .eq("assignment_type", assignment_type)\
+            .order("id", desc=True)\
+            .limit(1)\
+            .execute().data
+        return data[0] if data else None
+
+    def insert_config(self, row):
+        self.client.table(TAB_CONFIG).insert(row).execute()
+
+    def insert_logs(self, rows):
+        rows = list(rows)
+        for attempt in range(2):
+            missing = self._missing_log_cols()
+            data = [{k: v for k, v in row.items() if k not in missing} for row in rows] if missing else rows
+            table = self.client.table(TAB_LOGS)
+            try:
+                if LOG_ENTRY_COL in missing:
+                    # Tanpa kolom entry_id insert biasa (tidak idempoten)
+                    table.insert(data).execute()
+                else:
+                    table.upsert(data, on_conflict=LOG_ENTRY_COL, ignore_duplicates=True).execute()
+                return
+            except Exception as e:
+                # Schema berubah setelah dicek -> cek ulang sekali
+                if attempt or str(getattr(e, "code", "")) not in MISSING_COLUMN_CODES:
+                    raise
+                self.missing_log_cols = None
+
+    def query_logs(self, assignment_type=None, nim=None, config_name=None, date_from=None, date_to=None,
+                   location=None, tariff_scheme=None, sort=None, offset=0, limit=None, count=False):
+        query = self.client.table(TAB_LOGS).select("*", count="exact" if count else None)\
+            .not_.is_("NIM", "null")\
+            .not_.is_("Timestamp", "null")
+        if assignment_type:
+            query = query.eq("assignment_type", assignment_type)
+        if nim:
+            query = query.ilike("NIM", self._like(nim))
+        if config_name:
+            query = query.ilike("Config_Name", self._like(config_name))
+        if date_from:
+            query = query.gte("Timestamp", f"{date_from} 00:00:00")
+        if date_to:
+            query = query.lte("Timestamp", f"{date_to} 23:59:59")
+        if location:
+            query = query.ilike("location", self._like(location))
+        if tariff_scheme:
+            query = query.eq("tariff_scheme", tariff_scheme)
+        if sort:
+            sort_col, sort_desc = sort
+            query = query.order(sort_col, desc=sort_desc).order("id", desc=sort_desc)
+        if limit is not None:
+            query = query.range(offset, offset + limit - 1)
+
+        response = query.execute()
+        return response.data, (response.count or 0) if count else None
+
+    def logs_missing_summary(self, after_id=0, limit=500):
+        return self.client.table(TAB_LOGS)\
+            .select("id, Parameter_Snapshot")\
+            .is_("location", "null")\
+            .gt("id", after_id)\
+            .order("id")\
+            .limit(limit)\
+            .execute().data
+
+    def update_log_summaries(self, updates):
+        # PostgREST tidak punya bulk update dengan nilai berbeda per baris
+        for log_id, summary in updates:
+            self.client.table(TAB_LOGS).update(summary).eq("id", log_id).execute()
+
+    def is_permanent_error(self, error):
+        # Error PostgREST (kolom tidak dikenal, data / constraint ditolak). Error
+        # auth (PGRST3xx) dan hak akses (42501) dianggap salah konfigurasi yang
+        # bisa diperbaiki, jadi tetap di-retry.
+        code = str(getattr(error, "code", None) or "")
+        if code.startswith("PGRST"):
+            return not code.startswith("PGRST3")
+        if code[:2] in ("22", "23", "42"):
+            return code != "42501"
+        return super().is_permanent_error(error)
+
+
+# =====================================================================
+# SQLITE
+# =====================================================================
+class SQLiteBackend(StorageBackend):
+    """
+    1 koneksi per thread (Streamlit menjalankan tiap session di thread sendiri).
+    config_history: kolom filter + kolom config lain sebagai JSON (`data`),
+    sehingga field config baru tidak perlu migrasi schema.
+    """
+
+    name = "sqlite"
+
+    CONFIG_COLS = ("Timestamp", "Config_Name", "assignment_type")
+    LOG_COLS    = ("Timestamp", "NIM", "Config_Name", "Parameter_Snapshot", "assignment_type",
+                   LOG_ENTRY_COL, *LOG_SUMMARY_COLS)
+    SORT_COLS   = {"id", "created_at", "Timestamp", "NIM", "Config_Name", "assignment_type", *LOG_SUMMARY_COLS}
+
+    SCHEMA = f"""
+        CREATE TABLE IF NOT EXISTS {TAB_CONFIG} (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at      TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+            "Timestamp"     TEXT,
+            "Config_Name"   TEXT,
+            assignment_type TEXT,
+            data            TEXT NOT NULL DEFAULT '{{}}'
+        );
+        CREATE INDEX IF NOT EXISTS idx_config_asgn_id ON {TAB_CONFIG} (assignment_type, id);
+        CREATE INDEX IF NOT EXISTS idx_config_name    ON {TAB_CONFIG} ("Config_Name", assignment_type, id);
+
+        CREATE TABLE IF NOT EXISTS {TAB_LOGS} (
+            id                   INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at           TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+            "Timestamp"          TEXT,
+            "NIM"                TEXT,
+            "Config_Name"        TEXT,
+            "Parameter_Snapshot" TEXT,
+            assignment_type      TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_logs_asgn_ts ON {TAB_LOGS} (assignment_type, "Timestamp", id);
+        CREATE INDEX IF NOT EXISTS idx_logs_nim     ON {TAB_LOGS} ("NIM");
+        CREATE INDEX IF NOT EXISTS idx_logs_config  ON {TAB_LOGS} ("Config_Name");
+    """
+    # Kolom entry_id & ringkasan ditambahkan lewat migrasi (_migrate) agar file lama ikut ter-update
+    MIGRATION_COLS    = {LOG_ENTRY_COL: "TEXT", **LOG_SUMMARY_COLS}
+    MIGRATION_INDEXES = (
+        f"CREATE UNIQUE INDEX IF NOT EXISTS idx_logs_entry ON {TAB_LOGS} ({LOG_ENTRY_COL})",
+        f"CREATE INDEX IF NOT EXISTS idx_logs_tariff ON {TAB_LOGS} (tariff_scheme)",
+    )
+
+    def __init__(self, path=STORAGE_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        conn = self._conn()
+        existing = {r['name'] for r in conn.execute(f"PRAGMA table_info({TAB_LOGS})")}
+        with conn:
+            for col, col_type in self.MIGRATION_COLS.items():
+                if col not in existing:
+                    conn.execute(f'ALTER TABLE {TAB_LOGS} ADD COLUMN {col} {col_type}')
+            for sql in self.MIGRATION_INDEXES:
+                conn.execute(sql)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _like(text):
+        text = str(text).strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{text}%"
+
+    # --- config_history ---
+    def _config_row(self, row):
+        out = {k: row[k] for k in row.keys() if k != 'data'}
+        out.update(json.loads(row['data']))
+        return out
+
+    def _config_query(self, where, args, limit):
+        rows = self._conn().execute(
+            f'SELECT * FROM {TAB_CONFIG} WHERE {where} ORDER BY id DESC LIMIT ?', (*args, limit)
+        ).fetchall()
+        return [self._config_row(r) for r in rows]
+
+    def config_history(self, assignment_type, limit=CONFIG_HISTORY_LIMIT):
+        return self._config_query('assignment_type = ? AND "Config_Name" <> \'\'', (assignment_type,), limit)
+
+    def latest_config(self, assignment_type):
+        rows = self._config_query('assignment_type = ?', (assignment_type,), 1)
+        return rows[0] if rows else None
+
+    def config_by_name(self, config_name, assignment_type):
+        rows = self._config_query('"Config_Name" = ? AND assignment_type = ?', (config_name, assignment_type), 1)
+        return rows[0] if rows else None
+
+    def insert_config(self, row):
+        data = {k: v for k, v in row.items() if k not in self.CONFIG_COLS and k not in ('id', 'created_at')}
+        with self._conn() as conn:
+            conn.execute(
+                f'INSERT INTO {TAB_CONFIG} ("Timestamp", "Config_Name", assignment_type, data) VALUES (?, ?, ?, ?)',
+                (row.get("Timestamp"), row.get("Config_Name"), row.get("assignment_type"), json.dumps(data, default=str)),
+            )
+
+    # --- student_logs ---
+    def insert_logs(self, rows):
+        cols = ", ".join(f'"{c}"' for c in self.LOG_COLS)
+        values = [
+            tuple(json.dumps(r.get(c), default=str) if c == "Parameter_Snapshot" else r.get(c) for c in self.LOG_COLS)
+            for r in rows
+        ]
+        with self._conn() as conn:
+            conn.executemany(
+                f'INSERT INTO {TAB_LOGS} ({cols}) VALUES ({", ".join("?" * len(self.LOG_COLS))}) '
+                f'ON CONFLICT ({LOG_ENTRY_COL}) DO NOTHING', values
+            )
+
+    def _log_row(self, row):
+        out = dict(row)
+        if out.get("Parameter_Snapshot") is not None:
+            out["Parameter_Snapshot"] = json.loads(out["Parameter_Snapshot"])
+        return out
+
+    def query_logs(self, assignment_type=None, nim=None, config_name=None, date_from=None, date_to=None,
+                   location=None, tariff_scheme=None, sort=None, offset=0, limit=None, count=False):
+        where, args = ['"NIM" IS NOT NULL', '"Timestamp" IS NOT NULL'], []
+        if assignment_type:
+            where.append('assignment_type = ?'); args.append(assignment_type)
+        if nim:
+            where.append('"NIM" LIKE ? ESCAPE \'\\\''); args.append(self._like(nim))
+        if config_name:
+            where.append('"Config_Name" LIKE ? ESCAPE \'\\\''); args.append(self._like(config_name))
+        if date_from:
+            where.append('"Timestamp" >= ?'); args.append(f"{date_from} 00:00:00")
+        if date_to:
+            where.append('"Timestamp" <= ?'); args.append(f"{date_to} 23:59:59")
+        if location:
+            where.append('location LIKE ? ESCAPE \'\\\''); args.append(self._like(location))
+        if tariff_scheme:
+            where.append('tariff_scheme = ?'); args.append(tariff_scheme)
+        sql_where = " AND ".join(where)
+
+        conn = self._conn()
+        total = conn.execute(f'SELECT COUNT(*) FROM {TAB_LOGS} WHERE {sql_where}', args).fetchone()[0] if count else None
+
+        sql = f'SELECT * FROM {TAB_LOGS} WHERE {sql_where}'
+        if sort:
+            sort_col, sort_desc = sort
+            if sort_col not in self.SORT_COLS:
+                raise ValueError(f"Unknown sort column: {sort_col}")
+            direction = "DESC" if sort_desc else "ASC"
+            sql += f' ORDER BY "{sort_col}" {direction}, id {direction}'
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            args = [*args, limit, offset]
+        return [self._log_row(r) for r in conn.execute(sql, args).fetchall()], total
+
+    def logs_missing_summary(self, after_id=0, limit=500):
+        rows = self._conn().execute(
+            f'SELECT id, "Parameter_Snapshot" FROM {TAB_LOGS} WHERE location IS NULL AND id > ? ORDER BY id LIMIT ?',
+            (after_id, limit),
+        ).fetchall()
+        return [self._log_row(r) for r in rows]
+
+    def update_log_summaries(self, updates):
+        cols = list(LOG_SUMMARY_COLS)
+        sql = f'UPDATE {TAB_LOGS} SET {", ".join(f"{c} = ?" for c in cols)} WHERE id = ?'
+        with self._conn() as conn:
+            conn.executemany(sql, [(*(summary.get(c) for c in cols), log_id) for log_id, summary in updates])
+
+    def is_permanent_error(self, error):
+        # OperationalError umumnya sementara (database locked, disk), kecuali schema tidak cocok
+        if isinstance(error, sqlite3.OperationalError):
+            msg = str(error).lower()
+            return any(k in msg for k in ("no such table", "no such column", "has no column named"))
+        return isinstance(error, (sqlite3.DatabaseError, sqlite3.InterfaceError)) or super().is_permanent_error(error)
+
+
+@st.cache_resource
+def get_storage():
+    """Backend aktif (sekali per proses)."""
+    backend = str(_setting("STORAGE_BACKEND") or "supabase").lower()
+    if backend == "supabase":
+        url, key = _setting("SUPABASE_URL"), _setting("SUPABASE_KEY")
+        if not url or not key:
+            raise RuntimeError(
+                "Storage belum dikonfigurasi: isi SUPABASE_URL & SUPABASE_KEY di secrets, "
+                "atau set STORAGE_BACKEND=sqlite untuk penyimpanan lokal."
+            )
+        from supabase import create_client
+        return SupabaseBackend(create_client(url, key))
+    if backend == "sqlite":
+        return SQLiteBackend(_setting("SQLITE_PATH", STORAGE_SQLITE_PATH))
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
@@ -1,11 +1,31 @@
 import streamlit as st
 import pandas as pd
+import os
 import json
 import zlib
+import uuid
+import time
+import random
+import atexit
+import sys
+import threading
+import collections
 from datetime import datetime
-from modules.config import supabase
+from modules.storage import get_storage, LOG_SUMMARY_COLS, LOG_ENTRY_COL
 
-TAB_LOGS = "student_logs"
+try:
+    import fcntl
+except ImportError:   # Windows: tanpa klaim spool antar proses
+    fcntl = None
+
+# Tracker: ukuran halaman & pilihan sort (label UI -> (kolom, descending))
+TRACKER_PAGE_SIZE = 10
+TRACKER_SORTS = {
+    "Newest first":         ("Timestamp", True),
+    "Oldest first":         ("Timestamp", False),
+    "Student ID (A-Z)":     ("NIM", False),
+    "Parameter Used (A-Z)": ("Config_Name", False),
+}
 
 def generate_seed(nim, config_name=""):
     """
@@ -18,9 +38,401 @@ def generate_seed(nim, config_name=""):
     gabungan = f"{nim_clean}_{config_clean}"
     return zlib.crc32(gabungan.encode('utf-8'))
 
+# =====================================================================
+# LOG WRITER (BACKGROUND)
+# =====================================================================
+# save_log_to_sheets tidak menunggu storage: log ditulis ke spool file
+# append-only (fsync) lalu masuk antrian di memori. Thread writer mengirim
+# antrian sebagai bulk insert tiap LOG_FLUSH_INTERVAL detik (atau segera jika
+# sudah LOG_BATCH_SIZE baris), retry dengan backoff eksponensial jika gagal,
+# lalu menghapus baris yang terkirim dari spool. Cache tracker di-clear sekali
+# per flush, bukan per log.
+#
+# Tiap proses punya spool sendiri (student_log_spool.<pid>.jsonl) yang dijaga
+# flock pada file .lock pasangannya selama proses hidup. Saat writer start,
+# spool proses lain yang lock-nya bisa diambil (proses pemiliknya sudah mati)
+# diklaim: isinya dipindah ke spool & antrian proses ini. Tiap log membawa
+# entry_id unik dan insert di storage mengabaikan entry_id yang sudah ada,
+# sehingga log yang terkirim ulang tidak dobel.
+#
+# Batch yang ditolak storage secara permanen (schema / data, lihat
+# StorageBackend.is_permanent_error) dikirim ulang per baris; baris yang tetap
+# ditolak dipindah ke LOG_REJECTED_FILE agar tidak memblokir log berikutnya.
+LOG_SPOOL_DIR      = ".cache"
+LOG_SPOOL_PREFIX   = "student_log_spool"
+LOG_REJECTED_FILE  = os.path.join(LOG_SPOOL_DIR, "student_log_rejected.jsonl")
+LOG_FLUSH_INTERVAL = 2.0     # detik
+LOG_BATCH_SIZE     = 200     # baris per bulk insert
+LOG_BACKOFF_MAX    = 60.0    # detik
+
+_log_lock       = threading.Lock()     # antrian + spool
+_log_flush_lock = threading.Lock()     # hanya 1 flush berjalan
+_log_wakeup     = threading.Event()
+_log_pending    = collections.deque()  # (id, row) yang belum terkirim
+_log_state      = {'thread': None, 'failures': 0, 'last_error': None, 'lock_fd': None, 'rejected': 0}
+
+
+def _spool_path(pid=None):
+    return os.path.join(LOG_SPOOL_DIR, f"{LOG_SPOOL_PREFIX}.{pid or os.getpid()}.jsonl")
+
+
+def _lock_path(spool_path):
+    return spool_path[:-len(".jsonl")] + ".lock"
+
+
+def _write_jsonl(path, entries, mode):
+    with open(path, mode) as f:
+        for entry in entries:
+            f.write(json.dumps(entry, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _spool_append(entries):
+    """entries: list (id, row). Dipanggil dengan _log_lock dipegang."""
+    os.makedirs(LOG_SPOOL_DIR, exist_ok=True)
+    _write_jsonl(_spool_path(), [{'id': i, 'row': row} for i, row in entries], 'a')
+
+
+def _spool_read(path=None):
+    entries = []
+    try:
+        with open(path or _spool_path()) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue   # baris terpotong (proses mati saat menulis)
+                row = entry['row']
+                row.setdefault(LOG_ENTRY_COL, entry['id'])   # spool versi lama
+                entries.append((entry['id'], row))
+    except OSError:
+        pass
+    return entries
+
+
+def _spool_remove(done_ids):
+    """Tulis ulang spool proses ini tanpa baris yang sudah selesai. Dipanggil dengan _log_lock dipegang."""
+    path = _spool_path()
+    entries = [(i, row) for i, row in _spool_read(path) if i not in done_ids]
+    try:
+        if not entries:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        path_tmp = f"{path}.tmp"
+        _write_jsonl(path_tmp, [{'id': i, 'row': row} for i, row in entries], 'w')
+        os.replace(path_tmp, path)
+    except OSError:
+        pass
+
+
+def _acquire_spool_lock():
+    """
+    Kunci spool proses ini. File lock dibuat & di-flock dulu sebagai file tmp
+    lalu di-rename, sehingga proses lain tidak pernah melihat lock yang belum terkunci.
+    """
+    if fcntl is None or _log_state['lock_fd'] is not None:
+        return
+    os.makedirs(LOG_SPOOL_DIR, exist_ok=True)
+    path_lock = _lock_path(_spool_path())
+    fd = os.open(f"{path_lock}.tmp", os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    os.replace(f"{path_lock}.tmp", path_lock)
+    _log_state['lock_fd'] = fd
+
+
+def _claim_orphan_spools():
+    """
+    Ambil alih spool proses lain yang sudah mati (lock-nya bebas) dan spool
+    versi lama tanpa pid. Return list (id, row). Dipanggil dengan _log_lock dipegang.
+    """
+    own = _spool_path()
+    claimed = []
+    try:
+        names = sorted(os.listdir(LOG_SPOOL_DIR))
+    except OSError:
+        return claimed
+
+    for name in names:
+        path = os.path.join(LOG_SPOOL_DIR, name)
+        if name == f"{LOG_SPOOL_PREFIX}.jsonl":
+            # Spool versi lama (1 file bersama): diklaim lewat rename atomik
+            path_claim = f"{own}.legacy"
+            try:
+                os.rename(path, path_claim)
+            except OSError:
+                continue
+            entries = _spool_read(path_claim)
+            _spool_append(entries)
+            claimed += entries
+            os.remove(path_claim)
+            continue
+
+        if fcntl is None or not name.startswith(f"{LOG_SPOOL_PREFIX}.") or not name.endswith(".lock"):
+            continue
+        path_spool = path[:-len(".lock")] + ".jsonl"
+        if path_spool == own:
+            continue
+        try:
+            fd = os.open(path, os.O_RDWR)    # tanpa O_CREAT: lock yang sudah dihapus tidak dibuat ulang
+        except OSError:
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)                     # pemiliknya masih hidup
+            continue
+        try:
+            entries = _spool_read(path_spool)
+            if entries:
+                _spool_append(entries)       # pindahkan dulu ke spool sendiri, baru hapus
+                claimed += entries
+            for p in (path_spool, path):
+                if os.path.exists(p):
+                    os.remove(p)
+        finally:
+            os.close(fd)
+    return claimed
+
+
+def _release_spool():
+    """atexit: kirim sisa antrian; jika spool sudah kosong, hapus spool & lock proses ini."""
+    flush_logs()
+    with _log_lock:
+        if _log_pending:
+            return   # lock dilepas saat proses selesai -> spool diklaim proses berikutnya
+        for p in (_spool_path(), _lock_path(_spool_path())):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+
+def _park_rejected(entry_id, row, error):
+    """Pindahkan 1 log yang ditolak permanen ke LOG_REJECTED_FILE."""
+    try:
+        os.makedirs(LOG_SPOOL_DIR, exist_ok=True)
+        _write_jsonl(LOG_REJECTED_FILE, [{
+            'id': entry_id, 'row': row, 'error': f"{type(error).__name__}: {error}",
+            'rejected_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }], 'a')
+    except OSError:
+        pass
+    _log_state['rejected'] += 1
+
+
+def _clear_log_caches():
+    get_student_logs.clear()
+    query_student_logs.clear()
+
+
+def _insert_batch(batch):
+    """
+    Kirim 1 batch. Return set id yang selesai (terkirim / di-park, selalu
+    prefix dari batch). Raise jika gagal sementara tanpa ada yang selesai.
+    """
+    storage = get_storage()
+    try:
+        storage.insert_logs([row for _, row in batch])
+        return {i for i, _ in batch}
+    except Exception as e:
+        if not storage.is_permanent_error(e):
+            raise
+
+    # Ditolak permanen -> kirim per baris untuk memisahkan baris yang bermasalah
+    done = set()
+    for entry_id, row in batch:
+        try:
+            storage.insert_logs([row])
+        except Exception as e:
+            if not storage.is_permanent_error(e):
+                if done:
+                    return done
+                raise
+            _park_rejected(entry_id, row, e)
+        done.add(entry_id)
+    return done
+
+
+def flush_logs():
+    """
+    Kirim semua log di antrian (bulk insert per LOG_BATCH_SIZE).
+    Return True jika antrian sudah kosong, False jika insert gagal (sisa tetap di antrian & spool).
+    """
+    with _log_flush_lock:
+        sent_any = False
+        try:
+            while True:
+                with _log_lock:
+                    batch = [_log_pending[i] for i in range(min(LOG_BATCH_SIZE, len(_log_pending)))]
+                if not batch:
+                    return True
+                try:
+                    done = _insert_batch(batch)
+                except Exception as e:
+                    _log_state['failures'] += 1
+                    _log_state['last_error'] = e
+                    return False
+                with _log_lock:
+                    for _ in range(len(done)):
+                        _log_pending.popleft()
+                    _spool_remove(done)
+                sent_any = True
+                if len(done) < len(batch):
+                    _log_state['failures'] += 1
+                    return False
+                _log_state['failures'] = 0
+        finally:
+            if sent_any:
+                _clear_log_caches()
+
+
+def _log_writer_loop():
+    while True:
+        _log_wakeup.wait(LOG_FLUSH_INTERVAL)
+        _log_wakeup.clear()
+        if not flush_logs():
+            backoff = LOG_FLUSH_INTERVAL * 2 ** min(_log_state['failures'], 10)
+            time.sleep(min(LOG_BACKOFF_MAX, backoff) * random.uniform(0.5, 1.0))
+
+
+def start_log_writer():
+    """
+    Start thread writer (idempotent). Start pertama di proses ini mengunci
+    spool sendiri, lalu memuat ulang isinya & spool yatim dari proses yang sudah mati.
+    """
+    with _log_lock:
+        thread = _log_state['thread']
+        if thread is not None and thread.is_alive():
+            return thread
+        if thread is None:
+            try:
+                _acquire_spool_lock()
+                entries = _spool_read() + _claim_orphan_spools()
+            except OSError:
+                entries = []
+            known = {i for i, _ in _log_pending}
+            for entry in entries:
+                if entry[0] not in known:
+                    known.add(entry[0])
+                    _log_pending.append(entry)
+            atexit.register(_release_spool)
+        thread = threading.Thread(target=_log_writer_loop, name="student-log-writer", daemon=True)
+        _log_state['thread'] = thread
+        thread.start()
+    return thread
+
+
+def pending_log_count():
+    """Jumlah log yang belum terkirim ke storage."""
+    return len(_log_pending)
+
+
+def rejected_log_count():
+    """Jumlah log proses ini yang ditolak storage dan dipindah ke LOG_REJECTED_FILE."""
+    return _log_state['rejected']
+
+
+def missing_log_columns():
+    """Kolom student_logs yang belum dimigrasi (log disimpan tanpa kolom itu), kosong jika belum diketahui."""
+    try:
+        return sorted(getattr(get_storage(), 'missing_log_cols', None) or ())
+    except Exception:
+        return []
+
+
+# =====================================================================
+# KOLOM RINGKASAN PARAMETER
+# =====================================================================
+# Ringkasan used_params (lokasi, periode, solar, baterai, load, tarif) disimpan
+# sebagai kolom bertipe di student_logs saat log ditulis, sehingga tracker
+# menampilkan & memfilter tanpa parse Parameter_Snapshot per baris. Log lama
+# diisi lewat backfill_log_summaries (python -m modules.student_log backfill).
+LOG_BACKFILL_BATCH = 500
+
+
+def snapshot_dict(snapshot):
+    """Parameter_Snapshot (dict / string JSON) -> dict, None jika tidak valid."""
+    if isinstance(snapshot, str):
+        try:
+            snapshot = json.loads(snapshot)
+        except ValueError:
+            return None
+    return snapshot if isinstance(snapshot, dict) else None
+
+
+def _as_float(value):
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def log_summary(used_params):
+    """Nilai kolom ringkasan (LOG_SUMMARY_COLS) dari snapshot used_params. None jika snapshot tidak valid."""
+    p = snapshot_dict(used_params)
+    if p is None:
+        return None
+    tariff = p.get('tariff_data')
+    return {
+        'location':        str(p.get('location', '')),
+        'period':          None if p.get('period') is None else str(p['period']),
+        'solar_kwp':       _as_float(p.get('solar')),
+        'battery_kwh':     _as_float(p.get('bat')),
+        'load_source':     p.get('load_source'),
+        'load_multiplier': _as_float(p.get('load_multiplier')),
+        'tariff_scheme':   tariff.get('tariff_scheme') if isinstance(tariff, dict) else None,
+    }
+
+
+def summary_text(row):
+    """Teks 'Result Parameter' tracker dari kolom ringkasan (snapshot hanya untuk log yang belum di-backfill)."""
+    summary = row if pd.notna(row.get('location')) else log_summary(row.get('Parameter_Snapshot'))
+    if summary is None:
+        return "Invalid Data"
+
+    def _val(key):
+        v = summary.get(key)
+        return '' if v is None or pd.isna(v) else v
+
+    text = f"Loc: {_val('location')} | PV: {_val('solar_kwp')}kWp | Load: {_val('load_source')}"
+    if _val('battery_kwh') != '':
+        text += f" | Bat: {_val('battery_kwh')}kWh"
+    return text
+
+
+def backfill_log_summaries(batch_size=LOG_BACKFILL_BATCH):
+    """
+    Isi kolom ringkasan untuk log lama (location masih kosong), per batch urut id.
+    Snapshot yang tidak valid dilewati. Return (jumlah di-update, jumlah dilewati).
+    """
+    storage = get_storage()
+    n_updated = n_skipped = 0
+    last_id = 0
+    while True:
+        rows = storage.logs_missing_summary(after_id=last_id, limit=batch_size)
+        if not rows:
+            break
+        updates = []
+        for r in rows:
+            summary = log_summary(r.get('Parameter_Snapshot'))
+            if summary is None:
+                n_skipped += 1
+            else:
+                updates.append((r['id'], summary))
+        if updates:
+            storage.update_log_summaries(updates)
+            n_updated += len(updates)
+        last_id = rows[-1]['id']
+    if n_updated:
+        _clear_log_caches()
+    return n_updated, n_skipped
+
+
 def save_log_to_sheets(nim, config_name, used_params_dict, assignment_type="assignment_1"):
     """
-    Menyimpan log generate mahasiswa ke Supabase.
+    Menyimpan log generate mahasiswa ke storage (asynchronous, lewat log writer).
     assignment_type ikut disimpan untuk keperluan filter tracker & reproducibility regenerate.
     """
     try:
@@ -31,37 +443,86 @@ def save_log_to_sheets(nim, config_name, used_params_dict, assignment_type="assi
             "Parameter_Snapshot": used_params_dict,
             "assignment_type": assignment_type,
         }
-        
-        supabase.table(TAB_LOGS).insert(new_row).execute()
-        
-        get_student_logs.clear()
+        new_row.update(log_summary(used_params_dict) or {})
+        # Bentuk JSON yang sama untuk antrian memori & spool
+        new_row = json.loads(json.dumps(new_row, default=str))
+
+        start_log_writer()
+        entry_id = uuid.uuid4().hex
+        new_row[LOG_ENTRY_COL] = entry_id
+        with _log_lock:
+            try:
+                _spool_append([(entry_id, new_row)])
+            except OSError:
+                pass   # spool gagal ditulis -> tetap terkirim dari antrian memori
+            _log_pending.append((entry_id, new_row))
+            n_pending = len(_log_pending)
+        if n_pending >= LOG_BATCH_SIZE:
+            _log_wakeup.set()
         return True
     except Exception as e:
-        st.error(f"⚠️ Gagal menyimpan Log Mahasiswa ke Supabase: {e}")
+        st.error(f"⚠️ Gagal menyimpan Log Mahasiswa: {e}")
         return False
 
+def _prepare_logs(df):
+    """Normalisasi hasil query log: default assignment_type, kolom ringkasan selalu ada (snapshot tidak di-parse)."""
+    if not df.empty:
+        df = df.dropna(subset=['NIM', 'Timestamp'])
+        if 'assignment_type' not in df.columns:
+            df['assignment_type'] = 'assignment_1'
+        for col in LOG_SUMMARY_COLS:
+            if col not in df.columns:
+                df[col] = None
+    return df
+
+@st.cache_data(ttl=60)
+def query_student_logs(assignment_type=None, nim=None, config_name=None, date_from=None, date_to=None,
+                       location=None, tariff_scheme=None, sort="Newest first", page=0, page_size=TRACKER_PAGE_SIZE):
+    """
+    Ambil 1 halaman log mahasiswa untuk tracker. Filter, sort, dan paginasi
+    dijalankan di storage (query database), sehingga biaya per halaman tidak bergantung pada
+    jumlah total log.
+    nim / config_name / location: filter 'mengandung' (case-insensitive).
+    tariff_scheme: skema tarif (sama persis).
+    date_from / date_to: datetime.date (inklusif) terhadap kolom Timestamp.
+    Return (DataFrame halaman, total baris yang cocok dengan filter).
+    """
+    try:
+        rows, total = get_storage().query_logs(
+            assignment_type=assignment_type,
+            nim=nim,
+            config_name=config_name,
+            date_from=date_from,
+            date_to=date_to,
+            location=location,
+            tariff_scheme=tariff_scheme,
+            sort=TRACKER_SORTS.get(sort, TRACKER_SORTS["Newest first"]),
+            offset=page * page_size,
+            limit=page_size,
+            count=True,
+        )
+        return _prepare_logs(pd.DataFrame(rows)), total
+    except Exception as e:
+        st.error(f"⚠️ Gagal mengambil data log: {e}")
+        return pd.DataFrame(), 0
+
 @st.cache_data(ttl=60)
 def get_student_logs(assignment_type=None):
     """
-    Mengambil riwayat log mahasiswa dari Supabase.
+    Mengambil riwayat log mahasiswa dari storage.
     Jika assignment_type diberikan, filter hanya log untuk assignment tersebut.
     """
     try:
-        query = supabase.table(TAB_LOGS).select("*")
-        if assignment_type:
-            query = query.eq("assignment_type", assignment_type)
-        
-        response = query.execute()
-        df = pd.DataFrame(response.data)
-        
-        if not df.empty:
-            df = df.dropna(subset=['NIM', 'Timestamp'])
-            df['Parameter_Snapshot'] = df['Parameter_Snapshot'].apply(
-                lambda x: json.dumps(x) if isinstance(x, dict) else x
-            )
-            if 'assignment_type' not in df.columns:
-                df['assignment_type'] = 'assignment_1'
-        return df
+        rows, _ = get_storage().query_logs(assignment_type=assignment_type)
+        return _prepare_logs(pd.DataFrame(rows))
     except Exception as e:
-        st.error(f"⚠️ Gagal mengambil data log dari Supabase: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        st.error(f"⚠️ Gagal mengambil data log: {e}")
+        return pd.DataFrame()
+
+
+if __name__ == "__main__":
+    # python -m modules.student_log backfill
+    if sys.argv[1:] != ["backfill"]:
+        sys.exit("usage: python -m modules.student_log backfill")
+    n_updated, n_skipped = backfill_log_summaries()
+    print(f"Backfill: {n_updated} log(s) updated, {n_skipped} invalid snapshot(s) skipped")
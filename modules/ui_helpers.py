@@ -6,9 +6,15 @@ generate flow dan regenerate flow di main.py.
 Penambahan section baru: cukup edit di satu tempat — berlaku untuk keduanya.
 """
 
+import os
 import calendar
+import numpy as np
 import streamlit as st
+from modules import aggregator
 from modules import assignment as asgn
+from modules import compact_result
+from modules import exporter
+from modules import fig_cache
 from modules import visualizer
 
 
@@ -213,28 +219,60 @@ def _render_battery_logic(used_p: dict, vc: dict, t_data: dict) -> None:
                 """)
 
 
-def _render_analysis(df_result, vc: dict, year_selectbox_key: str, month_selectbox_key: str) -> None:
-    """Render Detailed Analysis section: metrics, annual overview, monthly profile."""
-    ts       = df_result['timestamp']
-    yr_arr   = ts.dt.year
-    mo_arr   = ts.dt.month
+# Kolom yang dibaca chart selain cube (kolom yang tidak ada di hasil dilewati)
+ANNUAL_COLS  = ('timestamp', 'price_profile', 'price_import')
+MONTHLY_COLS = ('timestamp', 'irradiance', 'solar_output_kw', 'grid_net_kw', 'battery_soc_kwh', 'vpp_status', 'vpp_charge')
 
-    col_load = 'load_profile' if 'load_profile' in df_result.columns else 'beban_rumah_kw'
-    col_bat  = 'battery_power_ac_kw' if 'battery_power_ac_kw' in df_result.columns else 'battery_power_kw'
+
+def _group_rows(keys):
+    """key -> posisi baris. keys urut (timestamp urut) -> slice, selain itu array index."""
+    if len(keys) < 2 or (keys[1:] >= keys[:-1]).all():
+        uniq, starts = np.unique(keys, return_index=True)
+        bounds = np.r_[starts, len(keys)]
+        return {int(k): slice(int(a), int(b)) for k, a, b in zip(uniq, bounds[:-1], bounds[1:])}
+    return {int(k): np.flatnonzero(keys == k) for k in np.unique(keys)}
+
+
+def _sub_rows(rows, sub):
+    """Posisi `sub` (relatif terhadap `rows`) -> posisi di hasil penuh."""
+    if isinstance(rows, slice) and isinstance(sub, slice):
+        return slice(rows.start + sub.start, rows.start + sub.stop)
+    base = np.arange(rows.start, rows.stop) if isinstance(rows, slice) else rows
+    return base[sub]
+
+
+def _render_analysis(df_result, vc: dict, year_selectbox_key: str, month_selectbox_key: str,
+                     cube: dict = None, result_key: str = None) -> None:
+    """
+    Render Detailed Analysis section: metrics, annual overview, monthly profile.
+    df_result : CompactResult (atau DataFrame); tiap chart hanya men-decode kolom
+                & baris tahun/bulan yang dipilih, tidak ada DataFrame penuh yang ditahan.
+    cube      : hasil aggregator.build_cube (per tahun); tahun yang tidak ada di cube dihitung on the fly.
+    result_key: key result_cache hasil ini; jika ada, chart disajikan dari fig_cache.
+    """
+    columns   = list(df_result.columns)
+    col_load  = 'load_profile' if 'load_profile' in columns else 'beban_rumah_kw'
+    col_bat   = 'battery_power_ac_kw' if 'battery_power_ac_kw' in columns else 'battery_power_kw'
+    year_rows = _group_rows(df_result['timestamp'].to_numpy().astype('datetime64[Y]').astype(np.int64) + 1970)
+
+    def _frame(wanted, rows):
+        return compact_result.as_frame(df_result, [c for c in wanted if c in columns], rows)
 
     @st.fragment
     def _analysis_fragment():
-        available_years = sorted(yr_arr.unique())
+        available_years = sorted(year_rows)
         selected_year   = st.selectbox("Select Year:", available_years, key=year_selectbox_key)
+        rows_year       = year_rows[selected_year]
 
-        mask_year = yr_arr == selected_year
-        df_year   = df_result[mask_year] 
+        year_cube = (cube or {}).get(selected_year) or \
+            aggregator.build_year_cube(compact_result.as_frame(df_result, rows=rows_year), col_bat)
+        totals    = year_cube['totals']
 
-        total_solar = df_year['solar_output_kw'].sum() * DT_HOURS
-        total_load  = df_year[col_load].sum() * DT_HOURS
+        total_solar = totals['solar_kwh']
+        total_load  = totals['load_kwh']
 
-        if vc.get("show_grid_metric", True) and 'grid_net_kw' in df_year.columns:
-            total_import = df_year['grid_net_kw'].clip(lower=0).sum() * DT_HOURS
+        if vc.get("show_grid_metric", True) and 'grid_import_kwh' in totals:
+            total_import = totals['grid_import_kwh']
             m1, m2, m3 = st.columns(3)
             m1.metric(f"Total Solar ({selected_year})", f"{total_solar:,.2f} kWh")
             m2.metric(f"Total Load ({selected_year})",  f"{total_load:,.2f} kWh")
@@ -244,42 +282,77 @@ def _render_analysis(df_result, vc: dict, year_selectbox_key: str, month_selectb
             m1.metric(f"Total Solar ({selected_year})", f"{total_solar:,.2f} kWh")
             m2.metric(f"Total Load ({selected_year})",  f"{total_load:,.2f} kWh")
 
-        visualizer.plot_annual_overview(df_year, col_bat, selected_year, vis_config=vc)
+        visualizer.plot_annual_overview(
+            _frame(ANNUAL_COLS, rows_year), col_bat, selected_year, vis_config=vc, cube=year_cube,
+            fig_key=fig_cache.make_key(result_key, vc, int(selected_year)),
+        )
 
         st.divider()
 
         if vc.get("show_monthly_analysis", True):
-            mo_arr_year = mo_arr[mask_year]
+            ts_year    = _frame(['timestamp'], rows_year)['timestamp'].to_numpy()
+            month_rows = _group_rows(ts_year.astype('datetime64[M]').astype(np.int64) % 12 + 1)
 
             @st.fragment
             def _monthly_fragment():
-                available_months = sorted(mo_arr_year.unique())
-                month_map        = {m: calendar.month_name[m] for m in available_months}
+                month_map = {m: calendar.month_name[m] for m in sorted(month_rows)}
 
                 selected_month_name = st.selectbox(
                     "Select Month for Profile:", list(month_map.values()), key=month_selectbox_key
                 )
                 selected_month = [k for k, v in month_map.items() if v == selected_month_name][0]
-                df_month = df_year[mo_arr_year == selected_month]
+                df_month = _frame((*MONTHLY_COLS, col_load), _sub_rows(rows_year, month_rows[selected_month]))
 
-                visualizer.plot_monthly_analysis(df_month, col_load, selected_month_name, selected_year)
+                visualizer.plot_monthly_analysis(
+                    df_month, col_load, selected_month_name, selected_year,
+                    fig_key=fig_cache.make_key(result_key, vc, int(selected_year), int(selected_month)),
+                )
 
             _monthly_fragment()
 
+        if result_key:
+            fc = fig_cache.get_stats()
+            st.caption(
+                f"Figure cache: {fc['hits']} hit / {fc['misses']} miss "
+                f"({fc['hit_rate']:.0%}) · {fc['entries']} chart · "
+                f"{fc['bytes'] / 1024**2:,.1f} MB · {fc['evictions']} evicted"
+            )
+
     _analysis_fragment()
 
 
+def _render_extra_downloads(extra_exports, download_filename, download_key):
+    """Tombol download format lain (CSV gzip, Parquet) dengan nama file yang sama."""
+    fmts = [f for f in (extra_exports or {}) if f != "csv" and f in exporter.EXPORT_FORMATS]
+    if not fmts: return
+
+    base_name = os.path.splitext(download_filename)[0]
+    cols = st.columns(len(fmts))
+    for col, fmt in zip(cols, fmts):
+        label, ext, mime = exporter.EXPORT_FORMATS[fmt]
+        col.download_button(
+            label=f"Download Dataset ({label})",
+            data=extra_exports[fmt],
+            file_name=base_name + ext,
+            mime=mime,
+            key=f"{download_key}_{fmt}",
+        )
+
+
 def render_result_panel(
     df_result,
     used_p:            dict,
     vc:                dict,
-    csv_bytes:         bytes,
+    csv_data,
     download_label:    str  = "Download Dataset (CSV)",
     download_filename: str  = "data.csv",
     download_key:      str  = "dl_result",
     year_key:          str  = "sb_year",
     month_key:         str  = "sb_month",
     show_analysis:     bool = True,
+    extra_exports:     dict = None,
+    cube:              dict = None,
+    result_key:        str  = None,
 ) -> None:
     """
     Render panel hasil simulasi secara lengkap.
@@ -290,13 +363,17 @@ def render_result_panel(
     df_result         : DataFrame hasil simulasi (kolom internal, bukan renamed)
     used_p            : dict parameter simulasi (dari session_state['used_params'])
     vc                : dict vis_config dari asgn.get_vis_config(assignment_type)
-    csv_bytes         : bytes CSV yang siap di-download
+    csv_data          : bytes CSV, atau callable dari exporter.lazy_csv (dibuat saat diklik)
     download_label    : label tombol download
     download_filename : nama file CSV
     download_key      : unique key untuk st.download_button
     year_key          : unique key untuk selectbox tahun di analysis
     month_key         : unique key untuk selectbox bulan di analysis
     show_analysis     : True = tampilkan Detailed Analysis section (admin only)
+    extra_exports     : dict format -> data (mis. exporter.lazy_exports) untuk tombol
+                        download tambahan; key "csv" diabaikan (sudah lewat csv_data)
+    cube              : pre-agregasi per tahun dari aggregator.build_cube (opsional)
+    result_key        : key result_cache hasil ini, untuk cache PNG chart (opsional)
     """
     role   = st.session_state.get('role', 'student')
     t_data = used_p.get('tariff_data', {})
@@ -312,13 +389,14 @@ def render_result_panel(
     st.markdown("### 💾 Export Data")
     st.download_button(
         label=download_label,
-        data=csv_bytes,
+        data=csv_data,
         file_name=download_filename,
         mime="text/csv",
         key=download_key,
     )
+    _render_extra_downloads(extra_exports, download_filename, download_key)
 
     if show_analysis and role == 'admin' and df_result is not None:
         st.divider()
         st.subheader("📊 Detailed Analysis")
-        _render_analysis(df_result, vc, year_key, month_key)
+        _render_analysis(df_result, vc, year_key, month_key, cube=cube, result_key=result_key)